@@ -1,9 +1,11 @@
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QLabel, 
                              QLineEdit, QPushButton, QComboBox, QTextEdit, QProgressBar, QStatusBar, QCheckBox,
-                             QFileDialog, QMessageBox, QSizePolicy, QTreeView, QFileSystemModel, QSpinBox)
+                             QFileDialog, QMessageBox, QSizePolicy, QTreeView, QFileSystemModel, QSpinBox,
+                             QAbstractItemView, QTableView, QHeaderView)
 from PySide6.QtGui import QAction, QCloseEvent, QIcon, QDropEvent
-from PySide6.QtCore import QThread, Signal, QObject, QDir, QFile, QTextStream, QSettings
+from PySide6.QtCore import (QThread, Signal, QObject, QDir, QFile, QTextStream, QSettings,
+                            QAbstractTableModel, QModelIndex)
 from PySide6.QtCore import Qt  # Import Qt for alignment constants
 from pathlib import Path
 from datetime import datetime
@@ -13,12 +15,21 @@ import zipfile
 import os
 import sys
 import time
-import pandas as pd
 import csv
+import threading
+from conversion import (CONVERSION_FUNCTIONS, ConversionCancelled, FolderWatcher, Selection, convert, convert_batch,
+                        convert_streaming, convert_to_archive, file_format, format_metrics, format_progress, log_metrics,
+                        open_preview, output_path, plan_batch)
 
 # Directory where the script is located
 basedir = os.path.dirname(__file__)
 
+# Output compression choices, by file suffix. "zip" in batch mode writes all files into one archive
+COMPRESSION_CHOICES = ["none", "gz", "bz2", "xz", "zst", "zip"]
+
+# Per-stage metrics of every conversion are appended to this file as JSON lines, when it is set
+METRICS_LOG = os.environ.get("DATA_CONVERTER_METRICS_LOG")
+
 class DraggableLineEdit(QLineEdit):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -45,6 +56,135 @@ class DraggableLineEdit(QLineEdit):
         else:
             event.ignore()
 
+class BatchWorker(QObject):
+    result_ready = Signal(object)
+    finished = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self, jobs, archive_file=None):
+        super().__init__()
+        self.jobs = jobs
+        self.archive_file = archive_file
+
+    def run(self):
+        try:
+            if self.archive_file:
+                summary = convert_to_archive(self.jobs, self.archive_file, on_result=self.result_ready.emit)
+            else:
+                summary = convert_batch(self.jobs, on_result=self.result_ready.emit)
+            self.finished.emit(summary)
+        except Exception as ex:
+            self.failed.emit(f"An exception of type {type(ex).__name__} occurred. Arguments: {ex.args!r}")
+
+# Watches a folder until stop_event is set, which is set straight from the UI thread like the
+# cancel event of a conversion
+class WatchWorker(QObject):
+    result_ready = Signal(object)
+    finished = Signal()
+    failed = Signal(str)
+
+    def __init__(self, watcher):
+        super().__init__()
+        self.watcher = watcher
+        self.stop_event = threading.Event()
+
+    def run(self):
+        try:
+            self.watcher.watch(self.stop_event, on_result=self.result_ready.emit)
+            self.finished.emit()
+        except Exception as ex:
+            self.failed.emit(f"An exception of type {type(ex).__name__} occurred. Arguments: {ex.args!r}")
+
+# Runs one conversion off the UI thread. Progress arrives after every chunk, cancel_event is set
+# straight from the UI thread since this thread is busy converting and handles no events
+class ConversionWorker(QObject):
+    progress = Signal(object)
+    metrics = Signal(object)
+    finished = Signal(str)
+    failed = Signal(str)
+    cancelled = Signal()
+
+    def __init__(self, input_file, output_file, input_ext, output_ext, streaming, compact=False, workers=1,
+                 selection=None):
+        super().__init__()
+        self.job = (input_file, output_file, input_ext, output_ext)
+        self.streaming = streaming
+        self.compact = compact
+        self.workers = workers
+        self.selection = selection
+        self.cancel_event = threading.Event()
+
+    def run(self):
+        try:
+            conversion = convert_streaming if self.streaming else convert
+            conversion(*self.job, on_progress=self.progress.emit, cancel_event=self.cancel_event,
+                       on_metrics=self.metrics.emit, compact=self.compact, workers=self.workers, selection=self.selection)
+            self.finished.emit(self.job[1])
+        except ConversionCancelled:
+            self.cancelled.emit()
+        except Exception as ex:
+            self.failed.emit(f"An exception of type {type(ex).__name__} occurred. Arguments: {ex.args!r}")
+
+# Table model over a preview source: rows are fetched a page at a time when the view asks for
+# them, so only the visible part of the file is ever read and rendered
+class PreviewModel(QAbstractTableModel):
+    def __init__(self, source, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.rows = source.row_count()
+        self.columns = len(source.columns)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.columns
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        row = self.source.row(index.row())
+        return row[index.column()] if index.column() < len(row) else ""
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.source.columns[section] if section < len(self.source.columns) else None
+        return str(section)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.source.can_fetch_more()
+
+    def fetchMore(self, parent=QModelIndex()):
+        self.source.fetch_more()
+        self.on_rows_available(self.source.row_count())
+
+    # Called as the background index grows, and after every fetched page
+    def on_rows_available(self, count):
+        if count > self.rows:
+            self.beginInsertRows(QModelIndex(), self.rows, count - 1)
+            self.rows = count
+            self.endInsertRows()
+        if len(self.source.columns) > self.columns:
+            self.beginInsertColumns(QModelIndex(), self.columns, len(self.source.columns) - 1)
+            self.columns = len(self.source.columns)
+            self.endInsertColumns()
+
+class PreviewIndexWorker(QObject):
+    progress = Signal(int)
+    finished = Signal()
+
+    def __init__(self, source):
+        super().__init__()
+        self.source = source
+
+    def run(self):
+        try:
+            self.source.build_index(self.progress.emit)
+        finally:
+            self.finished.emit()
+
 class MainWindow(QMainWindow):
     progress_updated = Signal(int)
     
@@ -128,14 +268,21 @@ class MainWindow(QMainWindow):
         from_combobox.setPlaceholderText("Select a filetype...")
 
         to_label = QLabel("To:")
-        to_combobox = QComboBox()
-        to_combobox.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-        to_combobox.setPlaceholderText("Select a filetype...")
+        self.to_combobox = QComboBox()
+        self.to_combobox.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        self.to_combobox.setPlaceholderText("Select a filetype...")
+        self.to_combobox.addItems(sorted({output_ext for _, output_ext in CONVERSION_FUNCTIONS}))
 
         conversion_layout.addWidget(from_label)
         conversion_layout.addWidget(from_combobox)
         conversion_layout.addWidget(to_label)
-        conversion_layout.addWidget(to_combobox)
+        conversion_layout.addWidget(self.to_combobox)
+        compression_label = QLabel("Compress:")
+        self.compression_combobox = QComboBox()
+        self.compression_combobox.addItems(COMPRESSION_CHOICES)
+        self.compression_combobox.setToolTip("Compress the output while it is written, e.g. data.csv.gz. Compressed inputs are read as they are.")
+        conversion_layout.addWidget(compression_label)
+        conversion_layout.addWidget(self.compression_combobox)
         left_panel_layout.addLayout(conversion_layout)
 
         # File Input Layout
@@ -145,11 +292,57 @@ class MainWindow(QMainWindow):
         self.input_file.setPlaceholderText("File to be converted...")
         input_browse_button = QPushButton("Browse")
         input_browse_button.clicked.connect(self.browse_input_file)
+        input_preview_button = QPushButton("Preview")
+        input_preview_button.clicked.connect(self.preview_input_file)
+        input_preview_button.setToolTip("Shows the file in the table, rows are loaded while you scroll.")
         file_input_layout.addWidget(input_label)
         file_input_layout.addWidget(self.input_file)
         file_input_layout.addWidget(input_browse_button)
+        file_input_layout.addWidget(input_preview_button)
         left_panel_layout.addLayout(file_input_layout)
 
+        # Single File Conversion Layout: runs in the background with progress and cancellation
+        convert_layout = QHBoxLayout()
+        self.checkbox_streaming = QCheckBox("Streaming mode")
+        self.checkbox_streaming.setToolTip("Read and write the file in chunks so memory use stays flat.")
+        self.button_convert = QPushButton("Convert")
+        self.button_convert.clicked.connect(self.start_conversion)
+        self.button_convert.setToolTip("Converts the selected file next to it, in the format chosen under 'To'.")
+        self.button_cancel = QPushButton("Cancel")
+        self.button_cancel.clicked.connect(self.cancel_conversion)
+        self.button_cancel.setEnabled(False)
+        self.checkbox_compact = QCheckBox("Compact memory")
+        self.checkbox_compact.setToolTip("Keep the data in smaller types (small integers, categories), the output stays the same.")
+        self.checkbox_parallel = QCheckBox("All cores (CSV)")
+        self.checkbox_parallel.setToolTip("Parse large CSV files on every CPU core, the output stays the same.")
+        self.checkbox_metrics = QCheckBox("Show timings")
+        self.checkbox_metrics.setToolTip("Show time, CPU time, rows, bytes and peak memory per stage after a conversion.")
+        convert_layout.addWidget(self.checkbox_streaming)
+        convert_layout.addWidget(self.checkbox_compact)
+        convert_layout.addWidget(self.checkbox_parallel)
+        convert_layout.addWidget(self.checkbox_metrics)
+        convert_layout.addWidget(self.button_convert)
+        convert_layout.addWidget(self.button_cancel)
+        left_panel_layout.addLayout(convert_layout)
+
+        # Columns and rows the conversion keeps, the other columns are never parsed
+        selection_layout = QHBoxLayout()
+        self.selection_columns = QLineEdit()
+        self.selection_columns.setPlaceholderText("Columns: id, name, price (all when empty)")
+        self.selection_columns.setToolTip("Only these columns are converted, in this order. CSV, XLSX and XML input skips the others while parsing.")
+        self.selection_where = QLineEdit()
+        self.selection_where.setPlaceholderText('Rows where: price > 10 and country == "DE"')
+        self.selection_where.setToolTip("Only rows matching this pandas query expression are converted, names with spaces go in `backticks`.")
+        selection_layout.addWidget(self.selection_columns)
+        selection_layout.addWidget(self.selection_where)
+        left_panel_layout.addLayout(selection_layout)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_updated.connect(self.progress_bar.setValue)
+        left_panel_layout.addWidget(self.progress_bar)
+        self.setStatusBar(QStatusBar())
+        self.conversion_worker = None
+
         # Buttons
         self.button_load_filesystem = QPushButton("Load new path")
         self.button_load_filesystem.clicked.connect(self.load_filesystem_path)
@@ -158,11 +351,60 @@ class MainWindow(QMainWindow):
         refresh_theme_button = QPushButton("Refresh Theme")
         refresh_theme_button.clicked.connect(self.refresh_theme)
 
-        # Output Window
-        output_window = QTextEdit()
-        output_window.setReadOnly(True)
+        # Batch Conversion Layout: converts every file and folder selected in the TreeView
+        batch_layout = QHBoxLayout()
+        batch_label = QLabel("Convert selection to:")
+        self.batch_format = QComboBox()
+        self.batch_format.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        self.batch_format.addItems(sorted({output_ext for _, output_ext in CONVERSION_FUNCTIONS}))
+        self.button_batch_convert = QPushButton("Batch Convert")
+        self.button_batch_convert.clicked.connect(self.start_batch_conversion)
+        self.button_batch_convert.setToolTip("Converts all selected files and folders in the TreeView in parallel.")
+        self.batch_compression = QComboBox()
+        self.batch_compression.addItems(COMPRESSION_CHOICES)
+        self.batch_compression.setToolTip("Compress every output, 'zip' writes all of them into one archive.")
+        batch_layout.addWidget(batch_label)
+        batch_layout.addWidget(self.batch_format)
+        batch_layout.addWidget(self.batch_compression)
+        batch_layout.addWidget(self.button_batch_convert)
+        left_panel_layout.addLayout(batch_layout)
+
+        # Watch Folder Layout: converts new and changed files of the input folder into the output
+        # folder, in the batch format and compression
+        watch_layout = QHBoxLayout()
+        self.input_folder = DraggableLineEdit()
+        self.input_folder.setPlaceholderText("Input folder to watch...")
+        input_folder_button = QPushButton("Browse")
+        input_folder_button.clicked.connect(self.browse_input_folder)
+        self.output_folder = DraggableLineEdit()
+        self.output_folder.setPlaceholderText("Output folder...")
+        output_folder_button = QPushButton("Browse")
+        output_folder_button.clicked.connect(self.browse_output_folder)
+        self.button_watch = QPushButton("Watch")
+        self.button_watch.setCheckable(True)
+        self.button_watch.toggled.connect(self.toggle_watch)
+        self.button_watch.setToolTip("Converts new and changed files of the input folder as they arrive, files converted before are skipped.")
+        watch_layout.addWidget(self.input_folder)
+        watch_layout.addWidget(input_folder_button)
+        watch_layout.addWidget(self.output_folder)
+        watch_layout.addWidget(output_folder_button)
+        watch_layout.addWidget(self.button_watch)
+        left_panel_layout.addLayout(watch_layout)
+        self.watch_worker = None
+
+        # Output Window and the data preview below it
+        right_panel_layout = QVBoxLayout()
+        self.output_window = QTextEdit()
+        self.output_window.setReadOnly(True)
+        self.preview_table = QTableView()
+        self.preview_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.preview_table.verticalHeader().setDefaultSectionSize(22)
+        self.preview_source = None
+        self.preview_thread = None
+        right_panel_layout.addWidget(self.output_window)
+        right_panel_layout.addWidget(self.preview_table)
         top_layout.addLayout(left_panel_layout)
-        top_layout.addWidget(output_window)
+        top_layout.addLayout(right_panel_layout)
 
         # Add Top Layout to Main Layout
         main_layout.addLayout(top_layout)
@@ -170,6 +412,7 @@ class MainWindow(QMainWindow):
         # QTreeView for Full Width
         self.tree_view = QTreeView()
         self.tree_view.setDragEnabled(True)
+        self.tree_view.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.file_system_model = QFileSystemModel()
         self.file_system_model.setRootPath("")
         self.file_system_model.setFilter(QDir.NoDotAndDotDot | QDir.AllDirs | QDir.Files)
@@ -191,6 +434,12 @@ class MainWindow(QMainWindow):
         self.settings.setValue("geometry", geometry)
         
         if reply == QMessageBox.Yes:
+            self.close_preview()
+            if self.conversion_worker is not None:
+                self.conversion_worker.cancel_event.set()
+                self.conversion_thread.quit()
+                self.conversion_thread.wait()
+            self.stop_watch()
             event.accept()
         else:
             event.ignore()
@@ -258,6 +507,11 @@ class MainWindow(QMainWindow):
         except TypeError:
             print(file_name)
             
+    def browse_input_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Select Directory")
+        if folder:
+            self.input_folder.setText(folder)
+
     def browse_output_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Select Directory")
         if folder:
@@ -276,7 +530,215 @@ class MainWindow(QMainWindow):
         except Exception as ex:
             print(f"An exception of type {type(ex).__name__} occurred. Arguments: {ex.args!r}")
 
+    # Show the first page of the input file right away, a background thread indexes the rest
+    def preview_input_file(self):
+        file = self.input_file.text()
+        try:
+            source = open_preview(file)
+        except FileNotFoundError:
+            QMessageBox.warning(self, "Preview", f"File not found:\n{file}")
+            return
+        except Exception as ex:
+            QMessageBox.critical(self, "Preview", f"An exception of type {type(ex).__name__} occurred. Arguments: {ex.args!r}")
+            return
+
+        self.close_preview()
+        self.preview_source = source
+        self.preview_model = PreviewModel(source, self)
+        self.preview_table.setModel(self.preview_model)
+        self.preview_name = Path(file).name
+        self.statusBar().showMessage(f"{self.preview_name}: {source.row_count():,} rows loaded")
+
+        self.preview_thread = QThread()
+        self.preview_worker = PreviewIndexWorker(source)
+        self.preview_worker.moveToThread(self.preview_thread)
+        self.preview_thread.started.connect(self.preview_worker.run)
+        self.preview_worker.progress.connect(self.preview_model.on_rows_available)
+        self.preview_worker.progress.connect(self.on_preview_progress)
+        self.preview_worker.finished.connect(self.preview_thread.quit)
+        self.preview_thread.start()
+
+    def on_preview_progress(self, rows):
+        self.statusBar().showMessage(f"{self.preview_name}: {rows:,} rows indexed")
+
+    # Stop indexing the previous file before another one is previewed
+    def close_preview(self):
+        if self.preview_source is not None:
+            self.preview_source.close()
+        if self.preview_thread is not None:
+            self.preview_thread.quit()
+            self.preview_thread.wait()
+        self.preview_source = None
+        self.preview_thread = None
+
+    # Convert the input file next to itself on a worker thread
+    def start_conversion(self):
+        input_file = self.input_file.text()
+        input_ext = file_format(input_file)
+        output_ext = self.to_combobox.currentText()
+        compression = self.compression_combobox.currentText()
+        output_file = output_path(input_file, output_ext, None if compression == "none" else compression)
+        if not os.path.isfile(input_file):
+            QMessageBox.warning(self, "Conversion", f"File not found:\n{input_file}")
+            return
+        if (input_ext, output_ext) not in CONVERSION_FUNCTIONS or output_file == input_file:
+            QMessageBox.warning(self, "Conversion", f"Unsupported conversion: {input_ext.upper()} to {output_ext.upper()}")
+            return
+        selection = Selection.parse(self.selection_columns.text(), self.selection_where.text())
+        try:
+            # A row filter that isn't an expression is reported before the conversion starts
+            selection.read_columns()
+        except ValueError as e:
+            QMessageBox.warning(self, "Conversion", str(e))
+            return
+
+        self.button_convert.setEnabled(False)
+        self.button_cancel.setEnabled(True)
+        self.progress_updated.emit(0)
+        self.statusBar().showMessage(f"Converting {Path(input_file).name}...")
+
+        self.conversion_thread = QThread()
+        self.conversion_worker = ConversionWorker(input_file, output_file, input_ext, output_ext, self.checkbox_streaming.isChecked(),
+                                                  self.checkbox_compact.isChecked(), 0 if self.checkbox_parallel.isChecked() else 1,
+                                                  selection or None)
+        self.conversion_worker.moveToThread(self.conversion_thread)
+        self.conversion_thread.started.connect(self.conversion_worker.run)
+        self.conversion_worker.progress.connect(self.on_conversion_progress)
+        self.conversion_worker.metrics.connect(self.on_conversion_metrics)
+        self.conversion_worker.finished.connect(self.on_conversion_finished)
+        self.conversion_worker.failed.connect(self.on_conversion_failed)
+        self.conversion_worker.cancelled.connect(self.on_conversion_cancelled)
+        for signal in (self.conversion_worker.finished, self.conversion_worker.failed, self.conversion_worker.cancelled):
+            signal.connect(self.conversion_thread.quit)
+        self.conversion_thread.start()
+
+    # The worker stops at the next chunk and removes the partial output
+    def cancel_conversion(self):
+        if self.conversion_worker is not None:
+            self.conversion_worker.cancel_event.set()
+            self.button_cancel.setEnabled(False)
+            self.statusBar().showMessage("Cancelling...")
+
+    def on_conversion_progress(self, progress):
+        self.progress_updated.emit(int(progress.fraction * 100))
+        self.statusBar().showMessage(format_progress(progress))
+
+    # Emitted before finished/failed/cancelled, failed runs are measured too
+    def on_conversion_metrics(self, metrics):
+        if self.checkbox_metrics.isChecked():
+            self.output_window.append(format_metrics(metrics))
+
+    def on_conversion_finished(self, output_file):
+        self.output_window.append(f"Successfully converted to {output_file} ({self.statusBar().currentMessage()})")
+        self.conversion_done()
+
+    def on_conversion_failed(self, message):
+        self.conversion_done()
+        QMessageBox.critical(self, "Conversion", message)
+
+    def on_conversion_cancelled(self):
+        self.output_window.append("Conversion cancelled, the partial output was removed.")
+        self.conversion_done()
+
+    def conversion_done(self):
+        self.conversion_worker = None
+        self.button_convert.setEnabled(True)
+        self.button_cancel.setEnabled(False)
+
+    # Batch convert every file and folder selected in the TreeView on a process pool
+    def start_batch_conversion(self):
+        paths = [self.file_system_model.filePath(index) for index in self.tree_view.selectionModel().selectedRows(0)]
+        output_ext = self.batch_format.currentText()
+        compression = self.batch_compression.currentText()
+        archive_file = None
+        if compression == "zip":
+            archive_file, _ = QFileDialog.getSaveFileName(self, "Save archive", "converted.zip", "Zip archives (*.zip)")
+            if not archive_file:
+                return
+        try:
+            jobs = plan_batch(paths, output_ext, compression=None if compression in ("none", "zip") else compression)
+        except ValueError as e:
+            QMessageBox.warning(self, "Batch Conversion", str(e))
+            return
+        if not jobs:
+            QMessageBox.warning(self, "Batch Conversion", f"No files in the selection can be converted to {output_ext.upper()}.")
+            return
+
+        self.button_batch_convert.setEnabled(False)
+        self.output_window.append(f"Converting {len(jobs)} files to {output_ext.upper()}...")
+
+        self.batch_thread = QThread()
+        self.batch_worker = BatchWorker(jobs, archive_file)
+        self.batch_worker.moveToThread(self.batch_thread)
+        self.batch_thread.started.connect(self.batch_worker.run)
+        self.batch_worker.result_ready.connect(self.on_batch_result)
+        self.batch_worker.finished.connect(self.on_batch_finished)
+        self.batch_worker.failed.connect(self.on_batch_failed)
+        self.batch_worker.finished.connect(self.batch_thread.quit)
+        self.batch_worker.failed.connect(self.batch_thread.quit)
+        self.batch_thread.start()
+
+    def on_batch_result(self, result):
+        if result.ok:
+            self.output_window.append(f"OK  {result.job.input_file} -> {Path(result.job.output_file).name} ({result.seconds:.2f}s)")
+        else:
+            self.output_window.append(f"FAILED  {result.job.input_file}: {result.error}")
+
+    def on_batch_finished(self, summary):
+        self.output_window.append(f"Done: {summary.files - summary.failed}/{summary.files} files converted, {summary.failed} failed "
+                                  f"in {summary.seconds:.1f}s ({summary.files_per_second:.1f} files/s, {summary.mb_per_second:.1f} MB/s)")
+        self.button_batch_convert.setEnabled(True)
+
+    def on_batch_failed(self, message):
+        QMessageBox.critical(self, "Batch Conversion", message)
+        self.button_batch_convert.setEnabled(True)
+
+    def toggle_watch(self, checked):
+        if not checked:
+            self.stop_watch()
+            return
+        input_dir = self.input_folder.text().strip()
+        output_dir = self.output_folder.text().strip()
+        if not os.path.isdir(input_dir) or not output_dir:
+            QMessageBox.warning(self, "Watch Folder", f"Select an existing input folder and an output folder:\n{input_dir}")
+            self.button_watch.setChecked(False)
+            return
+
+        output_ext = self.batch_format.currentText()
+        compression = self.batch_compression.currentText()
+        watcher = FolderWatcher(input_dir, output_dir, output_ext, None if compression == "none" else compression)
+        self.output_window.append(f"Watching {input_dir} for files to convert to {output_ext.upper()}...")
+        self.button_watch.setText("Stop Watching")
+
+        self.watch_thread = QThread()
+        self.watch_worker = WatchWorker(watcher)
+        self.watch_worker.moveToThread(self.watch_thread)
+        self.watch_thread.started.connect(self.watch_worker.run)
+        self.watch_worker.result_ready.connect(self.on_batch_result)
+        self.watch_worker.failed.connect(self.on_watch_failed)
+        self.watch_worker.finished.connect(self.watch_thread.quit)
+        self.watch_worker.failed.connect(self.watch_thread.quit)
+        self.watch_thread.start()
+
+    # The running scan finishes its files first, the manifest then has all of them
+    def stop_watch(self):
+        if self.watch_worker is None:
+            return
+        self.watch_worker.stop_event.set()
+        self.watch_thread.quit()
+        self.watch_thread.wait()
+        self.watch_worker = None
+        self.button_watch.setText("Watch")
+        self.button_watch.setChecked(False)
+        self.output_window.append("Stopped watching.")
+
+    def on_watch_failed(self, message):
+        QMessageBox.critical(self, "Watch Folder", message)
+        self.stop_watch()
+
 if __name__ == "__main__":
+    if METRICS_LOG:
+        log_metrics(METRICS_LOG)
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
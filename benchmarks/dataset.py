@@ -0,0 +1,113 @@
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Deterministic synthetic tables for the benchmarks. The same arguments always give the same
+# data (xlsx files differ only in their timestamps), so numbers from different machines or
+# versions compare like for like:
+#   python benchmarks/dataset.py out/ --rows 100000 --dtypes int,float,str,date --null-ratio 0.1
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Column kinds, the dtype mix is cycled over the columns after the id column: "int,float,str"
+# with 5 columns gives id, int_1, float_2, str_3, int_4
+DTYPES = ("int", "float", "str", "category", "date", "bool")
+DEFAULT_DTYPES = "int,float,str,category,date,bool"
+
+# Words the text columns are built from, so the values look like text rather than noise
+WORDS = ("alpha", "beta", "gamma", "delta", "epsilon", "zeta", "theta", "lambda", "sigma", "omega")
+
+# Formats every dataset is written as, the inputs of the conversion table
+FORMATS = ("csv", "json", "jsonl", "xml", "xlsx")
+
+
+# Row number plus random words, padded or cut to exactly width characters
+def text_column(rng, rows, width):
+    words = np.array(WORDS)
+    text = np.arange(rows).astype(str)
+    for _ in range(width // 6 + 1):
+        text = np.char.add(np.char.add(text, " "), words[rng.integers(0, len(words), rows)])
+    return [value[:width] for value in np.char.ljust(text, width).tolist()]
+
+
+def make_column(kind, rng, rows, string_width):
+    if kind == "int":
+        return rng.integers(-1_000_000, 1_000_000, rows)
+    if kind == "float":
+        return np.round(rng.normal(1000, 250, rows), 3)
+    if kind == "str":
+        return text_column(rng, rows, string_width)
+    if kind == "category":
+        return np.array(WORDS)[rng.integers(0, 4, rows)]
+    if kind == "date":
+        return pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 10**8, rows), unit="s")
+    if kind == "bool":
+        return rng.random(rows) < 0.5
+    raise ValueError(f"Unknown column kind {kind!r}, expected one of {', '.join(DTYPES)}")
+
+
+# Build the table. Column 0 is always a row id without gaps, null_ratio of the cells of every
+# other column are emptied
+def make_frame(rows, columns=6, dtypes=DEFAULT_DTYPES, string_width=16, null_ratio=0.0, seed=0):
+    rng = np.random.default_rng(seed)
+    kinds = [kind.strip() for kind in dtypes.split(",") if kind.strip()]
+    data = {"id": np.arange(rows)}
+    for position in range(1, columns):
+        kind = kinds[(position - 1) % len(kinds)]
+        data[f"{kind}_{position}"] = make_column(kind, rng, rows, string_width)
+    df = pd.DataFrame(data)
+    if null_ratio:
+        for name in df.columns[1:]:
+            df[name] = df[name].mask(rng.random(rows) < null_ratio)
+    return df
+
+
+# Write the table in every input format. Returns {extension: path}
+def write_inputs(df, directory, stem="input", formats=FORMATS):
+    sys.path.insert(0, str(REPO_ROOT))
+    from conversion.excel_engine import write_excel
+    from conversion.xml_engine import write_xml
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    writers = {
+        "csv": lambda path: df.to_csv(path, index=False),
+        "json": lambda path: df.to_json(path),
+        "jsonl": lambda path: df.to_json(path, orient="records", lines=True),
+        "xml": lambda path: write_xml(df, path),
+        "xlsx": lambda path: write_excel(df, path),
+    }
+    files = {}
+    for extension in formats:
+        files[extension] = directory / f"{stem}.{extension}"
+        writers[extension](files[extension])
+    return files
+
+
+def add_dataset_arguments(parser):
+    parser.add_argument("--columns", type=int, default=6, help="columns including the id column (default 6)")
+    parser.add_argument("--dtypes", default=DEFAULT_DTYPES,
+                        help=f"comma separated column kinds cycled over the columns (default {DEFAULT_DTYPES})")
+    parser.add_argument("--string-width", type=int, default=16, help="characters per text value (default 16)")
+    parser.add_argument("--null-ratio", type=float, default=0.0, help="share of empty cells, 0 to 1 (default 0)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default 0)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a deterministic synthetic dataset in every input format.")
+    parser.add_argument("directory", help="directory to write input.csv, input.json, ... into")
+    parser.add_argument("--rows", type=int, default=100_000, help="rows (default 100000)")
+    parser.add_argument("--formats", default=",".join(FORMATS), help="formats to write (default all)")
+    add_dataset_arguments(parser)
+    args = parser.parse_args(argv)
+
+    df = make_frame(args.rows, args.columns, args.dtypes, args.string_width, args.null_ratio, args.seed)
+    for extension, path in write_inputs(df, args.directory, formats=args.formats.split(",")).items():
+        print(f"{path} {path.stat().st_size / 1024**2:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
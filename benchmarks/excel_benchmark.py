@@ -0,0 +1,51 @@
+import argparse
+import tempfile
+from pathlib import Path
+
+from dataset import make_frame, write_inputs
+from suite import run_child
+
+# Compares the pandas Excel path (pd.read_excel / DataFrame.to_excel) with the Excel engine,
+# whole-file and streaming, on a synthetic sheet. Every run is a fresh process so peak memory
+# is measured per run:
+#   python benchmarks/excel_benchmark.py --rows 500000
+
+SETUP = "from conversion import convert, convert_streaming"
+
+CASES = [
+    ("xlsx -> csv", "pandas", "pd.read_excel({input!r}).to_csv({output!r})"),
+    ("xlsx -> csv", "engine", "convert({input!r}, {output!r}, 'xlsx', 'csv')"),
+    ("xlsx -> csv", "streaming", "convert_streaming({input!r}, {output!r}, 'xlsx', 'csv')"),
+    ("csv -> xlsx", "pandas", "pd.read_csv({input!r}).to_excel({output!r})"),
+    ("csv -> xlsx", "engine", "convert({input!r}, {output!r}, 'csv', 'xlsx')"),
+    ("csv -> xlsx", "streaming", "convert_streaming({input!r}, {output!r}, 'csv', 'xlsx')"),
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Excel engine against pandas' Excel path.")
+    parser.add_argument("--rows", type=int, default=200_000, help="rows in the synthetic sheet (default 200000)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        # The usual mix of ints, floats, text, dates and gaps
+        df = make_frame(args.rows, columns=6, dtypes="float,int,category,str,date", null_ratio=0.05)
+        inputs = write_inputs(df, directory, formats=("csv", "xlsx"))
+        del df
+        print(f"{args.rows} rows, xlsx {inputs['xlsx'].stat().st_size / 1024**2:.1f} MB")
+        print(f"{'conversion':<12} {'path':<10} {'seconds':>8} {'peak MB':>8}")
+        baseline = {}
+        for name, path, code in CASES:
+            input_ext, output_ext = name.split(" -> ")
+            code = code.format(input=str(inputs[input_ext]), output=str(directory / f"output.{output_ext}"))
+            result = run_child(code, SETUP)
+            baseline.setdefault(name, result)
+            speedup = baseline[name]["seconds"] / result["seconds"]
+            memory = baseline[name]["peak_mb"] / result["peak_mb"]
+            print(f"{name:<12} {path:<10} {result['seconds']:8.2f} {result['peak_mb']:8.0f}"
+                  f"   x{speedup:.2f} faster, x{memory:.2f} less memory")
+
+
+if __name__ == "__main__":
+    main()
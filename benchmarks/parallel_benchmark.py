@@ -0,0 +1,62 @@
+import argparse
+import os
+import tempfile
+from pathlib import Path
+
+from dataset import make_frame, write_inputs
+from suite import run_child
+
+# Measures how CSV parsing scales over several processes: a whole-file read, a conversion and a
+# streaming conversion, each with 1, 2, 4, ... workers up to the number of cores. The row index is
+# built in the untimed setup, like a file that was previewed or converted before:
+#   python benchmarks/parallel_benchmark.py --rows 2000000
+
+SETUP = ("from conversion import convert, convert_streaming, open_csv_index, read_csv_parallel\n"
+         "open_csv_index({input!r})")
+
+CASES = [
+    ("read_csv", "read_csv_parallel({input!r}, workers={workers})"),
+    ("csv -> json", "convert({input!r}, {output!r}, 'csv', 'json', workers={workers})"),
+    ("csv -> json stream", "convert_streaming({input!r}, {output!r}, 'csv', 'json', workers={workers})"),
+]
+
+
+def worker_counts(cores):
+    counts = [1]
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cores:
+        counts.append(cores)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark parsing CSV input on several cores.")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="rows in the synthetic file (default 1000000)")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1,
+                        help="most worker processes tried (default: every core)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        # The child processes keep their row index in here instead of the user's cache
+        os.environ["DATA_CONVERTER_INDEX_DIR"] = str(directory / "index")
+        df = make_frame(args.rows, columns=6, dtypes="float,int,category,str,date", null_ratio=0.05)
+        inputs = write_inputs(df, directory, formats=("csv",))
+        del df
+        print(f"{args.rows} rows, csv {inputs['csv'].stat().st_size / 1024**2:.1f} MB, {os.cpu_count()} cores")
+        print(f"{'case':<20} {'workers':>7} {'seconds':>8} {'peak MB':>8}")
+        for name, code in CASES:
+            baseline = None
+            for workers in worker_counts(args.max_workers):
+                result = run_child(code.format(input=str(inputs["csv"]), output=str(directory / "output.json"),
+                                               workers=workers),
+                                   SETUP.format(input=str(inputs["csv"])))
+                baseline = baseline or result
+                speedup = baseline["seconds"] / result["seconds"]
+                print(f"{name:<20} {workers:>7} {result['seconds']:8.2f} {result['peak_mb']:8.0f}"
+                      f"   x{speedup:.2f} faster, {speedup / workers:.0%} efficiency")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from dataset import FORMATS, add_dataset_arguments, make_frame, write_inputs
+
+# Benchmark suite: every pair of the conversion table, the GUI's file preview and the column
+# statistics, on synthetic datasets of several sizes. Every case runs in a fresh process, so the
+# peak memory of one case is not hidden by an earlier one. Runs offline, results are JSON:
+#   python benchmarks/suite.py run --sizes 1000,100000 --output after.json
+#   python benchmarks/suite.py compare before.json after.json
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_SIZES = "1000,10000,100000"
+
+# A case is a regression when it got this much slower or bigger than the baseline
+TIME_THRESHOLD = 0.25
+MEMORY_THRESHOLD = 0.15
+
+# Cases faster than this are mostly process noise, their times are not compared
+MIN_COMPARED_SECONDS = 0.05
+
+# Runs inside the child process. {setup} imports what the case needs and is not timed, {code} is.
+# Peak RSS covers both, setup_mb is the peak before the timed code. ru_maxrss is in kilobytes on Linux
+CHILD = """
+import json, resource, sys, time, warnings
+warnings.filterwarnings("ignore")
+sys.path.insert(0, {root!r})
+import pandas as pd
+{setup}
+setup_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+start = time.perf_counter()
+{code}
+seconds = time.perf_counter() - start
+peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps({{"seconds": seconds, "peak_mb": peak_mb, "setup_mb": setup_mb}}))
+"""
+
+# Same steps as read_file_data in the FreeSimpleGUI front end: the first 100 rows, rendered as text
+PREVIEW_SETUP = {
+    "csv": "from conversion.dialect import detect_dialect",
+    "other": "from conversion.preview import open_preview",
+}
+PREVIEW_CODE = {
+    "csv": "pd.read_csv({input!r}, nrows=100, **detect_dialect({input!r}).read_csv_kwargs()).to_string()",
+    "other": ("source = open_preview({input!r})\n"
+              "pd.DataFrame(source.rows(0, 100), columns=source.columns).to_string()\n"
+              "source.close()"),
+}
+PREVIEW_ROWS = 100
+
+
+class Case:
+    def __init__(self, kind, name, setup, code, input_ext, output_ext=None, rows=None):
+        self.kind = kind
+        self.name = name
+        self.setup = setup
+        self.code = code
+        self.input_ext = input_ext
+        self.output_ext = output_ext
+        self.rows = rows
+
+
+# Every case for one dataset size, in a stable order
+def build_cases(rows, statistics_column, streaming=False):
+    sys.path.insert(0, str(REPO_ROOT))
+    from conversion.converter import CONVERSION_FUNCTIONS
+    from conversion.statistics import COLUMN_READERS
+    from conversion.streaming import CHUNK_READERS
+
+    cases = []
+    for input_ext, output_ext in sorted(CONVERSION_FUNCTIONS):
+        name = f"{input_ext} -> {output_ext}"
+        arguments = f"{{input!r}}, {{output!r}}, {input_ext!r}, {output_ext!r}"
+        # The table imports the reader and writer modules on first lookup, done before timing
+        setup = (f"from conversion.converter import CONVERSION_FUNCTIONS, convert\n"
+                 f"CONVERSION_FUNCTIONS[{input_ext!r}, {output_ext!r}]")
+        cases.append(Case("convert", name, setup, f"convert({arguments})", input_ext, output_ext, rows))
+        if streaming and input_ext in CHUNK_READERS:
+            cases.append(Case("stream", name, f"{setup}\nfrom conversion.streaming import convert_streaming",
+                              f"convert_streaming({arguments})", input_ext, output_ext, rows))
+    for input_ext in FORMATS:
+        setup = PREVIEW_SETUP.get(input_ext, PREVIEW_SETUP["other"])
+        code = PREVIEW_CODE.get(input_ext, PREVIEW_CODE["other"])
+        cases.append(Case("preview", input_ext, setup, code, input_ext, rows=min(rows, PREVIEW_ROWS)))
+    for input_ext in sorted(COLUMN_READERS):
+        cases.append(Case("statistics", input_ext, "from conversion.statistics import column_statistics",
+                          f"column_statistics({{input!r}}, {statistics_column!r})", input_ext, rows=rows))
+    return cases
+
+
+def run_child(code, setup=""):
+    script = CHILD.format(root=str(REPO_ROOT), setup=setup, code=code)
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "benchmark failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+# Run one case `repeat` times and keep the best run, the least disturbed by the rest of the machine
+def run_case(case, inputs, directory, repeat=1):
+    output_file = directory / f"output.{case.output_ext}"
+    code = case.code.format(input=str(inputs[case.input_ext]), output=str(output_file))
+    runs = []
+    for _ in range(repeat):
+        runs.append(run_child(code, case.setup))
+        output_file.unlink(missing_ok=True)
+    seconds = min(run["seconds"] for run in runs)
+    return {
+        "kind": case.kind,
+        "case": case.name,
+        "rows": case.rows,
+        "seconds": round(seconds, 6),
+        "rows_per_second": round(case.rows / seconds) if seconds else None,
+        "peak_rss_mb": round(min(run["peak_mb"] for run in runs), 1),
+        "setup_rss_mb": round(min(run["setup_mb"] for run in runs), 1),
+    }
+
+
+def case_key(result, size):
+    return f"{result['kind']} {result['case']} @{size}"
+
+
+def package_versions():
+    versions = {}
+    for package in ("pandas", "numpy", "lxml", "openpyxl", "tabulate"):
+        try:
+            versions[package] = __import__(package).__version__
+        except (ImportError, AttributeError):
+            versions[package] = None
+    return versions
+
+
+def print_result(size, result):
+    rate = f"{result['rows_per_second']:,}" if result["rows_per_second"] is not None else "-"
+    print(f"{size:>9} {result['kind']:<10} {result['case']:<14} {result['seconds']:9.3f} {rate:>13} "
+          f"{result['peak_rss_mb']:9.1f}", flush=True)
+
+
+def run(args):
+    sizes = [int(size) for size in args.sizes.split(",")]
+    cases_filter = args.only.split(",") if args.only else None
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "packages": package_versions(),
+        "dataset": {"columns": args.columns, "dtypes": args.dtypes, "string_width": args.string_width,
+                    "null_ratio": args.null_ratio, "seed": args.seed},
+        "repeat": args.repeat,
+        "results": {},
+    }
+
+    print(f"{'rows':>9} {'kind':<10} {'case':<14} {'seconds':>9} {'rows/s':>13} {'peak MB':>9}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            directory = Path(directory)
+            df = make_frame(size, args.columns, args.dtypes, args.string_width, args.null_ratio, args.seed)
+            inputs = write_inputs(df, directory)
+            numeric = [name for name in df.columns[1:] if df[name].dtype.kind in "if"]
+            statistics_column = numeric[0] if numeric else "id"
+            del df
+
+            for case in build_cases(size, statistics_column, args.streaming):
+                if cases_filter and case.kind not in cases_filter and case.input_ext not in cases_filter:
+                    continue
+                try:
+                    result = run_case(case, inputs, directory, args.repeat)
+                except RuntimeError as e:
+                    print(f"{size:>9} {case.kind:<10} {case.name:<14} FAILED: {e}", flush=True)
+                    continue
+                report["results"][case_key(result, size)] = result
+                print_result(size, result)
+
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"Results written to {args.output}")
+
+
+# Compare two result files, returns the number of regressions
+def compare_reports(baseline, current, time_threshold=TIME_THRESHOLD, memory_threshold=MEMORY_THRESHOLD):
+    if baseline.get("dataset") != current.get("dataset"):
+        print("Warning: the results were measured on different datasets")
+
+    regressions = 0
+    print(f"{'case':<34} {'seconds':>17} {'time':>7} {'peak MB':>15} {'memory':>7}")
+    for key, new in current["results"].items():
+        old = baseline["results"].get(key)
+        if old is None:
+            print(f"{key:<34} new case")
+            continue
+        time_ratio = new["seconds"] / old["seconds"] if old["seconds"] else 1.0
+        memory_ratio = new["peak_rss_mb"] / old["peak_rss_mb"] if old["peak_rss_mb"] else 1.0
+        flags = []
+        if time_ratio > 1 + time_threshold and max(old["seconds"], new["seconds"]) >= MIN_COMPARED_SECONDS:
+            flags.append("SLOWER")
+        if memory_ratio > 1 + memory_threshold:
+            flags.append("MORE MEMORY")
+        regressions += bool(flags)
+        print(f"{key:<34} {old['seconds']:8.3f}{new['seconds']:9.3f} {time_ratio:6.2f}x "
+              f"{old['peak_rss_mb']:7.0f}{new['peak_rss_mb']:8.0f} {memory_ratio:6.2f}x  {' '.join(flags)}")
+    for key in baseline["results"].keys() - current["results"].keys():
+        print(f"{key:<34} missing from the new results")
+
+    print(f"{regressions} regression(s)" if regressions else "No regressions")
+    return regressions
+
+
+def compare(args):
+    baseline = json.loads(Path(args.baseline).read_text())
+    current = json.loads(Path(args.current).read_text())
+    return 1 if compare_reports(baseline, current, args.time_threshold, args.memory_threshold) else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the conversion engine.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks and save the results as JSON")
+    run_parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"dataset sizes in rows (default {DEFAULT_SIZES})")
+    run_parser.add_argument("--output", default="benchmark_results.json", help="results file to write")
+    run_parser.add_argument("--repeat", type=int, default=1, help="runs per case, the best one is kept (default 1)")
+    run_parser.add_argument("--streaming", action="store_true", help="also run streaming mode where it is supported")
+    run_parser.add_argument("--only", help="comma separated case kinds or input formats to run, e.g. convert,csv")
+    add_dataset_arguments(run_parser)
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser("compare", help="flag regressions against a baseline results file")
+    compare_parser.add_argument("baseline", help="results file to compare against")
+    compare_parser.add_argument("current", help="new results file")
+    compare_parser.add_argument("--time-threshold", type=float, default=TIME_THRESHOLD,
+                                help=f"allowed slowdown, 0.25 = 25%% (default {TIME_THRESHOLD})")
+    compare_parser.add_argument("--memory-threshold", type=float, default=MEMORY_THRESHOLD,
+                                help=f"allowed peak memory growth (default {MEMORY_THRESHOLD})")
+    compare_parser.set_defaults(func=compare)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
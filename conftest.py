@@ -0,0 +1,10 @@
+# Lets pytest import the conversion package from the repository root: python -m pytest tests
+import pytest
+
+
+# CSV row indexes (see conversion/csv_index.py) of test files go to the test's own directory
+# instead of the user's cache
+@pytest.fixture(autouse=True)
+def index_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATA_CONVERTER_INDEX_DIR", str(tmp_path / "csv_index"))
+    return tmp_path / "csv_index"
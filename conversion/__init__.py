@@ -0,0 +1,105 @@
+from importlib import import_module
+
+# Public names and the submodule that defines them. Submodules are imported on first access,
+# so "import conversion" stays cheap and pandas is only loaded by the code paths that need it
+_EXPORTS = {
+    "BatchJob": "batch",
+    "BatchResult": "batch",
+    "BatchSummary": "batch",
+    "convert_batch": "batch",
+    "convert_to_archive": "batch",
+    "plan_batch": "batch",
+    "CHUNK_ROWS": "chunking",
+    "ChunkWriter": "chunking",
+    "PagedWriter": "chunking",
+    "CompactSchema": "compact",
+    "compact_dtypes": "compact",
+    "compact_frame": "compact",
+    "ArchiveWriter": "compression",
+    "file_format": "compression",
+    "open_input": "compression",
+    "open_output": "compression",
+    "output_path": "compression",
+    "split_suffix": "compression",
+    "CONVERSION_FUNCTIONS": "converter",
+    "convert": "converter",
+    "CsvRowIndex": "csv_index",
+    "open_csv_index": "csv_index",
+    "scan_csv": "csv_index",
+    "get_conversion_functions": "converter",
+    "read_kwargs": "converter",
+    "CsvDialect": "dialect",
+    "clear_dialect_cache": "dialect",
+    "detect_dialect": "dialect",
+    "ExcelStreamWriter": "excel_engine",
+    "convert_all_sheets": "excel_engine",
+    "read_excel": "excel_engine",
+    "read_excel_chunks": "excel_engine",
+    "sheet_names": "excel_engine",
+    "write_excel": "excel_engine",
+    "FanoutResult": "fanout",
+    "WriterTiming": "fanout",
+    "convert_fanout": "fanout",
+    "HtmlStreamWriter": "html_engine",
+    "write_html": "html_engine",
+    "JsonLinesWriter": "json_engine",
+    "iter_json_array": "json_engine",
+    "read_json": "json_engine",
+    "read_json_chunks": "json_engine",
+    "read_jsonl": "json_engine",
+    "read_jsonl_chunks": "json_engine",
+    "write_jsonl": "json_engine",
+    "MarkdownLayout": "markdown_engine",
+    "MarkdownStreamWriter": "markdown_engine",
+    "write_markdown": "markdown_engine",
+    "ConversionMetrics": "metrics",
+    "add_metrics_hook": "metrics",
+    "format_metrics": "metrics",
+    "log_metrics": "metrics",
+    "remove_metrics_hook": "metrics",
+    "read_csv_chunks_parallel": "parallel_csv",
+    "ConversionPlan": "planner",
+    "format_plan": "planner",
+    "plan_conversion": "planner",
+    "run_plan": "planner",
+    "read_csv_parallel": "parallel_csv",
+    "CsvPreviewSource": "preview",
+    "PreviewSource": "preview",
+    "RecordPreviewSource": "preview",
+    "open_preview": "preview",
+    "ConversionCancelled": "progress",
+    "ConversionProgress": "progress",
+    "ProgressTracker": "progress",
+    "format_progress": "progress",
+    "Selection": "selection",
+    "ColumnStatistics": "statistics",
+    "clear_statistics_cache": "statistics",
+    "column_statistics": "statistics",
+    "STREAMING_WRITERS": "streaming",
+    "convert_streaming": "streaming",
+    "prepare_for_output": "transforms",
+    "sanitize_xml_columns": "transforms",
+    "xml_element_names": "transforms",
+    "XmlStreamWriter": "xml_engine",
+    "iter_xml_records": "xml_engine",
+    "read_xml": "xml_engine",
+    "read_xml_chunks": "xml_engine",
+    "write_xml": "xml_engine",
+    "FolderWatcher": "watch",
+    "Manifest": "watch",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
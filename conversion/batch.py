@@ -0,0 +1,175 @@
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import NamedTuple
+
+from .compression import ArchiveWriter, compression_of, file_format, output_path
+from .converter import CONVERSION_FUNCTIONS
+
+
+class BatchJob(NamedTuple):
+    input_file: str
+    output_file: str
+    input_ext: str
+    output_ext: str
+
+
+class BatchResult(NamedTuple):
+    job: BatchJob
+    ok: bool
+    error: str
+    seconds: float
+    input_bytes: int
+
+
+class BatchSummary(NamedTuple):
+    files: int
+    failed: int
+    seconds: float
+    input_bytes: int
+
+    @property
+    def files_per_second(self):
+        return self.files / self.seconds if self.seconds else 0.0
+
+    @property
+    def mb_per_second(self):
+        return self.input_bytes / 1024**2 / self.seconds if self.seconds else 0.0
+
+
+# Expand the selected files and directories (recursively) into one job per convertible file.
+# Outputs go next to their input unless an output directory is given. Compressed inputs
+# ("data.csv.gz") are included, compression ("gzip", "bz2", "xz", "zstd" or "zip") compresses the outputs
+def plan_batch(paths, output_ext, output_dir=None, compression=None):
+    jobs = []
+    inputs = {}
+    for path in map(Path, paths):
+        files = sorted(file for file in path.rglob("*") if file.is_file()) if path.is_dir() else [path]
+        for file in files:
+            input_ext = file_format(file)
+            # A file selected on its own and in its folder is converted once
+            if (input_ext, output_ext) not in CONVERSION_FUNCTIONS or file.resolve() in inputs:
+                continue
+            inputs[file.resolve()] = str(file)
+            output_file = Path(output_path(file, output_ext, compression, output_dir))
+            # Never let a same-format conversion overwrite its own input
+            if output_file.resolve() == file.resolve():
+                continue
+            jobs.append(BatchJob(str(file), str(output_file), input_ext, output_ext))
+
+    # Inputs that only differ in their format ("data.json" and "data.xml") would be written to the
+    # same output, or over an input already in the output format: those outputs keep the input's
+    # suffix, "data.json.csv" and "data.xml.csv"
+    outputs = Counter(outputs_of(jobs))
+    jobs = [job if outputs[output_file] == 1 and output_file not in inputs
+            else job._replace(output_file=source_output_path(job.input_file, output_ext, compression, output_dir))
+            for job, output_file in zip(jobs, outputs_of(jobs))]
+    check_outputs(jobs, inputs)
+    return jobs
+
+
+# Resolved output paths of the jobs, in job order
+def outputs_of(jobs):
+    return [Path(job.output_file).resolve() for job in jobs]
+
+
+# Output path that keeps the input's format suffix, compression suffixes are dropped:
+# "dir/data.json.gz" -> "dir/data.json.csv"
+def source_output_path(input_file, output_ext, compression=None, output_dir=None):
+    name = Path(input_file).name
+    if compression_of(input_file) is not None:
+        name = Path(name).stem
+    return output_path(Path(input_file).with_name(f"{name}.{output_ext}"), output_ext, compression, output_dir)
+
+
+# Every job needs an output of its own that is none of the inputs. What is left after plan_batch's
+# renaming (same file names in several folders with one output directory, "data.csv" next to
+# "data.csv.gz") is an error before anything is converted. inputs maps the resolved input paths
+# to the paths as selected
+def check_outputs(jobs, inputs):
+    writers = {}
+    for job, output_file in zip(jobs, outputs_of(jobs)):
+        if output_file in writers:
+            raise ValueError(f"{writers[output_file]} and {job.input_file} would both be written to {job.output_file}")
+        if output_file in inputs:
+            raise ValueError(f"The output of {job.input_file} would overwrite {inputs[output_file]}")
+        writers[output_file] = job.input_file
+
+
+# Runs inside a worker process, any failure is reported back instead of raised so one bad
+# file never takes down the rest of the batch. output is a path or an open handle to write to
+# instead of the job's output file. streaming="auto" lets plan_conversion pick the mode of every
+# file, on one core per file since the batch runs files side by side already
+def run_job(job, streaming=False, output=None):
+    from .converter import convert
+    from .streaming import convert_streaming
+
+    start = time.perf_counter()
+    try:
+        input_bytes = os.path.getsize(job.input_file)
+        if output is None:
+            Path(job.output_file).parent.mkdir(parents=True, exist_ok=True)
+        output_file = job.output_file if output is None else output
+        if streaming == "auto":
+            from .planner import plan_conversion, run_plan
+            plan = plan_conversion(job.input_file, job.output_file, job.input_ext, job.output_ext)
+            run_plan(plan._replace(workers=1), output_file)
+        else:
+            conversion = convert_streaming if streaming else convert
+            conversion(job.input_file, output_file, job.input_ext, job.output_ext)
+        return BatchResult(job, True, "", time.perf_counter() - start, input_bytes)
+    except Exception as e:
+        return BatchResult(job, False, f"{type(e).__name__}: {e}", time.perf_counter() - start, 0)
+
+
+# Convert all jobs on a process pool sized to the machine's cores. on_result is called in the
+# calling process for every finished file, in completion order
+def convert_batch(jobs, workers=None, streaming=False, on_result=None):
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    failed = 0
+    input_bytes = 0
+    with ProcessPoolExecutor(max_workers=min(workers, max(len(jobs), 1))) as executor:
+        futures = [executor.submit(run_job, job, streaming) for job in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            failed += not result.ok
+            input_bytes += result.input_bytes
+            if on_result is not None:
+                on_result(result)
+    return BatchSummary(len(jobs), failed, time.perf_counter() - start, input_bytes)
+
+
+# Convert all jobs into a single zip archive. Each output is named by its path below the folder
+# that holds all outputs ("a/data.csv", "b/data.csv"), so outputs of different folders keep
+# apart. A zip archive is written front to back, so the files are converted one after another,
+# each into a temporary file next to the archive that becomes a member once the conversion
+# succeeded: a failed file leaves nothing in the archive
+def convert_to_archive(jobs, archive_file, streaming=False, on_result=None):
+    start = time.perf_counter()
+    failed = 0
+    input_bytes = 0
+    Path(archive_file).parent.mkdir(parents=True, exist_ok=True)
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(job.output_file)) for job in jobs]) if jobs else ""
+    with ArchiveWriter(archive_file) as archive, tempfile.TemporaryDirectory(dir=Path(archive_file).parent) as spool:
+        for job in jobs:
+            output_file = Path(spool) / Path(job.output_file).name
+            result = run_job(job, streaming, str(output_file))
+            if result.ok:
+                with open(output_file, "rb") as source, archive.add(member_name(job, root)) as member:
+                    shutil.copyfileobj(source, member)
+            output_file.unlink(missing_ok=True)
+            failed += not result.ok
+            input_bytes += result.input_bytes
+            if on_result is not None:
+                on_result(result)
+    return BatchSummary(len(jobs), failed, time.perf_counter() - start, input_bytes)
+
+
+# Archive member of a job's output, its path below root with "/" separators
+def member_name(job, root):
+    return Path(os.path.relpath(os.path.abspath(job.output_file), root)).as_posix()
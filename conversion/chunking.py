@@ -0,0 +1,190 @@
+import abc
+import queue
+import threading
+from pathlib import Path
+
+from .compression import base_name, open_output
+from .progress import remove_partial_output
+
+# Rows per chunk in streaming mode, peak memory scales with this and not with the file size
+CHUNK_ROWS = 50_000
+
+# Chunks read ahead while the previous one is being written
+PREFETCH_CHUNKS = 2
+
+
+# Slices of a whole DataFrame for writers that work chunk by chunk, an empty frame is one empty slice
+def frame_slices(df, rows=CHUNK_ROWS):
+    for start in range(0, max(len(df), 1), rows):
+        yield df.iloc[start:start + rows]
+
+
+# Collects the few real rows that decide column-wide formatting (widths, decimals, notation),
+# so every chunk can be formatted exactly like the whole table would be
+class LayoutRows:
+    def __init__(self, pick_positions):
+        self.pick_positions = pick_positions
+        self.rows = None
+
+    def update(self, chunk):
+        import pandas as pd
+
+        frame = chunk if self.rows is None else pd.concat([self.rows, chunk])
+        if frame.empty:
+            self.rows = frame
+            return
+        positions = sorted(set(int(position) for position in self.pick_positions(frame)))
+        self.rows = frame.iloc[positions]
+
+    def layout(self):
+        return self.rows
+
+
+# Base class for the streaming writers of every format: write() receives the chunks in order,
+# close() finishes the file
+class ChunkWriter(abc.ABC):
+    layout_positions = None
+
+    # What the schema pass feeds every chunk into so the writer can format a chunk like the whole
+    # table, its layout() is handed to the writer. None when values are formatted one by one.
+    # options are the writer's own options
+    @classmethod
+    def layout_collector(cls, **options):
+        return LayoutRows(cls.layout_positions) if cls.layout_positions else None
+
+    def __init__(self, output_file, layout_rows=None):
+        self.output_file = output_file
+        self.layout_rows = layout_rows
+        self.rows_written = 0
+
+    @abc.abstractmethod
+    def write(self, chunk):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # Format the chunk together with the layout rows and return the layout rows count to drop
+    def with_layout_rows(self, chunk):
+        import pandas as pd
+
+        if self.layout_rows is None or self.layout_rows.empty:
+            return chunk, 0
+        return pd.concat([chunk, self.layout_rows]), len(self.layout_rows)
+
+
+# Output file of a page after the first: "data.md" -> "data_2.md", "data.md.gz" -> "data_2.md.gz"
+def page_output_file(output_file, page):
+    path = Path(output_file)
+    base = base_name(path)
+    return str(path.with_name(f"{base}_{page}{path.name[len(base):]}"))
+
+
+# Base class for writers whose output can be split into pages of page_rows rows, every page a
+# complete document in a file of its own. The first page is the output file itself
+class PagedWriter(ChunkWriter):
+    def __init__(self, output_file, layout_rows=None, page_rows=None):
+        super().__init__(output_file, layout_rows)
+        if page_rows is not None and page_rows < 1:
+            raise ValueError("Pages need at least one row")
+        if page_rows and hasattr(output_file, "write"):
+            raise ValueError("Pages can only be written to files, not into an open handle")
+        self.page_rows = page_rows
+        self.page_files = []
+        self.page_space = 0
+        self.file = None
+
+    # Text every page starts and ends with
+    def page_head(self):
+        return ""
+
+    def page_tail(self):
+        return ""
+
+    def open_page(self):
+        page_file = page_output_file(self.output_file, len(self.page_files) + 1) if self.page_files else self.output_file
+        self.file = open_output(page_file, "w", encoding="utf-8")
+        self.page_files.append(page_file)
+        self.page_space = self.page_rows or 0
+
+    def close_page(self):
+        try:
+            self.file.write(self.page_tail())
+        finally:
+            self.file.close()
+
+    # Write rendered rows, a new page is started whenever the current one is full
+    def write_rows(self, rows):
+        start = 0
+        while start < len(rows):
+            if self.file is None or (self.page_rows and not self.page_space):
+                if self.file is not None:
+                    self.close_page()
+                self.open_page()
+                self.file.write(self.page_head())
+            end = min(len(rows), start + self.page_space) if self.page_rows else len(rows)
+            self.file.write("".join(rows[start:end]))
+            self.page_space -= end - start
+            start = end
+
+    def close(self):
+        # A table without rows is still written, as a page without rows
+        if self.file is None:
+            self.open_page()
+            self.file.write(self.page_head())
+        if not self.file.closed:
+            self.close_page()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self.close()
+        finally:
+            # The first page is removed by the conversion like any other output
+            if exc_type is not None:
+                for page_file in self.page_files[1:]:
+                    remove_partial_output(page_file)
+
+
+_DONE = object()
+
+
+# Run a chunk iterator on a background thread so parsing the next chunk overlaps with writing
+# the current one. At most `depth` chunks wait in the queue, memory stays bounded
+def prefetch(chunks, depth=PREFETCH_CHUNKS):
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for chunk in chunks:
+                if stop.is_set():
+                    return
+                buffer.put(chunk)
+            buffer.put(_DONE)
+        except BaseException as e:
+            buffer.put(e)
+
+    thread = threading.Thread(target=produce, name="chunk-prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # Unblock the producer if the consumer stopped early
+        stop.set()
+        while thread.is_alive():
+            try:
+                buffer.get_nowait()
+            except queue.Empty:
+                thread.join(0.05)
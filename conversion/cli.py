@@ -0,0 +1,302 @@
+import argparse
+import sys
+from pathlib import Path
+
+from .compression import base_name, file_format
+
+# Only the standard library is imported up here (compression.py uses nothing else), pandas and the
+# engine modules are imported by the command that needs them, which keeps short-lived pipeline jobs
+# fast to start
+
+
+# Format of a file from its suffix, compression suffixes are skipped: "data.csv.gz" -> "csv"
+def extension(path):
+    return file_format(path)
+
+
+# Reader options given on the command line, only passed on for the input format they belong to
+def read_options(args, input_ext):
+    if args.xml_record and input_ext == "xml":
+        return {"record": args.xml_record}
+    if args.sheet is not None and input_ext == "xlsx":
+        return {"sheet": args.sheet}
+    if args.orjson and input_ext in ("json", "jsonl"):
+        return {"parser": "orjson"}
+    return {}
+
+
+# Writer options given on the command line, only passed on for the output format they belong to
+def write_options(args, output_ext):
+    options = {}
+    if args.page_rows is not None and output_ext in ("html", "md"):
+        options["page_rows"] = args.page_rows
+    if args.no_padding and output_ext == "md":
+        options["padded"] = False
+    return options
+
+
+# Columns and row filter given on the command line, None when every row and column is kept
+def selection(args):
+    from .selection import Selection
+    return Selection.parse(args.columns, args.where) or None
+
+
+# Sheets are picked by position when given as a number, by name otherwise
+def sheet(value):
+    return int(value) if value.isdigit() else value
+
+
+# Progress line on stderr, rewritten in place after every chunk
+def print_progress(progress):
+    from .progress import format_progress
+    print(f"\r{format_progress(progress)}   ", end="", file=sys.stderr, flush=True)
+
+
+def run_convert(args):
+    if not (args.metrics or args.metrics_log):
+        return convert_files(args)
+
+    from .metrics import add_metrics_hook, format_metrics, log_metrics, remove_metrics_hook
+    collected = []
+    hooks = [add_metrics_hook(collected.append)] if args.metrics else []
+    if args.metrics_log:
+        hooks.append(log_metrics(args.metrics_log))
+    try:
+        return convert_files(args)
+    finally:
+        for hook in hooks:
+            remove_metrics_hook(hook)
+        # Printed after the conversion so the summary doesn't mix with the progress line
+        for metrics in collected:
+            print(format_metrics(metrics), file=sys.stderr)
+
+
+def convert_files(args):
+    if len(args.output_files) > 1:
+        return run_fanout(args)
+    args.output_file = args.output_files[0]
+    input_ext = args.input_ext or extension(args.input_file)
+    output_ext = args.output_ext or extension(args.output_file)
+
+    from .converter import CONVERSION_FUNCTIONS
+    if (input_ext, output_ext) not in CONVERSION_FUNCTIONS:
+        raise ValueError(f"Unsupported conversion: {input_ext.upper()} to {output_ext.upper()}")
+
+    if args.all_sheets:
+        return run_all_sheets(args, input_ext, output_ext)
+
+    options = {"on_progress": print_progress} if args.progress else {}
+    if selection(args):
+        options["selection"] = selection(args)
+    if args.compact:
+        options["compact"] = True
+    if write_options(args, output_ext):
+        options["write_options"] = write_options(args, output_ext)
+    if args.auto or args.dry_run:
+        return run_planned(args, input_ext, output_ext, options)
+    if args.workers is not None:
+        options["workers"] = args.workers
+    if args.stream:
+        from .streaming import convert_streaming
+        if args.chunksize:
+            options["chunksize"] = args.chunksize
+        convert_streaming(args.input_file, args.output_file, input_ext, output_ext,
+                          read_options=read_options(args, input_ext), **options)
+    else:
+        from .converter import convert
+        convert(args.input_file, args.output_file, input_ext, output_ext, read_options(args, input_ext), **options)
+    if args.progress:
+        print(file=sys.stderr)
+
+    print_success(args, input_ext, output_ext)
+    return 0
+
+
+def print_success(args, input_ext, output_ext):
+    if not args.quiet:
+        print(f"Successfully converted {base_name(args.input_file)} {input_ext.upper()} to {base_name(args.output_file)} {output_ext.upper()}")
+
+
+# Mode, workers and engines picked by the planner from the input, --stream, --workers and
+# --chunksize still override its choice. --dry-run prints the plan and converts nothing
+def run_planned(args, input_ext, output_ext, options):
+    from .planner import format_plan, plan_conversion, run_plan
+    plan = plan_conversion(args.input_file, args.output_file, input_ext, output_ext, read_options(args, input_ext),
+                           options.get("selection"), args.pyarrow)
+    if args.stream:
+        plan = plan._replace(mode="stream", reasons=[*plan.reasons, "--stream given: streaming in chunks"])
+    if args.workers is not None:
+        plan = plan._replace(workers=args.workers, reasons=[*plan.reasons, f"--workers {args.workers} given"])
+    if args.chunksize:
+        plan = plan._replace(chunksize=args.chunksize)
+    if args.dry_run:
+        print(format_plan(plan))
+        return 0
+    run_plan(plan, **options)
+    if args.progress:
+        print(file=sys.stderr)
+    print_success(args, input_ext, output_ext)
+    return 0
+
+
+# Every sheet of a workbook into its own file named after the sheet
+def run_all_sheets(args, input_ext, output_ext):
+    if input_ext != "xlsx":
+        raise ValueError("--all-sheets only works with XLSX input files")
+    if selection(args):
+        raise ValueError("--columns and --where don't work with --all-sheets")
+    if args.auto or args.dry_run:
+        raise ValueError("--auto and --dry-run don't work with --all-sheets")
+
+    from .excel_engine import convert_all_sheets
+    options = {"chunksize": args.chunksize} if args.chunksize else {}
+    output_files = convert_all_sheets(args.input_file, args.output_file, output_ext, args.stream, **options)
+
+    if not args.quiet:
+        for output_file in output_files:
+            print(f"Successfully converted {Path(args.input_file).stem} XLSX to {Path(output_file).stem} {output_ext.upper()}")
+    return 0
+
+
+# Several outputs: parse the input once and write all formats concurrently
+def run_fanout(args):
+    if args.stream or args.output_ext or args.all_sheets or args.auto or args.dry_run:
+        raise ValueError("--stream, --to, --all-sheets, --auto and --dry-run only work with a single output file")
+
+    from .fanout import convert_fanout
+    input_ext = args.input_ext or extension(args.input_file)
+    result = convert_fanout(args.input_file, args.output_files, args.input_ext, read_options(args, input_ext),
+                            compact=args.compact, workers=1 if args.workers is None else args.workers,
+                            selection=selection(args))
+
+    if not args.quiet:
+        print(f"Read {Path(args.input_file).name} in {result.read_seconds:.2f}s")
+        for writer in result.writers:
+            status = "OK" if writer.ok else f"FAILED ({writer.error})"
+            print(f"  {writer.output_ext:<5} {writer.seconds:7.2f}s  {writer.mode:<7} {writer.output_file}  {status}")
+        print(f"Total {result.total_seconds:.2f}s")
+    return 0 if all(writer.ok for writer in result.writers) else 1
+
+
+# Convert new and changed files of a folder, once or until interrupted
+def run_watch(args):
+    from .compression import COMPRESSIONS
+    from .converter import CONVERSION_FUNCTIONS
+    from .watch import FolderWatcher
+
+    output_exts = {output_ext for _, output_ext in CONVERSION_FUNCTIONS}
+    unknown = [output_ext for output_ext in args.to if output_ext not in output_exts]
+    if unknown:
+        raise ValueError(f"Unsupported output format: {', '.join(unknown)}")
+    if not Path(args.input_dir).is_dir():
+        raise ValueError(f"Not a directory: {args.input_dir}")
+
+    streaming = "auto" if args.auto else args.stream
+    watcher = FolderWatcher(args.input_dir, args.output_dir, args.to, COMPRESSIONS.get(args.compress), streaming,
+                            args.jobs, args.manifest, args.settle)
+
+    def print_result(result):
+        if args.quiet and result.ok:
+            return
+        status = "OK" if result.ok else f"FAILED ({result.error})"
+        print(f"{result.job.input_file} -> {result.job.output_file}  {result.seconds:.2f}s  {status}", flush=True)
+
+    if args.once:
+        summary = watcher.run_once(print_result)
+        return 1 if summary.failed else 0
+    try:
+        watcher.watch(interval=args.interval, on_result=print_result)
+    except KeyboardInterrupt:
+        watcher.manifest.save()
+    return 0
+
+
+def run_list(args):
+    from .converter import CONVERSION_FUNCTIONS
+    for input_ext, output_ext in CONVERSION_FUNCTIONS:
+        print(f"{input_ext} -> {output_ext}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m conversion", description="Convert data files without the GUI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = commands.add_parser("convert", help="convert a single file")
+    convert_parser.add_argument("input_file", help="input file, .gz, .bz2, .xz, .zst and .zip files are decompressed on the fly")
+    convert_parser.add_argument("output_files", nargs="+", metavar="output_file",
+                                help="one or more output files, several outputs share a single read of the input. "
+                                     "A compression suffix compresses the output, e.g. out.csv.gz")
+    convert_parser.add_argument("--from", dest="input_ext", help="input format, taken from the file suffix by default")
+    convert_parser.add_argument("--to", dest="output_ext", help="output format, taken from the file suffix by default")
+    convert_parser.add_argument("--stream", action="store_true", help="read and write in chunks to keep memory flat")
+    convert_parser.add_argument("--auto", action="store_true",
+                                help="pick whole-file or streaming mode, workers and reader engines from the input's "
+                                     "size and columns")
+    convert_parser.add_argument("--dry-run", action="store_true",
+                                help="print the plan --auto would follow and why, convert nothing")
+    convert_parser.add_argument("--pyarrow", action="store_true",
+                                help="with --auto, parse CSV with the pyarrow engine where it can (types may differ)")
+    convert_parser.add_argument("--chunksize", type=int, help="rows per chunk in streaming mode (default 50000)")
+    convert_parser.add_argument("--compact", action="store_true",
+                                help="keep the data in the smallest dtypes that give the same output, uses less memory")
+    convert_parser.add_argument("--workers", type=int, metavar="N",
+                                help="parse CSV input on N processes, 0 uses every core (default 1)")
+    convert_parser.add_argument("--xml-record", metavar="XPATH",
+                                help="XML elements that hold one row each: './*' (default), '/root/item' or '//item'")
+    convert_parser.add_argument("--sheet", type=sheet, help="XLSX sheet to read, by name or position (default: the first)")
+    convert_parser.add_argument("--orjson", action="store_true",
+                                help="parse JSON with orjson, faster but the last digit of a float may differ from pandas")
+    convert_parser.add_argument("--columns", metavar="NAMES",
+                                help="keep only these columns, in this order: --columns 'id,name,price'. The other "
+                                     "columns of CSV, XLSX and XML input are never parsed, those of JSON are dropped "
+                                     "before they are typed")
+    convert_parser.add_argument("--where", metavar="EXPR",
+                                help="keep only the rows matching a pandas query expression: --where 'price > 10 and "
+                                     "country == \"DE\"', names with spaces in `backticks`")
+    convert_parser.add_argument("--page-rows", type=int, metavar="N",
+                                help="split HTML and Markdown output into files of N rows: out.md, out_2.md, ...")
+    convert_parser.add_argument("--no-padding", action="store_true",
+                                help="write Markdown cells without padding them to the column width, skips measuring the table")
+    convert_parser.add_argument("--all-sheets", action="store_true",
+                                help="convert every XLSX sheet into its own file, e.g. out_Sheet2.csv")
+    convert_parser.add_argument("--progress", action="store_true", help="show progress, rows/s, MB/s and ETA on stderr")
+    convert_parser.add_argument("--metrics", action="store_true",
+                                help="print time, CPU time, rows, bytes and peak memory per stage on stderr")
+    convert_parser.add_argument("--metrics-log", metavar="FILE",
+                                help="append the metrics of every conversion to FILE as JSON lines")
+    convert_parser.add_argument("-q", "--quiet", action="store_true", help="do not print a success message")
+    convert_parser.set_defaults(handler=run_convert)
+
+    watch_parser = commands.add_parser("watch", help="convert new and changed files of a folder as they arrive")
+    watch_parser.add_argument("input_dir", help="folder to watch, subfolders included")
+    watch_parser.add_argument("output_dir", help="folder the converted files are written to, with the same subfolders")
+    watch_parser.add_argument("--to", nargs="+", required=True, metavar="FORMAT", help="output formats, e.g. --to json xlsx")
+    watch_parser.add_argument("--compress", choices=["gz", "bz2", "xz", "zst", "zip"], help="compress every output")
+    watch_parser.add_argument("--stream", action="store_true", help="read and write in chunks to keep memory flat")
+    watch_parser.add_argument("--auto", action="store_true",
+                              help="stream the files that are too large to convert whole, see convert --auto")
+    watch_parser.add_argument("--jobs", type=int, metavar="N", help="files converted at once (default: every core)")
+    watch_parser.add_argument("--interval", type=float, default=2.0, help="seconds between two scans (default 2)")
+    watch_parser.add_argument("--settle", type=float, default=2.0,
+                              help="skip files modified less than this many seconds ago, they may still be written (default 2)")
+    watch_parser.add_argument("--manifest", metavar="FILE",
+                              help="manifest of converted files (default: OUTPUT_DIR/.data_converter_manifest.json)")
+    watch_parser.add_argument("--once", action="store_true", help="convert what is new or changed and exit")
+    watch_parser.add_argument("-q", "--quiet", action="store_true", help="only print failed files")
+    watch_parser.set_defaults(handler=run_watch)
+
+    list_parser = commands.add_parser("list", help="list the supported conversions")
+    list_parser.set_defaults(handler=run_list)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args)
+    except FileNotFoundError as e:
+        print(f"ERROR: File not found: {e.filename}", file=sys.stderr)
+    except Exception as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+    return 1
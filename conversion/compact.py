@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import infer_dtype
+
+from .compression import open_input
+
+# Rows read to guess which CSV columns can be parsed straight into categoricals
+SAMPLE_ROWS = 10_000
+
+# A text column becomes categorical when it has at most one distinct value per this many values
+CATEGORY_REPEATS = 2
+
+# Distinct values tracked per column in streaming mode, columns with more stay plain text
+MAX_CATEGORIES = 10_000
+
+# Integer types tried from small to large, int64 columns are only narrowed, never widened
+INT_TYPES = (np.int8, np.int16, np.int32)
+
+
+# Memory-compact dtypes. Only changes that leave every writer's output unchanged are made:
+# integers get the smallest type that holds their range and repetitive text columns become
+# categoricals. Floats keep float64, float32 would print different digits
+
+
+def smallest_int(low, high):
+    for int_type in INT_TYPES:
+        info = np.iinfo(int_type)
+        if info.min <= low and high <= info.max:
+            return np.dtype(int_type)
+    return None
+
+
+# Text columns whose missing values are NaN. A categorical stores every missing value as NaN,
+# which HTML and Markdown would print differently from the None that JSON and XML readers give
+def is_text(series):
+    if series.dtype != object or infer_dtype(series, skipna=True) != "string":
+        return False
+    return all(isinstance(value, float) for value in series[series.isna()])
+
+
+def worth_category(distinct, values):
+    return 0 < distinct and distinct * CATEGORY_REPEATS <= values
+
+
+def repeats(series):
+    return worth_category(series.nunique(), series.count())
+
+
+# Compact dtypes for the columns of a whole DataFrame, from the full data. Text columns are
+# checked on their first rows before all values are hashed
+def compact_dtypes(df):
+    dtypes = {}
+    if not df.columns.is_unique:
+        return dtypes
+    for name in df.columns:
+        series = df[name]
+        if series.dtype.kind == "i" and len(series):
+            int_type = smallest_int(series.min(), series.max())
+            if int_type is not None and int_type.itemsize < series.dtype.itemsize:
+                dtypes[name] = int_type
+        elif is_text(series) and repeats(series.iloc[:SAMPLE_ROWS]) and repeats(series):
+            dtypes[name] = "category"
+    return dtypes
+
+
+def compact_frame(df):
+    dtypes = compact_dtypes(df)
+    return df.astype(dtypes) if dtypes else df
+
+
+# read_csv dtypes for a compact CSV read: text columns that repeat in the first SAMPLE_ROWS rows
+# are parsed into categoricals directly, so the file never exists as object strings in memory.
+# read_csv treats a categorical column's values as text, which a text column holds anyway
+def csv_sample_dtypes(input_file, **read_options):
+    with open_input(input_file) as source:
+        sample = pd.read_csv(source, nrows=SAMPLE_ROWS, **read_options)
+    if not sample.columns.is_unique:
+        return {}
+    return {name: "category" for name in sample.columns if is_text(sample[name]) and repeats(sample[name])}
+
+
+# Schema for streaming mode, gathered over every chunk of the schema pass so all chunks get the
+# same dtypes: the integer range seen in the whole file and the full set of categories
+class CompactSchema:
+    def __init__(self):
+        self.chunks = 0
+        self.present = {}
+        self.int_ranges = {}
+        self.categories = {}
+        self.values = {}
+        self.excluded = set()
+        self.all_missing = set()
+
+    def update(self, chunk):
+        self.chunks += 1
+        if not chunk.columns.is_unique:
+            self.excluded.update(chunk.columns)
+            return
+        for name in chunk.columns:
+            self.present[name] = self.present.get(name, 0) + 1
+            if name in self.excluded:
+                continue
+            series = chunk[name]
+            if series.dtype.kind == "i" and name not in self.categories:
+                if len(series):
+                    low, high = self.int_ranges.get(name, (series.min(), series.max()))
+                    self.int_ranges[name] = (min(low, series.min()), max(high, series.max()))
+            elif is_text(series) and name not in self.int_ranges:
+                categories = self.categories.setdefault(name, set())
+                categories.update(series.dropna().unique())
+                self.values[name] = self.values.get(name, 0) + series.count()
+                if len(categories) > MAX_CATEGORIES:
+                    self.exclude(name)
+            elif series.count() or name in self.int_ranges:
+                # A chunk where a text column is all missing doesn't change its kind
+                self.exclude(name)
+            else:
+                # but an integer column is read as float once a chunk of it is
+                self.all_missing.add(name)
+
+    def exclude(self, name):
+        self.excluded.add(name)
+        self.int_ranges.pop(name, None)
+        self.categories.pop(name, None)
+
+    def dtypes(self):
+        dtypes = {}
+        for name, (low, high) in self.int_ranges.items():
+            int_type = smallest_int(low, high)
+            # A column some chunks lack or have no values in has missing values there, it is
+            # read as float
+            if int_type is not None and self.present[name] == self.chunks and name not in self.all_missing:
+                dtypes[name] = int_type
+        for name, categories in self.categories.items():
+            if worth_category(len(categories), self.values[name]):
+                dtypes[name] = pd.CategoricalDtype(sorted(categories))
+        return dtypes
+
+
+def apply_dtypes(chunk, dtypes):
+    dtypes = {name: dtype for name, dtype in dtypes.items() if name in chunk.columns}
+    return chunk.astype(dtypes) if dtypes else chunk
@@ -0,0 +1,16 @@
+import pandas as pd
+
+# The engines reproduce pandas' output byte for byte with a few private pandas helpers: the JSON
+# parser and typing, the openpyxl styles of header cells and the HTML cell formatter. Private
+# helpers change between releases, so they are only used with the release requirements.txt pins
+# (any patch level of it). With any other release the engines take the public API instead
+PANDAS_RELEASE = (2, 2)
+
+
+# "2.2.0" -> (2, 2)
+def pandas_release(version=pd.__version__):
+    return tuple(int(part) for part in version.split(".")[:2])
+
+
+PANDAS_INTERNALS = pandas_release() == PANDAS_RELEASE
+
@@ -0,0 +1,219 @@
+import bz2
+import gzip
+import io
+import lzma
+import zipfile
+from pathlib import Path
+
+# Only the standard library is used here, zstandard is imported when a .zst file is opened
+
+# Compression suffixes, "data.csv.gz" is a gzip compressed CSV file
+COMPRESSIONS = {"gz": "gzip", "bz2": "bz2", "xz": "xz", "zst": "zstd", "zip": "zip"}
+SUFFIXES = {compression: suffix for suffix, compression in COMPRESSIONS.items()}
+
+# gzip defaults to level 9, which is several times slower than 6 for a few percent smaller files
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# Other suffixes of a format, "events.ndjson" is a JSON Lines file
+FORMAT_ALIASES = {"ndjson": "jsonl"}
+
+# Formats that are a zip archive already, compressing them again gains nothing
+UNCOMPRESSIBLE_FORMATS = {"xlsx"}
+
+
+# File format and compression of a path: "data.csv.gz" -> ("csv", "gzip"), "data.csv" -> ("csv", None)
+def split_suffix(path):
+    suffixes = [suffix.lower().strip(".") for suffix in Path(path).suffixes]
+    compression = None
+    if suffixes and suffixes[-1] in COMPRESSIONS:
+        compression = COMPRESSIONS[suffixes.pop()]
+    file_ext = suffixes[-1] if suffixes else ""
+    return FORMAT_ALIASES.get(file_ext, file_ext), compression
+
+
+def file_format(path):
+    return split_suffix(path)[0]
+
+
+def compression_of(path):
+    return split_suffix(path)[1]
+
+
+# File name without its format and compression suffixes: "dir/data.csv.gz" -> "data"
+def base_name(path):
+    name = Path(path).name
+    file_ext, compression = split_suffix(path)
+    if compression is not None:
+        name = name[:-len(SUFFIXES[compression]) - 1]
+    return Path(name).stem if file_ext else name
+
+
+# Output path for a format next to (or in output_dir instead of) the input, compressed when asked
+def output_path(input_file, output_ext, compression=None, output_dir=None):
+    name = f"{base_name(input_file)}.{output_ext}"
+    if compression:
+        name += f".{SUFFIXES.get(compression, compression)}"
+    return str(Path(output_dir or Path(input_file).parent) / name)
+
+
+def check_compressible(path, compression):
+    file_ext = file_format(path)
+    if compression is not None and file_ext in UNCOMPRESSIBLE_FORMATS:
+        raise ValueError(f"Compressed {file_ext.upper()} files are not supported, {file_ext.upper()} is a zip archive already")
+
+
+def zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Reading and writing .zst files needs the zstandard package: pip install zstandard") from None
+    return zstandard
+
+
+# Binary stream over a (de)compressor that is named after the file, so readers that look for the
+# input's path (the CSV dialect detection) find it, and that closes whatever it was opened on.
+# close_stream=False leaves the wrapped stream open, for handles the caller owns
+class CompressedStream(io.BufferedIOBase):
+    def __init__(self, stream, name, closing=(), close_stream=True):
+        self.stream = stream
+        self.name = str(name)
+        self.closing = closing
+        self.close_stream = close_stream
+
+    def readable(self):
+        return self.stream.readable()
+
+    def writable(self):
+        return self.stream.writable()
+
+    def read(self, size=-1):
+        return self.stream.read(size)
+
+    def read1(self, size=-1):
+        return self.stream.read(size)
+
+    def readinto(self, buffer):
+        return self.stream.readinto(buffer)
+
+    def write(self, data):
+        return self.stream.write(data)
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self.close_stream:
+                self.stream.close()
+            for resource in self.closing:
+                resource.close()
+        finally:
+            super().close()
+
+
+# The one member of an archive, or the member named like the archive without ".zip"
+def archive_member(archive, path):
+    members = [info for info in archive.infolist() if not info.is_dir()]
+    if len(members) == 1:
+        return members[0]
+    name = Path(path).name[:-len(".zip")]
+    for info in members:
+        if info.filename == name:
+            return info
+    raise ValueError(f"{Path(path).name} holds {len(members)} files, expected one or one named {name}")
+
+
+# Open an input for reading, compressed files are decompressed while they are read and never
+# written out uncompressed. handle is an already open binary handle on the file, e.g. one whose
+# position tracks progress, it is closed with the returned stream
+def open_input(path, handle=None):
+    compression = compression_of(path)
+    if compression is None:
+        return handle if handle is not None else open(path, "rb")
+    check_compressible(path, compression)
+
+    raw = handle if handle is not None else open(path, "rb")
+    try:
+        if compression == "gzip":
+            return CompressedStream(gzip.GzipFile(fileobj=raw, mode="rb"), path, (raw,))
+        if compression == "bz2":
+            return CompressedStream(bz2.BZ2File(raw, "rb"), path, (raw,))
+        if compression == "xz":
+            return CompressedStream(lzma.LZMAFile(raw, "rb"), path, (raw,))
+        if compression == "zstd":
+            return CompressedStream(zstandard().ZstdDecompressor().stream_reader(raw, closefd=False), path, (raw,))
+        archive = zipfile.ZipFile(raw)
+        return CompressedStream(archive.open(archive_member(archive, path)), path, (archive, raw))
+    except BaseException:
+        raw.close()
+        raise
+
+
+def compressor(raw, path, compression):
+    if compression == "gzip":
+        return gzip.GzipFile(filename=Path(path).name, fileobj=raw, mode="wb", compresslevel=GZIP_LEVEL), ()
+    if compression == "bz2":
+        return bz2.BZ2File(raw, "wb"), ()
+    if compression == "xz":
+        return lzma.LZMAFile(raw, "wb"), ()
+    if compression == "zstd":
+        return zstandard().ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw, closefd=False), ()
+    # The archive holds one member named like the archive without ".zip", written in one pass
+    archive = zipfile.ZipFile(raw, "w", zipfile.ZIP_DEFLATED)
+    return archive.open(Path(path).name[:-len(".zip")], "w", force_zip64=True), (archive,)
+
+
+# Open an output for writing, compressed outputs are compressed on the fly. output_file may also
+# be an open binary handle (e.g. a member of a zip archive), which is written to and left open.
+# Text modes take the same encoding and newline arguments as open()
+def open_output(output_file, mode="wb", **kwargs):
+    if hasattr(output_file, "write"):
+        stream = CompressedStream(output_file, getattr(output_file, "name", ""), close_stream=False)
+    else:
+        compression = compression_of(output_file)
+        if compression is None:
+            return open(output_file, mode, **kwargs)
+        check_compressible(output_file, compression)
+        raw = open(output_file, "wb")
+        try:
+            inner, closing = compressor(raw, output_file, compression)
+        except BaseException:
+            raw.close()
+            raise
+        stream = CompressedStream(inner, output_file, (*closing, raw))
+    return io.TextIOWrapper(stream, **kwargs) if "b" not in mode else stream
+
+
+def is_plain_path(output_file):
+    return not hasattr(output_file, "write") and compression_of(output_file) is None
+
+
+# ====== Archives ====== #
+
+# Zip archive that converted files are written into one after another, every member is compressed
+# while it is written. add() returns a binary handle for the next member, which a conversion takes
+# in place of its output file
+class ArchiveWriter:
+    def __init__(self, archive_file):
+        self.archive_file = archive_file
+        self.archive = zipfile.ZipFile(archive_file, "w", zipfile.ZIP_DEFLATED)
+        self.names = set()
+
+    # Member names are kept unique, a second "data.csv" becomes "data (2).csv"
+    def add(self, name):
+        unique = name
+        number = 1
+        while unique in self.names:
+            number += 1
+            unique = f"{base_name(name)} ({number}){name[len(base_name(name)):]}"
+        self.names.add(unique)
+        return self.archive.open(unique, "w", force_zip64=True)
+
+    def close(self):
+        self.archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,178 @@
+from collections.abc import Mapping
+from importlib import import_module
+
+from .compression import is_plain_path, open_output
+from .dialect import detect_dialect
+from .metrics import ConversionMetrics, file_size
+from .progress import ProgressTracker, remove_partial_output
+from .transforms import prepare_for_output
+
+
+# Resolve a "module:attribute.path" reference, the module is imported on first use only
+def resolve(reference):
+    module_name, _, attribute_path = reference.partition(":")
+    value = import_module(module_name)
+    for attribute in attribute_path.split("."):
+        value = getattr(value, attribute)
+    return value
+
+
+# Conversion table whose functions are stored as references and imported on lookup, so listing
+# or checking the supported pairs never pays for importing pandas, lxml or openpyxl
+class LazyFunctionTable(Mapping):
+    def __init__(self, references):
+        self.references = references
+        self.resolved = {}
+
+    def __getitem__(self, key):
+        if key not in self.resolved:
+            self.resolved[key] = tuple(resolve(reference) for reference in self.references[key])
+        return self.resolved[key]
+
+    def __contains__(self, key):
+        return key in self.references
+
+    def __iter__(self):
+        return iter(self.references)
+
+    def __len__(self):
+        return len(self.references)
+
+
+# OUTPUT FILES xml,csv,json,jsonl,xlsx,md,html
+# INPUT FILES csv,xlsx,xml,json,jsonl
+
+# Mapping of file extensions to corresponding read and write functions
+CONVERSION_FUNCTIONS = LazyFunctionTable({
+    # JSON Conversion
+    ("json", "html"): ("conversion.json_engine:read_json", "conversion.html_engine:write_html"),
+    ("json", "csv"): ("conversion.json_engine:read_json", "pandas:DataFrame.to_csv"),
+    ("json", "xml"): ("conversion.json_engine:read_json", "conversion.xml_engine:write_xml"),
+    ("json", "xlsx"): ("conversion.json_engine:read_json", "conversion.excel_engine:write_excel"),
+    ("json", "md"): ("conversion.json_engine:read_json", "conversion.markdown_engine:write_markdown"),
+    ("json", "jsonl"): ("conversion.json_engine:read_json", "conversion.json_engine:write_jsonl"),
+    # JSON Lines Conversion
+    ("jsonl", "html"): ("conversion.json_engine:read_jsonl", "conversion.html_engine:write_html"),
+    ("jsonl", "csv"): ("conversion.json_engine:read_jsonl", "pandas:DataFrame.to_csv"),
+    ("jsonl", "xml"): ("conversion.json_engine:read_jsonl", "conversion.xml_engine:write_xml"),
+    ("jsonl", "json"): ("conversion.json_engine:read_jsonl", "pandas:DataFrame.to_json"),
+    ("jsonl", "xlsx"): ("conversion.json_engine:read_jsonl", "conversion.excel_engine:write_excel"),
+    ("jsonl", "md"): ("conversion.json_engine:read_jsonl", "conversion.markdown_engine:write_markdown"),
+    # CSV Conversion
+    ("csv", "csv"): ("pandas:read_csv", "pandas:DataFrame.to_csv"),
+    ("csv", "html"): ("pandas:read_csv", "conversion.html_engine:write_html"),
+    ("csv", "xml"): ("pandas:read_csv", "conversion.xml_engine:write_xml"),
+    ("csv", "json"): ("pandas:read_csv", "pandas:DataFrame.to_json"),
+    ("csv", "xlsx"): ("pandas:read_csv", "conversion.excel_engine:write_excel"),
+    ("csv", "md"): ("pandas:read_csv", "conversion.markdown_engine:write_markdown"),
+    ("csv", "jsonl"): ("pandas:read_csv", "conversion.json_engine:write_jsonl"),
+    # XML Conversion
+    ("xml", "html"): ("conversion.xml_engine:read_xml", "conversion.html_engine:write_html"),
+    ("xml", "csv"): ("conversion.xml_engine:read_xml", "pandas:DataFrame.to_csv"),
+    ("xml", "json"): ("conversion.xml_engine:read_xml", "pandas:DataFrame.to_json"),
+    ("xml", "xlsx"): ("conversion.xml_engine:read_xml", "conversion.excel_engine:write_excel"),
+    ("xml", "md"): ("conversion.xml_engine:read_xml", "conversion.markdown_engine:write_markdown"),
+    ("xml", "jsonl"): ("conversion.xml_engine:read_xml", "conversion.json_engine:write_jsonl"),
+    # Excel Conversion
+    ("xlsx", "html"): ("conversion.excel_engine:read_excel", "conversion.html_engine:write_html"),
+    ("xlsx", "csv"): ("conversion.excel_engine:read_excel", "pandas:DataFrame.to_csv"),
+    ("xlsx", "json"): ("conversion.excel_engine:read_excel", "pandas:DataFrame.to_json"),
+    ("xlsx", "xml"): ("conversion.excel_engine:read_excel", "conversion.xml_engine:write_xml"),
+    ("xlsx", "md"): ("conversion.excel_engine:read_excel", "conversion.markdown_engine:write_markdown"),
+    ("xlsx", "jsonl"): ("conversion.excel_engine:read_excel", "conversion.json_engine:write_jsonl")
+})
+
+
+# Look up the read and write functions for a conversion pair
+def get_conversion_functions(input_ext, output_ext):
+    read_func, write_func = CONVERSION_FUNCTIONS.get((input_ext, output_ext), (None, None))
+    if read_func is None or write_func is None:
+        raise ValueError("Unsupported conversion!")
+    return read_func, write_func
+
+
+# Extra keyword arguments for the reader of an input format, CSV files get their detected dialect
+def read_kwargs(input_file, input_ext):
+    if input_ext == "csv":
+        # Readers may get an open file, the dialect is detected (and cached) by its path
+        path = input_file.name if hasattr(input_file, "read") else input_file
+        return detect_dialect(path).read_csv_kwargs()
+    return {}
+
+
+# The CSV reader on several processes when workers asks for it, the given reader otherwise
+def parallel_reader(read_func, input_ext, workers):
+    if input_ext != "csv" or workers == 1:
+        return read_func
+    from functools import partial
+    from .parallel_csv import read_csv_parallel
+    return partial(read_csv_parallel, workers=workers)
+
+
+# Writers that open their output through open_output themselves, pandas' writers are handed a text
+# handle when the output is compressed or an open handle. write_options only go to the engine writers
+ENGINE_WRITERS = {"xml", "xlsx", "html", "md", "jsonl"}
+
+
+def write_output(write_func, df, output_file, output_ext, write_options=None):
+    if output_ext in ENGINE_WRITERS:
+        return write_func(df, output_file, **(write_options or {}))
+    if is_plain_path(output_file):
+        return write_func(df, output_file)
+    with open_output(output_file, "w", encoding="utf-8", newline="") as handle:
+        return write_func(df, handle)
+
+
+# Whole-file conversion: read the input into one DataFrame and write it out in one go.
+# read_options are passed on to the reader, e.g. {"record": "//item"} for XML. Progress is
+# reported once the input is read and once the output is written, cancel_event is checked
+# in between. on_metrics receives the ConversionMetrics of the run, failed runs included.
+# compact stores the data in the smallest dtypes that give the same output, see compact.py.
+# Compressed inputs and outputs ("data.csv.gz") are (de)compressed on the fly, see compression.py.
+# output_file may also be an open binary handle, such as a member of a zip archive.
+# workers > 1 parses CSV input on that many processes, 0 on every core, see parallel_csv.py.
+# write_options go to the writer, e.g. {"page_rows": 10000} splits html/md output into pages.
+# selection keeps some columns and the rows matching a filter, the reader only parses the columns
+# it needs, see selection.py
+def convert(input_file, output_file, input_ext, output_ext, read_options=None, on_progress=None, cancel_event=None,
+            on_metrics=None, compact=False, workers=1, write_options=None, selection=None):
+    read_func, write_func = get_conversion_functions(input_ext, output_ext)
+    read_options = {**(read_options or {}), **(selection.read_options(input_ext) if selection else {})}
+    read_func = parallel_reader(read_func, input_ext, workers)
+    progress = ProgressTracker(input_file, 1, on_progress, cancel_event)
+    metrics = ConversionMetrics("convert", input_file, output_file, input_ext, output_ext, on_metrics)
+    try:
+        with metrics.stage("detect"):
+            kwargs = read_kwargs(input_file, input_ext)
+            # Categoricals can't be parsed in parallel, the compact stage converts them afterwards
+            if compact and input_ext == "csv" and workers == 1:
+                from .compact import csv_sample_dtypes
+                kwargs["dtype"] = csv_sample_dtypes(input_file, **kwargs)
+        with metrics.stage("read") as stage:
+            df = read_func(progress.open_pass(), **kwargs, **read_options)
+            stage.rows = metrics.rows = len(df)
+            stage.bytes_read = progress.size
+        progress.update(len(df))
+        if selection:
+            with metrics.stage("select") as stage:
+                df = selection.apply(df)
+                stage.rows = len(df)
+        if compact:
+            with metrics.stage("compact"):
+                from .compact import compact_frame
+                df = compact_frame(df)
+        with metrics.stage("prepare"):
+            df = prepare_for_output(df, output_ext)
+        with metrics.stage("write") as stage:
+            write_output(write_func, df, output_file, output_ext, write_options)
+            stage.rows = len(df)
+            stage.bytes_written = file_size(output_file)
+    except BaseException as e:
+        remove_partial_output(output_file)
+        metrics.finish(e)
+        raise
+    finally:
+        progress.close()
+    progress.finish()
+    metrics.finish()
+    return df
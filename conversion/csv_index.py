@@ -0,0 +1,207 @@
+import hashlib
+import json
+import mmap
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# The row-offset index stores the byte offset of every n-th data row
+ROW_INDEX_STEP = 1000
+
+# Bytes scanned per vectorized step, the temporary arrays of one step are a few times this
+SCAN_BLOCK_BYTES = 32 * 1024**2
+
+# Bumped whenever the scan changes, older index files are rebuilt
+INDEX_VERSION = 2
+
+# Encodings in which a quote or newline byte is always that character, so offsets can be found
+# without decoding
+BYTE_SCANNABLE_ENCODINGS = {"utf-8", "utf-8-sig", "latin-1"}
+
+NEWLINE = 0x0A
+CARRIAGE_RETURN = 0x0D
+
+
+# Index files go to DATA_CONVERTER_INDEX_DIR when it is set, to the user's cache directory otherwise
+def default_index_dir():
+    configured = os.environ.get("DATA_CONVERTER_INDEX_DIR")
+    if configured:
+        return Path(configured)
+    if sys.platform == "win32":
+        base = Path(os.environ.get("LOCALAPPDATA", Path.home() / "AppData" / "Local"))
+    else:
+        base = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+    return base / "DataConverter" / "csv_index"
+
+
+# Index file of a CSV file: named after its full path in the index directory, or ".name.rowindex.npz"
+# right next to it
+def index_path(file, index_dir=None, next_to_file=False):
+    file = Path(file).resolve()
+    if next_to_file:
+        return file.with_name(f".{file.name}.rowindex.npz")
+    digest = hashlib.sha1(str(file).encode("utf-8")).hexdigest()[:20]
+    return Path(index_dir or default_index_dir()) / f"{digest}.npz"
+
+
+# Byte offsets of a CSV file's data rows: offsets[n] is where row n * step starts. Rows are counted
+# the way read_csv counts them, the header and blank lines are not rows. The file version (size and
+# mtime) and the dialect it was scanned with are kept, a changed file needs a new index
+class CsvRowIndex:
+    def __init__(self, offsets, rows, lineterminator, key, step=ROW_INDEX_STEP):
+        self.offsets = offsets
+        self.rows = rows
+        self.lineterminator = lineterminator
+        self.key = key
+        self.step = step
+
+    # Offset of the indexed row at or before row, and the rows to skip from there to reach it
+    def seek(self, row):
+        checkpoint = min(row // self.step, len(self.offsets) - 1)
+        return int(self.offsets[checkpoint]), row - checkpoint * self.step
+
+    # Split the data rows into at most parts byte ranges along indexed rows. Returns
+    # (start, end, first_row, rows) per range, end is None for the last one
+    def ranges(self, parts):
+        if not self.rows:
+            return []
+        checkpoints = len(self.offsets)
+        bounds = sorted({round(part * checkpoints / parts) for part in range(parts)})
+        ranges = []
+        for number, checkpoint in enumerate(bounds):
+            next_checkpoint = bounds[number + 1] if number + 1 < len(bounds) else None
+            first_row = checkpoint * self.step
+            last_row = self.rows if next_checkpoint is None else next_checkpoint * self.step
+            end = None if next_checkpoint is None else int(self.offsets[next_checkpoint])
+            ranges.append((int(self.offsets[checkpoint]), end, first_row, last_row - first_row))
+        return ranges
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        meta = {"rows": self.rows, "lineterminator": self.lineterminator, "key": self.key, "step": self.step}
+        # Written under a temporary name and moved into place, a reader never sees half a file
+        temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(temporary, "wb") as index_file:
+            np.savez(index_file, offsets=self.offsets, meta=np.array(json.dumps(meta)))
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as stored:
+            meta = json.loads(str(stored["meta"]))
+            return cls(stored["offsets"], meta["rows"], meta["lineterminator"], meta["key"], meta["step"])
+
+
+# What an index depends on: the file version and how its rows are told apart
+def index_key(file, quotechar, has_header, step=ROW_INDEX_STEP):
+    stat = os.stat(file)
+    return {"version": INDEX_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "quotechar": quotechar,
+            "has_header": has_header, "step": step}
+
+
+# Line ending of a file from its first line break: "\r\n", "\n" or "\r" ("\n" for files without
+# any). A "\r" file may still hold "\n" in quoted fields, so whichever comes first decides
+def detect_line_ending(data):
+    sample = data[:SCAN_BLOCK_BYTES]
+    newlines = np.flatnonzero(sample == NEWLINE)
+    carriages = np.flatnonzero(sample == CARRIAGE_RETURN)
+    if len(carriages) and (not len(newlines) or carriages[0] < newlines[0]):
+        first = carriages[0]
+        return "\r\n" if first + 1 < len(data) and data[first + 1] == NEWLINE else "\r"
+    return "\n"
+
+
+# One pass over the memory-mapped file, a block of bytes at a time in numpy: line breaks inside
+# quoted fields are dropped by the parity of the quotes before them, blank lines are skipped like
+# read_csv skips them. Detects the line ending, counts the rows and records every step-th row start.
+# on_progress gets the rows counted so far after every block, returns None once stopped is set
+def scan_csv(file, quotechar='"', has_header=True, step=ROW_INDEX_STEP, on_progress=None, stopped=None):
+    key = index_key(file, quotechar, has_header, step)
+    if not key["size"]:
+        return CsvRowIndex(np.zeros(0, dtype=np.int64), 0, "\n", key, step)
+
+    quote = ord(quotechar) if quotechar else None
+    with open(file, "rb") as csv_file, mmap.mmap(csv_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        data = np.frombuffer(mapped, dtype=np.uint8)
+        try:
+            lineterminator = detect_line_ending(data)
+            line_break = CARRIAGE_RETURN if lineterminator == "\r" else NEWLINE
+            offsets = []
+            rows = 0
+            in_quotes = 0
+            row_start = 0
+            header_pending = has_header
+            for block_start in range(0, len(data), SCAN_BLOCK_BYTES):
+                block = data[block_start:block_start + SCAN_BLOCK_BYTES]
+                ends = np.flatnonzero(block == line_break)
+                if quote is not None:
+                    quotes = np.flatnonzero(block == quote)
+                    # A line break closes a row when an even number of quotes came before it
+                    closed = (np.searchsorted(quotes, ends) + in_quotes) % 2 == 0
+                    ends = ends[closed]
+                    in_quotes = (in_quotes + len(quotes)) % 2
+                ends += block_start
+                if not len(ends):
+                    continue
+
+                starts = np.empty_like(ends)
+                starts[0] = row_start
+                starts[1:] = ends[:-1] + 1
+                row_start = int(ends[-1]) + 1
+                lengths = ends - starts
+                blank = lengths == 0
+                if line_break == NEWLINE:
+                    blank |= (lengths == 1) & (data[starts] == CARRIAGE_RETURN)
+                starts = starts[~blank]
+                if header_pending and len(starts):
+                    starts = starts[1:]
+                    header_pending = False
+
+                offsets.append(starts[(-rows) % step::step])
+                rows += len(starts)
+                if stopped is not None and stopped.is_set():
+                    return None
+                if on_progress is not None:
+                    on_progress(rows)
+
+            # The last row may have no line break after it
+            if row_start < len(data):
+                if header_pending:
+                    header_pending = False
+                else:
+                    if rows % step == 0:
+                        offsets.append(np.array([row_start], dtype=np.int64))
+                    rows += 1
+        finally:
+            # The map can only be closed once no array points into it
+            del data
+            block = None
+
+    offsets = np.concatenate(offsets).astype(np.int64) if offsets else np.zeros(0, dtype=np.int64)
+    return CsvRowIndex(offsets, rows, lineterminator, key, step)
+
+
+# The row index of a CSV file, loaded from its index file when that was made for this version of
+# the file, scanned (and saved for next time) otherwise. Returns None when the scan was stopped.
+# An index that can't be saved, e.g. in a read-only location, is still returned
+def open_csv_index(file, quotechar='"', has_header=True, index_dir=None, next_to_file=False, on_progress=None,
+                   stopped=None):
+    path = index_path(file, index_dir, next_to_file)
+    key = index_key(file, quotechar, has_header)
+    try:
+        index = CsvRowIndex.load(path)
+        if index.key == key:
+            return index
+    except (OSError, ValueError, KeyError):
+        pass
+
+    index = scan_csv(file, quotechar, has_header, on_progress=on_progress, stopped=stopped)
+    if index is not None:
+        try:
+            index.save(path)
+        except OSError:
+            pass
+    return index
@@ -0,0 +1,130 @@
+import codecs
+import csv
+import re
+from pathlib import Path
+from typing import NamedTuple
+
+from .compression import open_input
+
+# Sample sizes tried in order, the sniff only reads further when the smaller sample is ambiguous
+SNIFF_SAMPLE_SIZES = (16 * 1024, 128 * 1024, 10**6)
+SNIFF_DELIMITERS = ",;\t|"
+
+BYTE_ORDER_MARKS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+NUMBER = re.compile(r"^\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*$")
+
+# Detected dialects keyed by (path, size, mtime), so Read, Convert and the statistics share one sniff
+_DIALECT_CACHE = {}
+
+
+# Everything needed to read a CSV file without guessing again
+class CsvDialect(NamedTuple):
+    delimiter: str = ","
+    quotechar: str = '"'
+    lineterminator: str = "\n"
+    encoding: str = "utf-8"
+    has_header: bool = True
+
+    # Keyword arguments for pd.read_csv, the C parser handles "\n" and "\r\n" on its own
+    def read_csv_kwargs(self):
+        kwargs = {
+            "sep": self.delimiter,
+            "quotechar": self.quotechar,
+            "encoding": self.encoding,
+            "header": 0 if self.has_header else None,
+        }
+        if self.lineterminator == "\r":
+            kwargs["lineterminator"] = "\r"
+        return kwargs
+
+
+def detect_encoding(raw):
+    for bom, encoding in BYTE_ORDER_MARKS:
+        if raw.startswith(bom):
+            return encoding
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(raw, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+def detect_lineterminator(text):
+    position = text.find("\n")
+    carriage = text.find("\r")
+    if carriage >= 0 and (position < 0 or carriage < position):
+        return "\r\n" if text[carriage + 1:carriage + 2] == "\n" else "\r"
+    return "\n"
+
+
+# A header row rarely holds plain numbers, so only believe csv.Sniffer's "no header" when it does
+def detect_header(sniffer, sample, dialect):
+    try:
+        if sniffer.has_header(sample):
+            return True
+    except csv.Error:
+        return True
+    first_row = next(csv.reader(sample.splitlines(), dialect), [])
+    return not any(NUMBER.match(field) for field in first_row)
+
+
+# A sniff result is trusted when all complete lines of the sample split into the same number of fields
+def is_consistent(lines, dialect):
+    widths = {len(row) for row in csv.reader(lines, dialect) if row}
+    return len(widths) == 1
+
+
+# Sniff a growing sample until the delimiter is unambiguous, the file is only ever read, never rewritten.
+# Compressed files are sniffed on their decompressed start
+def sniff_dialect(file):
+    sniffer = csv.Sniffer()
+    with open_input(file) as csv_file:
+        raw = b""
+        for sample_size in SNIFF_SAMPLE_SIZES:
+            raw += csv_file.read(sample_size - len(raw))
+            at_end = len(raw) < sample_size
+            if not raw:
+                raise ValueError("The file is empty or the sample size is insufficient.")
+
+            encoding = detect_encoding(raw)
+            text = codecs.getincrementaldecoder(encoding)(errors="replace").decode(raw, final=at_end)
+            lines = text.splitlines()
+            # The last line of a partial sample is usually cut off
+            if not at_end and len(lines) > 1:
+                lines = lines[:-1]
+            sample = "\n".join(lines)
+
+            try:
+                dialect = sniffer.sniff(sample, delimiters=SNIFF_DELIMITERS)
+            except csv.Error:
+                dialect = None
+            if at_end or (dialect is not None and is_consistent(lines, dialect)):
+                break
+
+    # Single column files have nothing to sniff, pandas' default comma reads them fine
+    if dialect is None:
+        dialect = csv.excel
+
+    return CsvDialect(delimiter=dialect.delimiter,
+                      quotechar=dialect.quotechar or '"',
+                      lineterminator=detect_lineterminator(text),
+                      encoding=encoding,
+                      has_header=detect_header(sniffer, sample, dialect))
+
+
+def detect_dialect(file):
+    stat = Path(file).stat()
+    key = (str(Path(file).resolve()), stat.st_size, stat.st_mtime_ns)
+    dialect = _DIALECT_CACHE.get(key)
+    if dialect is None:
+        dialect = _DIALECT_CACHE[key] = sniff_dialect(file)
+    return dialect
+
+
+def clear_dialect_cache():
+    _DIALECT_CACHE.clear()
@@ -0,0 +1,332 @@
+import datetime
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from .chunking import CHUNK_ROWS, ChunkWriter
+from .compat import PANDAS_INTERNALS
+from .compression import base_name, open_output
+
+# Sheet size limits, the same ones pandas checks in to_excel
+EXCEL_MAX_ROWS = 1048576
+EXCEL_MAX_COLUMNS = 16384
+
+# Number formats ExcelWriter gives date cells by default
+EXCEL_DATETIME_FORMAT = "YYYY-MM-DD HH:MM:SS"
+EXCEL_DATE_FORMAT = "YYYY-MM-DD"
+
+# Values of error cells, the same list as openpyxl.cell.cell.ERROR_CODES
+SHEET_ERRORS = frozenset(("#NULL!", "#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#NUM!", "#N/A"))
+
+# Characters that can not be part of a file name on common file systems
+FILE_NAME_INVALID = re.compile(r'[\\/:*?"<>|]')
+
+
+# ====== Reader ====== #
+
+# Same cell conversion pandas' openpyxl reader applies, on plain values instead of cell objects:
+# empty cells become "", whole floats become ints and error cells become NaN
+def sheet_value(value):
+    if value is None:
+        return ""
+    if type(value) is float and value.is_integer():
+        return int(value)
+    if type(value) is str and value in SHEET_ERRORS:
+        return np.nan
+    return value
+
+
+def open_workbook(input_file):
+    from openpyxl import load_workbook
+
+    return load_workbook(input_file, read_only=True, data_only=True, keep_links=False)
+
+
+def sheet_names(input_file):
+    workbook = open_workbook(input_file)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+
+
+# Yield the rows of one sheet (index or name) from a read-only workbook, trailing empty cells
+# trimmed. Empty rows are held back until a row with data follows, so trailing ones are dropped
+def iter_sheet_rows(input_file, sheet=0):
+    workbook = open_workbook(input_file)
+    try:
+        worksheet = workbook.worksheets[sheet] if isinstance(sheet, int) else workbook[sheet]
+        # The stored dimensions are often wrong, let openpyxl read every row that is there
+        worksheet.reset_dimensions()
+        empty_rows = 0
+        for values in worksheet.iter_rows(values_only=True):
+            row = [sheet_value(value) for value in values]
+            while row and row[-1] == "":
+                row.pop()
+            if not row:
+                empty_rows += 1
+                continue
+            for _ in range(empty_rows):
+                yield []
+            empty_rows = 0
+            yield row
+    finally:
+        workbook.close()
+
+
+# Combine two chunk kinds (see streaming.column_kind) the way TextParser types the cells behind
+# them when it parses them together: empty cells turn booleans and integers into floats,
+# booleans with numbers become numbers and anything with text or dates stays as it is
+def merge_sheet_kinds(first, second):
+    if first is None or first == second:
+        return second
+    kinds = {first, second}
+    if "n" in kinds:
+        other = (kinds - {"n"}).pop()
+        return "f" if other in "biuf" else other
+    if kinds <= {"b", "i", "u"}:
+        return "i"
+    if kinds <= {"b", "i", "u", "f"}:
+        return "f"
+    return "O"
+
+
+# Parse a header row and data rows the way pd.read_excel does, with every row padded to width.
+# usecols picks the columns that are parsed, as in read_csv
+def rows_to_frame(header, rows, width, dtype=None, usecols=None):
+    padded = [row + [""] * (width - len(row)) for row in [header, *rows]]
+    with TextParser(padded, header=0, skip_blank_lines=False, dtype=dtype, usecols=usecols) as parser:
+        return parser.read()
+
+
+# Whole-sheet read, same result as pd.read_excel without keeping openpyxl cell objects around
+def read_excel(input_file, sheet=0, dtype=None, usecols=None):
+    rows = list(iter_sheet_rows(input_file, sheet))
+    if not rows:
+        return pd.DataFrame()
+    width = max(len(row) for row in rows)
+    return rows_to_frame(rows[0], rows[1:], width, dtype, usecols)
+
+
+# Chunked read for streaming mode. columns fixes the column count across chunks, a row wider
+# than the header adds "Unnamed" columns like it does in a whole-sheet read
+def read_excel_chunks(input_file, chunksize=CHUNK_ROWS, dtype=None, columns=None, sheet=0, usecols=None):
+    rows = iter_sheet_rows(input_file, sheet)
+    header = next(rows, None)
+    if header is None:
+        return
+    minimum_width = max(len(header), len(columns or []))
+
+    start = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == chunksize:
+            chunk = rows_to_frame(header, batch, max(minimum_width, *map(len, batch)), dtype, usecols)
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            start += len(chunk)
+            batch = []
+            yield chunk
+    if batch or not start:
+        chunk = rows_to_frame(header, batch, max(minimum_width, 0, *map(len, batch)), dtype, usecols)
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        yield chunk
+
+
+# ====== Writer ====== #
+
+# Same value conversion ExcelFormatter and ExcelWriter apply before handing a value to openpyxl.
+# Returns the value and the number format to set, if any
+def cell_value(value):
+    from pandas.api.types import is_bool, is_float, is_integer, is_scalar
+
+    if is_scalar(value) and pd.isna(value):
+        return "", None
+    if getattr(value, "tzinfo", None) is not None:
+        raise ValueError("Excel does not support datetimes with timezones. "
+                         "Please ensure that datetimes are timezone unaware before writing to Excel.")
+    if is_integer(value):
+        return int(value), None
+    if is_float(value):
+        value = float(value)
+        if np.isinf(value):
+            return "inf" if value > 0 else "-inf", None
+        return value, None
+    if is_bool(value):
+        return bool(value), None
+    if isinstance(value, datetime.datetime):
+        return value, EXCEL_DATETIME_FORMAT
+    if isinstance(value, datetime.date):
+        return value, EXCEL_DATE_FORMAT
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds() / 86400, "0"
+    return str(value), None
+
+
+# Convert a whole column at once where the dtype allows it, otherwise value by value.
+# Returns the values and the number formats (None when no cell needs one)
+def column_values(series):
+    kind = series.dtype.kind if isinstance(series.dtype, np.dtype) else None
+    if kind in ("i", "u", "b"):
+        return series.tolist(), None
+    if kind == "f":
+        values = series.to_numpy()
+        converted = values.tolist()
+        for position in np.flatnonzero(~np.isfinite(values)):
+            value = values[position]
+            converted[position] = "" if np.isnan(value) else ("inf" if value > 0 else "-inf")
+        return converted, None
+    pairs = [cell_value(value) for value in series.astype(object)]
+    formats = [number_format for _, number_format in pairs]
+    return [value for value, _ in pairs], formats if any(formats) else None
+
+
+# openpyxl style attributes of an ExcelFormatter style. pandas converts them with a private
+# helper, used with the pinned pandas release (see compat). Otherwise the font, borders and
+# alignment pandas gives header cells are built with openpyxl's own classes
+def openpyxl_style(style):
+    try:
+        from pandas.io.excel._openpyxl import OpenpyxlWriter
+    except ImportError:
+        OpenpyxlWriter = None
+    if PANDAS_INTERNALS and hasattr(OpenpyxlWriter, "_convert_to_style_kwargs"):
+        return OpenpyxlWriter._convert_to_style_kwargs(style)
+
+    from openpyxl.styles import Alignment, Border, Font, Side
+
+    attributes = {}
+    if "font" in style:
+        attributes["font"] = Font(**style["font"])
+    if "borders" in style:
+        attributes["border"] = Border(**{side: Side(style=line) for side, line in style["borders"].items()})
+    if "alignment" in style:
+        attributes["alignment"] = Alignment(**style["alignment"])
+    return attributes
+
+
+# Constant-memory xlsx writer: rows go straight into an openpyxl write-only workbook, which
+# streams them to a temporary sheet file instead of keeping cell objects. The cells and styles
+# match DataFrame.to_excel with its defaults
+class ExcelStreamWriter(ChunkWriter):
+    def __init__(self, output_file, layout_rows=None, sheet_name="Sheet1"):
+        super().__init__(output_file, layout_rows)
+        from openpyxl import Workbook
+
+        self.file = open_output(output_file, "wb")
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet(sheet_name)
+        self.style_cache = {}
+        self.header_written = False
+
+    def write(self, chunk):
+        if self.rows_written + len(chunk) + 1 > EXCEL_MAX_ROWS or len(chunk.columns) + 1 > EXCEL_MAX_COLUMNS:
+            raise ValueError(f"This sheet is too large! Your sheet size is: {self.rows_written + len(chunk) + 1}, "
+                             f"{len(chunk.columns) + 1} Max sheet size is: {EXCEL_MAX_ROWS}, {EXCEL_MAX_COLUMNS}")
+
+        simple = chunk.index.nlevels == 1 and chunk.columns.nlevels == 1 and chunk.index.name is None
+        if simple and len(chunk.columns):
+            self.write_rows(chunk)
+        else:
+            self.write_formatted_cells(chunk)
+        self.header_written = True
+        self.rows_written += len(chunk)
+
+    def styled_cell(self, value, style):
+        from openpyxl.cell import WriteOnlyCell
+
+        cell = WriteOnlyCell(self.sheet, value)
+        key = str(style)
+        if key not in self.style_cache:
+            self.style_cache[key] = openpyxl_style(style)
+        for name, attribute in self.style_cache[key].items():
+            setattr(cell, name, attribute)
+        return cell
+
+    def formatted_cell(self, value, number_format):
+        from openpyxl.cell import WriteOnlyCell
+
+        cell = WriteOnlyCell(self.sheet, value)
+        cell.number_format = number_format
+        return cell
+
+    # Fast path for a plain table: the header and index cells get pandas' header style, the body
+    # is converted column by column and appended as plain values
+    def write_rows(self, chunk):
+        from pandas.io.formats.excel import ExcelFormatter
+
+        style = ExcelFormatter(chunk.iloc[:0, :0]).header_style
+        if not self.header_written:
+            self.sheet.append([None] + [self.styled_cell(cell_value(name)[0], style) for name in chunk.columns])
+
+        columns = []
+        for position in range(len(chunk.columns)):
+            values, formats = column_values(chunk.iloc[:, position])
+            if formats is not None:
+                values = [value if number_format is None else self.formatted_cell(value, number_format)
+                          for value, number_format in zip(values, formats)]
+            columns.append(values)
+
+        index_values = [cell_value(label)[0] for label in chunk.index]
+        for label, row in zip(index_values, zip(*columns)):
+            self.sheet.append([self.styled_cell(label, style), *row])
+
+    # General path for MultiIndex or named indexes, cell by cell through pandas' ExcelFormatter
+    def write_formatted_cells(self, chunk):
+        from openpyxl.cell import WriteOnlyCell
+        from pandas.io.formats.excel import ExcelFormatter
+
+        formatter = ExcelFormatter(chunk, header=not self.header_written)
+        grid = {}
+        for cell in formatter.get_formatted_cells():
+            value, number_format = cell_value(cell.val)
+            xcell = self.styled_cell(value, cell.style) if cell.style else WriteOnlyCell(self.sheet, value)
+            if number_format:
+                xcell.number_format = number_format
+            grid.setdefault(cell.row, {})[cell.col] = xcell
+
+        for row in sorted(grid):
+            cells = grid[row]
+            self.sheet.append([cells.get(column) for column in range(max(cells) + 1)])
+
+    def close(self):
+        if self.file.closed:
+            return
+        try:
+            self.workbook.save(self.file)
+        finally:
+            self.file.close()
+
+
+# Whole-file write used by the conversion table
+def write_excel(df, output_file):
+    with ExcelStreamWriter(output_file) as writer:
+        writer.write(df)
+
+
+# ====== All sheets ====== #
+
+# Output file for one sheet of a multi-sheet conversion: "book.csv" -> "book_Sheet2.csv",
+# "book.csv.gz" -> "book_Sheet2.csv.gz"
+def sheet_output_file(output_file, sheet):
+    path = Path(output_file)
+    base = base_name(path)
+    return str(path.with_name(f"{base}_{FILE_NAME_INVALID.sub('_', sheet)}{path.name[len(base):]}"))
+
+
+# Convert every sheet of a workbook into its own output file. Returns the written files
+def convert_all_sheets(input_file, output_file, output_ext, streaming=False, chunksize=CHUNK_ROWS):
+    from .converter import convert
+    from .streaming import convert_streaming
+
+    output_files = []
+    for sheet in sheet_names(input_file):
+        sheet_file = sheet_output_file(output_file, sheet)
+        if streaming:
+            convert_streaming(input_file, sheet_file, "xlsx", output_ext, chunksize, {"sheet": sheet})
+        else:
+            convert(input_file, sheet_file, "xlsx", output_ext, {"sheet": sheet})
+        output_files.append(sheet_file)
+    return output_files
@@ -0,0 +1,142 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+from .compression import file_format, open_input
+from .converter import get_conversion_functions, parallel_reader, read_kwargs, write_output
+from .metrics import ConversionMetrics, file_size
+from .progress import remove_partial_output
+from .transforms import prepare_for_output
+
+# The fastest writers run on threads of this process, which spares them the copy of the
+# DataFrame a writer process receives. They hold the GIL for most of their work (only file writes
+# and compression release it), so they take turns on one core. The slower ones (openpyxl, the
+# Markdown/HTML/XML formatters) would hold it far longer, so each gets a process of its own
+THREAD_WRITERS = {"csv", "json", "jsonl"}
+
+
+class WriterTiming(NamedTuple):
+    output_file: str
+    output_ext: str
+    mode: str
+    seconds: float
+    ok: bool
+    error: str
+
+
+class FanoutResult(NamedTuple):
+    read_seconds: float
+    total_seconds: float
+    writers: list
+
+
+def write_target(df, input_ext, output_file, output_ext, mode="inline"):
+    start = time.perf_counter()
+    try:
+        _, write_func = get_conversion_functions(input_ext, output_ext)
+        write_output(write_func, prepare_for_output(df, output_ext), output_file, output_ext)
+        return WriterTiming(output_file, output_ext, mode, time.perf_counter() - start, True, "")
+    except Exception as e:
+        remove_partial_output(output_file)
+        return WriterTiming(output_file, output_ext, mode, time.perf_counter() - start, False, f"{type(e).__name__}: {e}")
+
+
+# Every writer process receives the parsed DataFrame once, through the pool initializer
+_SHARED_FRAME = None
+
+
+def _share_frame(df):
+    global _SHARED_FRAME
+    _SHARED_FRAME = df
+
+
+def _write_shared_frame(input_ext, output_file, output_ext):
+    return write_target(_SHARED_FRAME, input_ext, output_file, output_ext, "process")
+
+
+# Read the input once and write it to every output file concurrently, the output format comes
+# from each file's suffix ("out.csv.gz" is a gzip compressed CSV). A failing writer is reported in
+# its timing and doesn't stop the others, what it wrote is removed. An output file given twice is
+# an error before anything is read.
+# on_metrics receives the ConversionMetrics of the run, "write" covers all writers together.
+# compact also shrinks the copy of the DataFrame every writer process receives, workers > 1 parses
+# CSV input on that many processes (0 on every core). selection keeps some columns and the rows
+# matching a filter in every output, see selection.py
+def convert_fanout(input_file, output_files, input_ext=None, read_options=None, on_metrics=None, compact=False,
+                   workers=1, selection=None):
+    input_ext = input_ext or file_format(input_file)
+    targets = [(str(output_file), file_format(output_file)) for output_file in output_files]
+    if not targets:
+        raise ValueError("No output files given!")
+    check_targets(targets)
+    # Fail before reading anything if one of the pairs is unsupported
+    for _, output_ext in targets:
+        read_func, _ = get_conversion_functions(input_ext, output_ext)
+    read_func = parallel_reader(read_func, input_ext, workers)
+    read_options = {**(read_options or {}), **(selection.read_options(input_ext) if selection else {})}
+
+    metrics = ConversionMetrics("fanout", input_file, None, input_ext, ",".join(ext for _, ext in targets), on_metrics)
+    start = time.perf_counter()
+    try:
+        with metrics.stage("detect"):
+            kwargs = read_kwargs(input_file, input_ext)
+            if compact and input_ext == "csv" and workers == 1:
+                from .compact import csv_sample_dtypes
+                kwargs["dtype"] = csv_sample_dtypes(input_file, **kwargs)
+        with metrics.stage("read") as stage:
+            with open_input(input_file) as source:
+                df = read_func(source, **kwargs, **read_options)
+            stage.rows = metrics.rows = len(df)
+            stage.bytes_read = file_size(input_file)
+        if selection:
+            with metrics.stage("select") as stage:
+                df = selection.apply(df)
+                stage.rows = len(df)
+        if compact:
+            with metrics.stage("compact"):
+                from .compact import compact_frame
+                df = compact_frame(df)
+        read_seconds = time.perf_counter() - start
+
+        with metrics.stage("write") as stage:
+            writers = write_targets(df, input_ext, targets)
+            stage.rows = len(df) * sum(writer.ok for writer in writers)
+            stage.bytes_written = sum(file_size(writer.output_file) for writer in writers if writer.ok)
+    except BaseException as e:
+        metrics.finish(e)
+        raise
+    metrics.finish()
+    return FanoutResult(read_seconds, time.perf_counter() - start, writers)
+
+
+# Each output file once, two writers of the same file would overwrite each other
+def check_targets(targets):
+    seen = set()
+    for output_file, _ in targets:
+        if Path(output_file).resolve() in seen:
+            raise ValueError(f"Output file given more than once: {output_file}")
+        seen.add(Path(output_file).resolve())
+
+
+# A single target is written inline, several ones on threads and processes next to each other
+def write_targets(df, input_ext, targets):
+    if len(targets) == 1:
+        return [write_target(df, input_ext, *targets[0])]
+
+    thread_targets = [target for target in targets if target[1] in THREAD_WRITERS]
+    process_targets = [target for target in targets if target[1] not in THREAD_WRITERS]
+    futures = {}
+    with ThreadPoolExecutor(max_workers=max(len(thread_targets), 1)) as threads:
+        processes = None
+        if process_targets:
+            processes = ProcessPoolExecutor(max_workers=len(process_targets), initializer=_share_frame, initargs=(df,))
+        try:
+            for output_file, output_ext in process_targets:
+                futures[output_file] = processes.submit(_write_shared_frame, input_ext, output_file, output_ext)
+            for output_file, output_ext in thread_targets:
+                futures[output_file] = threads.submit(write_target, df, input_ext, output_file, output_ext, "thread")
+            return [futures[output_file].result() for output_file, _ in targets]
+        finally:
+            if processes is not None:
+                processes.shutdown()
@@ -0,0 +1,171 @@
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from .chunking import CHUNK_ROWS, LayoutRows, PagedWriter, frame_slices
+from .compat import PANDAS_INTERNALS
+
+try:
+    from pandas.io.formats.format import DataFrameFormatter
+except ImportError:
+    DataFrameFormatter = None
+
+# HTML tables identical to DataFrame.to_html. pandas formats the cells a column at a time, then
+# writes them one by one through its tag writer, here the rows are put together from the
+# formatted columns with string operations. Decisions pandas takes for a whole column (decimals,
+# notation, date format) come from the layout rows, see html_layout_positions
+
+BODY_OPEN = "  <tbody>\n"
+BODY_CLOSE = "  </tbody>\n</table>"
+ROW_OPEN = "    <tr>\n"
+ROW_CLOSE = "    </tr>\n"
+
+NANOSECONDS_PER_DAY = 86_400 * 10**9
+
+# The cells are formatted with private pandas helpers, used with the pinned pandas release only
+# (see compat). Otherwise the rows are cut out of to_html's output for each chunk
+HTML_INTERNALS = (PANDAS_INTERNALS and hasattr(DataFrameFormatter, "format_col")
+                  and hasattr(pd.Index, "_format_flat"))
+
+
+# ====== Layout rows ====== #
+
+# pandas formats a float column with a shared number of decimals and switches the whole column to
+# scientific notation on very large or very small values, prints a date column without times when
+# all times are midnight, with as many fractional digits as its most precise value, and a
+# timedelta column without times when all are whole days. The index is formatted the same way
+def html_layout_positions(frame):
+    positions = []
+    for series in [frame.index.to_series(), *(frame.iloc[:, position] for position in range(frame.shape[1]))]:
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            series = pd.Series(np.asarray(series))
+        kind = series.dtype.kind
+        if kind == "f":
+            positions.extend(float_positions(series.to_numpy()))
+        elif kind == "M":
+            if getattr(series.dtype, "tz", None) is not None:
+                series = series.dt.tz_localize(None)
+            positions.extend(time_positions(series, (NANOSECONDS_PER_DAY, 10**9, 10**6, 10**3)))
+        elif kind == "m":
+            positions.extend(time_positions(series, (NANOSECONDS_PER_DAY,)))
+    return positions
+
+
+def float_positions(values):
+    positions = []
+    finite = np.flatnonzero(np.isfinite(values))
+    infinite = np.flatnonzero(np.isinf(values))
+    if len(infinite):
+        positions.append(infinite[0])
+    if not len(finite):
+        return positions
+    # The longest number is the largest or the most negative one
+    positions.append(finite[values[finite].argmax()])
+    positions.append(finite[values[finite].argmin()])
+    absolute = np.abs(values[finite])
+    nonzero = np.flatnonzero(absolute)
+    if len(nonzero):
+        positions.append(finite[nonzero[absolute[nonzero].argmin()]])
+    decimals = [len(f"{value:.6f}".rstrip("0").split(".")[1]) for value in values[finite]]
+    positions.append(finite[int(np.argmax(decimals))])
+    return positions
+
+
+# First value that is not a whole number of each unit, in nanoseconds
+def time_positions(series, units):
+    values = series.to_numpy().astype(f"{series.dtype.kind}8[ns]").view("i8")
+    valid = series.notna().to_numpy()
+    positions = []
+    for unit in units:
+        found = np.flatnonzero(valid & (values % unit != 0))
+        if len(found):
+            positions.append(found[0])
+    return positions
+
+
+# ====== Rows ====== #
+
+def cell_lines(values, tag):
+    text = "".join(values)
+    if "&" in text or "<" in text or ">" in text:
+        values = [value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;") for value in values]
+    return [f"      <{tag}>{value.strip()}</{tag}>\n" for value in values]
+
+
+# Cells of a float column as pandas formats them. All cells get the same number of decimals, which
+# only the rows picked by float_positions decide: pandas formats those and the whole column is
+# printed with their decimals in one go. Columns in scientific notation are left to pandas
+def float_cells(formatter, frame, position):
+    values = frame.iloc[:, position].to_numpy()
+    sample = frame.iloc[sorted(set(float_positions(values))), [position]]
+    strings = [text.strip() for text in DataFrameFormatter(sample).format_col(0)]
+    numbers = [text for text in strings if text not in ("NaN", "inf", "-inf")]
+    if not numbers or any("e" in text or "." not in text for text in numbers):
+        return formatter.format_col(position)
+    decimals = len(numbers[0]) - numbers[0].index(".") - 1
+    cells = np.char.mod(f"%.{decimals}f", values).astype(object)
+    cells[np.isnan(values)] = "NaN"
+    return cells.tolist()
+
+
+# Table rows of a frame as to_html writes them: the index in bold cells, every value escaped and
+# stripped of the padding pandas formats it with
+def html_rows(frame):
+    if isinstance(frame.index, pd.MultiIndex) or not HTML_INTERNALS:
+        # Grouped index cells span several rows, pandas writes them. Without the private
+        # formatters (see HTML_INTERNALS) pandas writes every frame
+        document = frame.to_html()
+        start = document.index(BODY_OPEN) + len(BODY_OPEN)
+        return [ROW_OPEN + row for row in document[start:-len(BODY_CLOSE)].split(ROW_OPEN)[1:]]
+    formatter = DataFrameFormatter(frame)
+    # Values are never cut short, index labels are cut at display.max_colwidth like in pandas
+    with pd.option_context("display.max_colwidth", None):
+        columns = [cell_lines(float_cells(formatter, frame, position) if frame.dtypes.iloc[position] == np.float64
+                              else formatter.format_col(position), "td") for position in range(frame.shape[1])]
+    index = cell_lines(frame.index._format_flat(include_name=False), "th")
+    return list(map("".join, zip(repeat(ROW_OPEN), index, *columns, repeat(ROW_CLOSE))))
+
+
+# ====== Writer ====== #
+
+# Writes the rows of every chunk as they come, the layout rows of the schema pass are formatted
+# along with each chunk. The output is identical to DataFrame.to_html, page_rows splits it into
+# several complete tables
+class HtmlStreamWriter(PagedWriter):
+    layout_positions = staticmethod(html_layout_positions)
+
+    def __init__(self, output_file, layout_rows=None, page_rows=None):
+        super().__init__(output_file, layout_rows, page_rows)
+        self.head = None
+
+    def page_head(self):
+        return self.head or ""
+
+    def page_tail(self):
+        return BODY_CLOSE if self.head is not None else ""
+
+    def write(self, chunk):
+        if self.head is None:
+            document = chunk.iloc[:0].to_html()
+            self.head = document[:document.index(BODY_OPEN) + len(BODY_OPEN)]
+        if isinstance(chunk.index, pd.MultiIndex):
+            # Layout rows would join the spans of the grouped index cells
+            frame, drop = chunk, 0
+        else:
+            frame, drop = self.with_layout_rows(chunk)
+        rows = html_rows(frame)
+        self.write_rows(rows[:len(rows) - drop])
+        self.rows_written += len(chunk)
+
+
+# Whole-file write used by the conversion table, the frame is written in slices. A frame with a
+# grouped index is written a page at a time, its index cells span across slices
+def write_html(df, output_file, page_rows=None):
+    layout = LayoutRows(html_layout_positions)
+    layout.update(df)
+    slice_rows = (page_rows or max(len(df), 1)) if isinstance(df.index, pd.MultiIndex) else CHUNK_ROWS
+    with HtmlStreamWriter(output_file, layout.layout(), page_rows) as writer:
+        for frame in frame_slices(df, slice_rows):
+            writer.write(frame)
+    return writer.page_files
@@ -0,0 +1,341 @@
+import codecs
+import io
+import json
+import re
+from contextlib import contextmanager
+from itertools import islice
+
+import pandas as pd
+
+from .chunking import CHUNK_ROWS, ChunkWriter, frame_slices
+from .compat import PANDAS_INTERNALS
+from .compression import open_input, open_output
+
+try:
+    import orjson
+except ImportError:  # optional, only used with parser="orjson"
+    orjson = None
+
+try:
+    from pandas._libs.json import ujson_loads
+    from pandas.io.json._json import FrameParser
+except ImportError:
+    ujson_loads = FrameParser = None
+
+# pandas' JSON parser and its typing of parsed values are private, they are used with the pinned
+# pandas release only (see compat). Otherwise the standard json module parses and pd.read_json
+# types the values
+JSON_INTERNALS = (PANDAS_INTERNALS and FrameParser is not None
+                  and all(hasattr(FrameParser, name) for name in ("_parse", "_try_convert_dates")))
+
+# JSON documents (.json) and JSON Lines (.jsonl, .ndjson: one record per line). Values are typed
+# the way pd.read_json types them, whichever parser reads the text
+
+BYTE_ORDER_MARK = b"\xef\xbb\xbf"
+
+# Bytes read at a time from a JSON array, only the records not parsed yet are kept
+READ_BYTES = 1024**2
+
+# Whitespace between JSON values
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+# ====== Parsing ====== #
+
+# JSON is parsed by pandas' parser by default, so values are the ones pd.read_json gives.
+# parser="orjson" takes orjson instead when it is installed, several times faster, but orjson
+# reads floats exactly where pandas' parser rounds some of them ("0.3" may become
+# 0.30000000000000004 in pandas), so the last digit of a float can differ from pd.read_json.
+# What orjson rejects (NaN literals, integers beyond 64 bits) goes to pandas' parser, or to the
+# json module outside the pinned pandas release
+PARSERS = ("pandas", "orjson")
+
+
+def check_parser(parser):
+    if parser not in PARSERS:
+        raise ValueError(f"Unknown JSON parser {parser!r}, expected one of: {', '.join(PARSERS)}")
+    if parser == "orjson" and orjson is None:
+        raise ImportError("The orjson parser needs orjson: pip install orjson")
+
+
+def loads(data, parser="pandas"):
+    if parser == "orjson":
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return ujson_loads(data) if JSON_INTERNALS else json.loads(data)
+
+
+# pd.read_json's typing of an already parsed document: numbers in text become numbers, columns
+# with date-like names ("date", "*_at", "timestamp*", ...) become dates and so on. columns fixes
+# the columns of a list of records, records without a field get an empty value. dtype fixes the
+# dtype of some columns like read_json's dtype, their values are never taken for dates
+def typed_frame(decoded, dtype=None, columns=None, usecols=None):
+    if JSON_INTERNALS:
+        return DecodedFrameParser(decoded, dtype, columns, usecols).parse()
+    # Public API: the values are encoded again for pd.read_json, which types them. Columns with a
+    # fixed dtype and a date-like name may then become dates
+    frame = pd.read_json(io.StringIO(json.dumps(decoded)), dtype=True if dtype is None else dtype)
+    if columns is not None:
+        frame = frame.reindex(columns=columns)
+    if usecols is not None:
+        frame = frame[[name for name in frame.columns if usecols(name)]]
+    return frame
+
+
+# pd.read_json's FrameParser on values parsed already instead of text, see typed_frame
+class DecodedFrameParser(FrameParser or object):
+    def __init__(self, decoded, dtype=None, columns=None, usecols=None):
+        super().__init__("", None, dtype=True if dtype is None else dtype, keep_default_dates=True)
+        self.decoded = decoded
+        self.columns = columns
+        self.usecols = usecols
+
+    def _parse(self):
+        self.obj = pd.DataFrame(self.decoded, columns=self.columns, dtype=None)
+        if self.usecols is not None:
+            self.obj = self.obj[[name for name in self.obj.columns if self.usecols(name)]]
+
+    def _try_convert_dates(self):
+        fixed = [name for name in self.obj.columns if name in self.dtype] if isinstance(self.dtype, dict) else []
+        if not fixed:
+            return super()._try_convert_dates()
+        frame = self.obj
+        self.obj = frame.drop(columns=fixed)
+        super()._try_convert_dates()
+        self.obj = pd.concat([self.obj, frame[fixed]], axis=1)[frame.columns]
+
+
+# Combine two chunk kinds (see streaming.column_kind) the way pd.read_json types the values behind
+# them when it reads them together: values it can't take for numbers stay as they are, booleans
+# and numbers with gaps become floats, and a column of dates stays dates only if every chunk is
+def merge_json_kinds(first, second):
+    if first is None or first == second:
+        return second
+    kinds = {first, second}
+    if "M" in kinds:
+        return "M" if kinds == {"M", "n"} else "O"
+    if "O" in kinds:
+        return "O"
+    if kinds <= {"b", "i"}:
+        return "i"
+    return "f"
+
+
+# A path is opened (and decompressed) here, an open binary handle is read as it is
+@contextmanager
+def open_source(input_file):
+    if hasattr(input_file, "read"):
+        yield input_file
+    else:
+        with open_input(input_file) as handle:
+            yield handle
+
+
+# ====== JSON documents ====== #
+
+# Whole-file read, same result as pd.read_json. usecols leaves the other columns out before they
+# are typed, parser is one of PARSERS
+def read_json(input_file, dtype=None, usecols=None, parser="pandas"):
+    check_parser(parser)
+    with open_source(input_file) as handle:
+        data = handle.read()
+    return typed_frame(loads(data.removeprefix(BYTE_ORDER_MARK), parser), dtype, usecols=usecols)
+
+
+# Whether a JSON document is an array of records ("[{...}, ...]" as written by to_json with
+# orient="records"), the layout that can be read a record at a time
+def is_record_array(input_file):
+    with open_source(input_file) as handle:
+        start = handle.read(4096).removeprefix(BYTE_ORDER_MARK).lstrip()
+    return start[:1] == b"[" and start[1:].lstrip()[:1] in (b"{", b"]")
+
+
+# Items of a top-level JSON array or object, parsed one by one from a buffer that only holds what
+# wasn't parsed yet. The first item is the opening bracket, "[" or "{", then come the values of an
+# array or the (name, value) pairs of an object. Memory holds one value at a time: a record of an
+# array, a whole column of a column-oriented document
+def iter_json_items(handle, parser="pandas"):
+    # Floats are read like loads reads them
+    decoder = json.JSONDecoder(parse_float=ujson_loads if JSON_INTERNALS and parser == "pandas" else float)
+    text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    position = 0
+    complete = False
+    closing = None
+    name = None
+    # What comes next: the opening bracket, the first item or the closing bracket ("first"), a
+    # value, a name of an object ("name"), the ":" after it ("colon"), or "," or the closing
+    # bracket ("separator")
+    state = "open"
+
+    while True:
+        position = WHITESPACE.match(buffer, position).end()
+        if position < len(buffer):
+            char = buffer[position]
+            if state == "open":
+                if char not in "[{":
+                    raise ValueError("Expected a JSON array or object")
+                closing = "]" if char == "[" else "}"
+                yield char
+                position += 1
+                state = "first"
+                continue
+            if char == closing and state in ("first", "separator"):
+                return
+            if state == "separator":
+                if char != ",":
+                    raise ValueError(f"Expected ',' or {closing!r} between JSON values, found {char!r}")
+                position += 1
+                state = "value" if closing == "]" else "name"
+                continue
+            if state == "colon":
+                if char != ":":
+                    raise ValueError(f"Expected ':' after a JSON object name, found {char!r}")
+                position += 1
+                state = "value"
+                continue
+            if state == "first":
+                state = "value" if closing == "]" else "name"
+            if state == "name" and char != '"':
+                raise ValueError(f"Expected a JSON object name, found {char!r}")
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if complete:
+                    raise
+                end = None
+            # A value that runs to the end of the buffer, like a number, may go on in the next block
+            if end is not None and (end < len(buffer) or complete):
+                position = end
+                if state == "name":
+                    name = value
+                    state = "colon"
+                    continue
+                yield value if closing == "]" else (name, value)
+                state = "separator"
+                continue
+        if complete:
+            raise ValueError("Unexpected end of JSON document")
+        # A value larger than a block is read in growing blocks, so it is not parsed again for
+        # every block that brings a little more of it
+        block = handle.read(max(READ_BYTES, len(buffer) - position))
+        complete = not block
+        buffer = buffer[position:] + text_decoder.decode(block, final=complete)
+        position = 0
+
+
+# Values of a top-level JSON array, parsed one by one so memory stays flat for any file size
+def iter_json_array(handle, parser="pandas"):
+    items = iter_json_items(handle, parser)
+    if next(items) != "[":
+        raise ValueError("Expected a JSON array")
+    yield from items
+
+
+# Records in chunks of chunksize rows, typed like a whole-file read, with a RangeIndex that goes
+# on across chunks
+def record_chunks(records, chunksize, dtype=None, columns=None, usecols=None):
+    start = 0
+    while batch := list(islice(records, chunksize)):
+        chunk = typed_frame(batch, dtype, columns, usecols)
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield chunk
+
+
+# Chunked read of a JSON array of records for streaming mode, typed like a whole-file read.
+# columns fixes the column list across chunks
+def read_json_chunks(input_file, chunksize=CHUNK_ROWS, dtype=None, columns=None, usecols=None, parser="pandas"):
+    check_parser(parser)
+    with open_source(input_file) as handle:
+        yield from record_chunks(iter_json_array(handle, parser), chunksize, dtype, columns, usecols)
+
+
+# One column of any JSON document without reading the document whole: an array of records is
+# read in chunks, of a column-oriented object ({"column": {"0": value, ...}, ...}, how to_json
+# writes a DataFrame) only one column is held at a time. Typed like the column of a whole-file read
+def read_json_column_chunks(input_file, column, chunksize=CHUNK_ROWS):
+    with open_source(input_file) as handle:
+        items = iter_json_items(handle)
+        if next(items) == "[":
+            for chunk in record_chunks(items, chunksize, columns=[column]):
+                yield chunk[column]
+            return
+        # Names that look like numbers are numbers in a whole-file read
+        for name, values in items:
+            if name == column or name == str(column):
+                yield typed_frame({name: values})[column]
+                return
+    raise KeyError(column)
+
+
+# ====== JSON Lines ====== #
+
+# Lines of a JSON Lines file that hold a record, blank lines are skipped
+def record_lines(handle):
+    lines = iter(handle)
+    first = next(lines, b"").removeprefix(BYTE_ORDER_MARK)
+    if first.strip():
+        yield first
+    for line in lines:
+        if not line.isspace():
+            yield line
+
+
+# Several lines are parsed at once as one array, which is faster than a parser call per line
+def parse_lines(lines, parser="pandas"):
+    return loads(b"[" + b",".join(lines) + b"]", parser)
+
+
+def iter_jsonl_records(handle, parser="pandas"):
+    for line in record_lines(handle):
+        yield loads(line, parser)
+
+
+# Whole-file read, the records typed like pd.read_json(lines=True) types them
+def read_jsonl(input_file, dtype=None, usecols=None, parser="pandas"):
+    check_parser(parser)
+    with open_source(input_file) as handle:
+        records = parse_lines(list(record_lines(handle)), parser)
+    return typed_frame(records, dtype, usecols=usecols)
+
+
+# Chunked read for streaming mode, chunksize lines at a time. columns fixes the column list
+# across chunks, records that lack a field get an empty value like they do in a whole-file read
+def read_jsonl_chunks(input_file, chunksize=CHUNK_ROWS, dtype=None, columns=None, usecols=None, parser="pandas"):
+    check_parser(parser)
+    with open_source(input_file) as handle:
+        lines = record_lines(handle)
+        start = 0
+        while batch := list(islice(lines, chunksize)):
+            chunk = typed_frame(parse_lines(batch, parser), dtype, columns, usecols)
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            start += len(chunk)
+            yield chunk
+
+
+# One record per line, as DataFrame.to_json(orient="records", lines=True) writes them. The index
+# is not written, like in every records layout
+class JsonLinesWriter(ChunkWriter):
+    def __init__(self, output_file, layout_rows=None):
+        super().__init__(output_file, layout_rows)
+        self.file = open_output(output_file, "w", encoding="utf-8")
+
+    def write(self, chunk):
+        if len(chunk):
+            text = chunk.to_json(orient="records", lines=True)
+            self.file.write(text if text.endswith("\n") else text + "\n")
+        self.rows_written += len(chunk)
+
+    def close(self):
+        self.file.close()
+
+
+# Whole-file write used by the conversion table, the frame is written in slices so the text of
+# only one slice is held at a time
+def write_jsonl(df, output_file):
+    with JsonLinesWriter(output_file) as writer:
+        for frame in frame_slices(df):
+            writer.write(frame)
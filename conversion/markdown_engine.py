@@ -0,0 +1,385 @@
+import re
+
+import numpy as np
+
+from .chunking import PagedWriter, frame_slices
+
+# The layout below uses tabulate's private helpers, they are only relied on in the release
+# requirements.txt pins. With any other release (or none) every chunk is written by
+# DataFrame.to_markdown: a whole-file conversion is still identical, streamed chunks keep the
+# widths of their own cells and padded=False has no effect
+TABULATE_VERSION = "0.9.0"
+TABULATE_INTERNALS = ("_table_formats", "_multiline_width", "_visible_width", "_format", "_afterpoint",
+                      "_strip_ansi", "_type", "_choose_width_fn", "_align_header", "_append_multiline_row",
+                      "_append_basic_row", "_pad_row", "_append_line", "_align_column", "MIN_PADDING",
+                      "WIDE_CHARS_MODE", "wcwidth")
+
+try:
+    import tabulate
+
+    if tabulate.__version__ != TABULATE_VERSION or not all(hasattr(tabulate, name) for name in TABULATE_INTERNALS):
+        raise ImportError(f"tabulate {tabulate.__version__} is not the pinned {TABULATE_VERSION}")
+except ImportError:
+    tabulate = None
+
+# Markdown tables identical to DataFrame.to_markdown (tabulate's "pipe" format) without tabulate's
+# whole-table pass over Python cells: what tabulate decides per column (type, width, decimals) is
+# gathered chunk by chunk in the schema pass, then every chunk is padded with it and written out.
+# Cells of the common dtypes are formatted and padded a whole column at a time, only cells tabulate
+# measures differently (wide or invisible characters, line breaks) go through tabulate's helpers
+
+# tabulate's column types from least to most generic, a column gets the most generic type among
+# its cells but never less than bool
+BOOL, INT, FLOAT, BYTES, STR = 1, 2, 3, 4, 5
+TYPE_RANKS = {type(None): 0, bool: BOOL, int: INT, float: FLOAT, bytes: BYTES, str: STR}
+RANK_TYPES = {BOOL: bool, INT: int, FLOAT: float, BYTES: bytes, STR: str}
+KIND_RANKS = {"number": FLOAT, "float": FLOAT, "int": INT, "bool": BOOL, "text": STR, "object": BOOL}
+
+# Cell kinds of numpy dtypes in a frame that is not all numbers, see frame_cells
+DTYPE_KINDS = {"f": "float", "i": "int", "u": "int", "b": "bool", "M": "text"}
+
+PIPE = tabulate._table_formats["pipe"] if tabulate is not None else None
+PADDING = PIPE.padding if PIPE is not None else 1
+
+LINE_BREAK = re.compile("[\r\n]")
+
+
+def wide_chars():
+    return tabulate.wcwidth is not None and tabulate.WIDE_CHARS_MODE
+
+
+# Width tabulate gives a cell: its widest line without color codes, East Asian characters count twice
+def cell_width(text):
+    return tabulate._multiline_width(text, tabulate._visible_width)
+
+
+# Cells tabulate measures by their length: no wide, invisible or control characters, no line breaks
+def is_plain(strings):
+    text = "".join(strings)
+    return text.isascii() and text.isprintable()
+
+
+# ====== Cells ====== #
+
+# Headers of to_markdown: the index name (or nothing) followed by the column labels
+def frame_headers(frame):
+    name = frame.index.name
+    return ["" if name is None else str(name)] + [str(label) for label in frame.columns]
+
+
+def dtype_kind(dtype):
+    if isinstance(dtype, np.dtype):
+        return DTYPE_KINDS.get(dtype.kind, "object")
+    return "text" if dtype.kind == "M" else "object"
+
+
+# The cells of every column as tabulate gets them from DataFrame.values, the index first, each
+# with its kind:
+#   "number" numpy numbers of an all-numeric frame, tabulate takes every one of them for a float
+#   "float", "int", "bool" Python values of a numpy column
+#   "text" values written as str(), timestamps
+#   "object" anything else, typed cell by cell like tabulate does
+def frame_cells(frame):
+    index = frame.index
+    kind = dtype_kind(index.dtype)
+    yield kind, (index.to_numpy() if kind in ("float", "int", "bool") else index if kind == "text" else list(index))
+
+    if all(isinstance(dtype, np.dtype) for dtype in frame.dtypes):
+        matrix = None
+        matrix_kind = frame.iloc[:0].to_numpy().dtype.kind
+    else:
+        matrix = frame.to_numpy()
+        matrix_kind = matrix.dtype.kind
+    for position in range(frame.shape[1]):
+        series = frame.iloc[:, position]
+        if matrix_kind in "biuf":
+            yield "number", series.to_numpy() if matrix is None else matrix[:, position]
+        elif matrix_kind != "O" or not isinstance(series.dtype, np.dtype):
+            yield "object", series.to_numpy() if matrix is None else matrix[:, position]
+        else:
+            kind = dtype_kind(series.dtype)
+            yield kind, (series if kind == "text" else series.to_numpy(dtype=object) if kind == "object" else
+                         series.to_numpy())
+
+
+# Cells of a column formatted for the column's type, as tabulate's _format does
+def render(kind, values, rank):
+    if kind in ("number", "float") and rank == FLOAT:
+        return [format(value, "g") for value in values.astype(np.float64).tolist()]
+    if kind == "int" and rank == INT:
+        return list(map(str, values.tolist()))
+    if kind == "bool" and rank == BOOL:
+        return ["True" if value else "False" for value in values.tolist()]
+    if kind == "text" or rank in (BOOL, STR):
+        return ["" if value is None else f"{value}" for value in values]
+    value_type = RANK_TYPES[rank]
+    return [tabulate._format(value, value_type, "g", "", "", True) for value in values]
+
+
+# Digits after the decimal point (or the exponent) of every cell, -1 without one
+def decimal_places(kind, strings):
+    if kind in ("number", "float"):
+        text = np.array(strings)
+        point = np.char.rfind(text, ".")
+        point = np.where(point >= 0, point, np.char.rfind(text, "e"))
+        return np.where(point >= 0, np.char.str_len(text) - point - 1, -1).tolist()
+    if kind == "int":
+        return [-1] * len(strings)
+    return [tabulate._afterpoint(tabulate._strip_ansi(text)) for text in strings]
+
+
+# ====== Layout ====== #
+
+# What tabulate decides for the whole table, gathered one chunk at a time: the type of every
+# column, its width (the widest cell, at least the header plus padding) and for numbers the most
+# digits after the decimal point, every cell of the column is aligned on it. The type is only
+# known after the last chunk, so the width is kept for every type a column may still end up with.
+# padded=False skips the widths, every column is then as wide as its header and longer cells
+# are written as they are
+class MarkdownLayout:
+    def __init__(self, padded=True):
+        self.padded = padded
+        self.headers = None
+        self.multiline = False
+        self.rows = 0
+
+    def update(self, chunk):
+        if self.headers is None:
+            self.headers = frame_headers(chunk)
+            # A frame without columns or index name gets no header row, only the line
+            self.has_header = bool(len(chunk.columns)) or chunk.index.name is not None
+            count = len(self.headers)
+            self.ranks = [BOOL] * count
+            self.text_widths = [{} for _ in range(count)]
+            self.decimals = [{} for _ in range(count)]
+            self.spans = [{} for _ in range(count)]
+            self.line_widths = [{} for _ in range(count)]
+            self.multiline = any(LINE_BREAK.search(header) for header in self.headers)
+        self.rows += len(chunk)
+        for position, (kind, values) in enumerate(frame_cells(chunk)):
+            self.update_column(position, kind, values)
+
+    def update_column(self, position, kind, values):
+        rank = max(self.ranks[position], KIND_RANKS[kind])
+        if kind == "object" and rank < STR:
+            for value in values:
+                rank = max(rank, TYPE_RANKS.get(tabulate._type(value), STR))
+                if rank == STR:
+                    break
+        self.ranks[position] = rank
+
+        if kind != "object":
+            if not self.padded:
+                return
+            strings = render(kind, values, rank)
+            if rank in (INT, FLOAT):
+                self.update_decimals(position, rank, kind, strings)
+            else:
+                self.update_text(position, STR, strings)
+            return
+
+        strings = ["" if value is None else f"{value}" for value in values]
+        text = "".join(strings)
+        if "\n" in text or "\r" in text:
+            self.multiline = True
+        if not self.padded:
+            return
+        self.update_text(position, STR, strings)
+        # Types above the column's current one are still possible, their renderings are measured too
+        for candidate in (INT, FLOAT, BYTES):
+            if candidate >= rank:
+                try:
+                    strings = render(kind, values, candidate)
+                except (TypeError, ValueError):
+                    # "True" is no float, tabulate fails on such a column as the writer will
+                    continue
+                if candidate == BYTES:
+                    self.update_text(position, BYTES, strings)
+                else:
+                    self.update_decimals(position, candidate, kind, strings)
+
+    # Left-aligned cells are stripped and padded to the widest one
+    def update_text(self, position, rank, strings):
+        strings = [text.strip() for text in strings]
+        width = max(map(len if is_plain(strings) else cell_width, strings), default=0)
+        widths = self.text_widths[position]
+        widths[rank] = max(widths.get(rank, 0), width)
+
+    # Numbers are aligned on the decimal point: a cell gets spaces up to the column's most
+    # decimals, the column is as wide as its widest cell after that. Only the last line of a cell
+    # gets the spaces
+    def update_decimals(self, position, rank, kind, strings):
+        if not strings:
+            return
+        places = decimal_places(kind, strings)
+        if is_plain(strings):
+            span = max(len(text) - after for text, after in zip(strings, places))
+            lines = 0
+        else:
+            span = None
+            lines = 0
+            for text, after in zip(strings, places):
+                *head, last = LINE_BREAK.split(text)
+                width = tabulate._visible_width(last) - after
+                span = width if span is None else max(span, width)
+                lines = max([lines, *map(tabulate._visible_width, head)])
+        decimals, spans, line_widths = self.decimals[position], self.spans[position], self.line_widths[position]
+        decimals[rank] = max(decimals.get(rank, -1), max(places))
+        spans[rank] = max(spans.get(rank, span), span)
+        line_widths[rank] = max(line_widths.get(rank, 0), lines)
+
+    # Settle alignment, width and decimals of every column once all chunks are in
+    def layout(self):
+        self.aligns = []
+        self.widths = []
+        self.points = []
+        for position, header in enumerate(self.headers or []):
+            rank = self.ranks[position]
+            width = cell_width(header) + tabulate.MIN_PADDING if self.has_header else 0
+            points = None
+            if rank in (INT, FLOAT):
+                self.aligns.append("decimal")
+                if self.padded and rank in self.spans[position]:
+                    points = self.decimals[position][rank]
+                    width = max(width, self.spans[position][rank] + points, self.line_widths[position][rank])
+            else:
+                self.aligns.append("left")
+                if self.padded:
+                    width = max(width, self.text_widths[position].get(BYTES if rank == BYTES else STR, 0))
+            self.widths.append(width)
+            self.points.append(points)
+        return self
+
+    # Header row and the line under it
+    def head(self):
+        width_fn = tabulate._choose_width_fn(True, wide_chars(), self.multiline)
+        headers = [tabulate._align_header(header, align, width, width_fn(header), self.multiline, width_fn)
+                   for header, align, width in zip(self.headers, self.aligns, self.widths)]
+        padded_widths = [width + 2 * PADDING for width in self.widths]
+        lines = []
+        if not self.has_header:
+            pass
+        elif self.multiline:
+            tabulate._append_multiline_row(lines, headers, padded_widths, self.aligns, PIPE.headerrow, PADDING)
+        else:
+            tabulate._append_basic_row(lines, tabulate._pad_row(headers, PADDING), padded_widths, self.aligns,
+                                       PIPE.headerrow)
+        tabulate._append_line(lines, padded_widths, self.aligns, PIPE.linebelowheader)
+        return "\n".join(lines)
+
+    # Cells of one column of a chunk, padded to the column's width
+    def pad(self, position, kind, values):
+        rank = self.ranks[position]
+        align, width, points = self.aligns[position], self.widths[position], self.points[position]
+        strings = render(kind, values, rank)
+        if is_plain(strings):
+            if align == "left":
+                strings = [text.strip() for text in strings]
+                # tabulate leaves the empty cells of a multiline table empty, the row blanks them
+                if self.multiline:
+                    return [text.ljust(width) if text else text for text in strings]
+                return [text.ljust(width) for text in strings]
+            if points is None:
+                return [text.rjust(width) for text in strings]
+            places = decimal_places(kind, strings)
+            return [(text + " " * (points - after)).rjust(width) for text, after in zip(strings, places)]
+
+        if not self.padded:
+            return [tabulate._align_column([text], align, width, True, wide_chars(), self.multiline)[0]
+                    for text in strings]
+        # tabulate pads the chunk to the column's width, a number with the column's decimals is
+        # added so the cells are aligned on the same decimal point as in the whole table
+        if align == "decimal":
+            strings = strings + ["0." + "0" * points if points >= 0 else "0"]
+        cells = tabulate._align_column(strings, align, width, True, wide_chars(), self.multiline)
+        return cells[:-1] if align == "decimal" else cells
+
+    # Table rows of a chunk, each with the line break in front of it
+    def chunk_rows(self, chunk):
+        columns = [self.pad(position, kind, values) for position, (kind, values) in enumerate(frame_cells(chunk))]
+        if not self.multiline:
+            return [f"\n| {row} |" for row in map(" | ".join, zip(*columns))]
+        return [self.multiline_row(cells) for cells in zip(*columns)]
+
+    # A row of a multiline table, a cell with several lines spreads the row over several lines
+    def multiline_row(self, cells):
+        if all(len(cell.splitlines()) == 1 for cell in cells):
+            return f"\n| {' | '.join(cells)} |"
+        lines = []
+        padded_widths = [width + 2 * PADDING for width in self.widths]
+        tabulate._append_multiline_row(lines, list(cells), padded_widths, self.aligns, PIPE.datarow, PADDING)
+        return "".join(f"\n{line}" for line in lines)
+
+
+# ====== Writer ====== #
+
+# Writes the rows of every chunk as they come, with the layout of the schema pass. The output is
+# identical to DataFrame.to_markdown, page_rows splits it into several complete tables
+class MarkdownStreamWriter(PagedWriter):
+    def __init__(self, output_file, layout=None, page_rows=None, padded=True):
+        super().__init__(output_file, layout, page_rows)
+        self.layout = layout
+        self.padded = padded
+        self.empty = None
+        self.head = None
+
+    @classmethod
+    def layout_collector(cls, padded=True, **options):
+        return MarkdownLayout(padded) if tabulate is not None else None
+
+    def page_head(self):
+        return self.layout.head() if tabulate is not None else self.head
+
+    def write(self, chunk):
+        if self.empty is None:
+            self.empty = chunk.iloc[:0]
+        if tabulate is None:
+            if len(chunk):
+                self.write_rows(self.table_rows(chunk))
+            self.rows_written += len(chunk)
+            return
+        if self.layout is None:
+            # Without a schema pass the input comes in one chunk, it is measured on its own
+            self.layout = MarkdownLayout(self.padded)
+            self.layout.update(chunk)
+            self.layout.layout()
+        if len(chunk):
+            self.write_rows(self.layout.chunk_rows(chunk))
+        self.rows_written += len(chunk)
+
+    # Rows of a chunk as DataFrame.to_markdown writes them, each with the line break in front of
+    # it. The header of the first chunk is the header of every page
+    def table_rows(self, chunk):
+        header_lines = 2 if len(chunk.columns) or chunk.index.name is not None else 1
+        lines = chunk.to_markdown().split("\n")
+        if self.head is None:
+            self.head = "\n".join(lines[:header_lines])
+        if len(lines) - header_lines == len(chunk) or not self.page_rows:
+            return [f"\n{line}" for line in lines[header_lines:]]
+        # Cells with line breaks spread a row over several lines, pages are cut between rows so
+        # these are rendered one by one
+        return ["\n" + chunk.iloc[[position]].to_markdown().split("\n", header_lines)[header_lines]
+                for position in range(len(chunk))]
+
+    def close(self):
+        # A table without rows has no index column, it is left to tabulate
+        if self.file is None:
+            self.open_page()
+            self.file.write("" if self.empty is None else self.empty.to_markdown())
+        if self.file is not None and not self.file.closed:
+            self.close_page()
+
+
+# Whole-file write used by the conversion table, the frame is measured and written in slices
+def write_markdown(df, output_file, page_rows=None, padded=True):
+    if tabulate is None:
+        with MarkdownStreamWriter(output_file, None, page_rows, padded) as writer:
+            writer.write(df)
+        return writer.page_files
+    layout = MarkdownLayout(padded)
+    for frame in frame_slices(df):
+        layout.update(frame)
+    with MarkdownStreamWriter(output_file, layout.layout(), page_rows, padded) as writer:
+        for frame in frame_slices(df):
+            writer.write(frame)
+    return writer.page_files
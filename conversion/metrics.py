@@ -0,0 +1,258 @@
+import json
+import os
+import threading
+import time
+import warnings
+from contextlib import contextmanager
+
+# Called with every finished ConversionMetrics, see add_metrics_hook
+_METRICS_HOOKS = []
+
+# Seconds between two samples of the resident memory while a stage runs
+RSS_SAMPLE_SECONDS = 0.01
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+# Resident memory of this process now in MB, None where the platform doesn't tell without extra
+# packages (only Linux does, in pages in /proc/self/statm). The process high-water mark
+# (ru_maxrss) can't be used: it never goes down, so it would show the peak of an earlier
+# conversion for every later one
+def rss_mb():
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * PAGE_SIZE / 1024**2, 1)
+
+
+RSS_SAMPLING = rss_mb() is not None
+
+
+# Samples the resident memory into the running stage of a conversion until it is stopped
+class RssSampler(threading.Thread):
+    def __init__(self, metrics):
+        super().__init__(name="rss-sampler", daemon=True)
+        self.metrics = metrics
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(RSS_SAMPLE_SECONDS):
+            self.metrics.sample()
+
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except (OSError, TypeError):
+        return 0
+
+
+# Counters of one stage. A stage entered several times (once per chunk in streaming mode) adds up
+class Stage:
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.rows = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.peak_rss_mb = None
+
+    def as_dict(self):
+        return {
+            "stage": self.name,
+            "seconds": round(self.seconds, 6),
+            "cpu_seconds": round(self.cpu_seconds, 6),
+            "rows": self.rows,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "peak_rss_mb": self.peak_rss_mb,
+        }
+
+
+# Per-stage wall time, CPU time, bytes, rows and peak memory of one conversion.
+# Stage times are exclusive: a stage entered inside another one pauses the outer stage, so the
+# stages add up to the total. CPU time is that of the whole process, in streaming mode the reader
+# thread works while the other stages run. Peak memory is the highest resident memory of the
+# process while the stage ran, sampled every RSS_SAMPLE_SECONDS and when stages start and end,
+# so a shorter spike may be missed. The peak of the conversion is the highest of its stages.
+# stages fixes the order stages are reported in, when they are not entered in that order.
+# finish() hands the result to on_metrics and to every registered hook
+class ConversionMetrics:
+    def __init__(self, operation, input_file, output_file=None, input_ext=None, output_ext=None, on_metrics=None,
+                 stages=()):
+        self.operation = operation
+        self.input_file = str(input_file)
+        self.output_file = None if output_file is None else str(output_file)
+        self.input_ext = input_ext
+        self.output_ext = output_ext
+        self.on_metrics = on_metrics
+        self.stages = {name: Stage(name) for name in stages}
+        self.active = []
+        self.sampler = None
+        self.rows = 0
+        self.ok = None
+        self.error = ""
+        self.seconds = None
+        self.cpu_seconds = None
+        self.peak_rss_mb = None
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.cpu_start = time.process_time()
+
+    def charge(self, entry, now, cpu):
+        stage, wall_start, cpu_start = entry
+        stage.seconds += now - wall_start
+        stage.cpu_seconds += cpu - cpu_start
+
+    # Resident memory now, counted towards the peak of the running stage. Called from the sampler
+    # thread too, so the running stage is looked up once
+    def sample(self):
+        running = self.active[-1:]
+        rss = rss_mb() if running else None
+        if rss is not None:
+            stage = running[0][0]
+            stage.peak_rss_mb = rss if stage.peak_rss_mb is None else max(stage.peak_rss_mb, rss)
+
+    @contextmanager
+    def stage(self, name):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = Stage(name)
+        now, cpu = time.perf_counter(), time.process_time()
+        if self.active:
+            self.sample()
+            self.charge(self.active[-1], now, cpu)
+        self.active.append((stage, now, cpu))
+        self.sample()
+        # The sampler runs while the outermost stage does
+        if self.sampler is None and RSS_SAMPLING:
+            self.sampler = RssSampler(self)
+            self.sampler.start()
+        try:
+            yield stage
+        finally:
+            self.sample()
+            if len(self.active) == 1 and self.sampler is not None:
+                self.sampler.stopped.set()
+                self.sampler = None
+            now, cpu = time.perf_counter(), time.process_time()
+            self.charge(self.active.pop(), now, cpu)
+            if self.active:
+                self.sample()
+                self.active[-1] = (self.active[-1][0], now, cpu)
+
+    # Iterate over chunks with the time spent waiting for each one charged to a stage
+    def timed(self, chunks, name="read"):
+        iterator = iter(chunks)
+        while True:
+            with self.stage(name) as stage:
+                chunk = next(iterator, None)
+                if chunk is not None:
+                    stage.rows += len(chunk)
+            if chunk is None:
+                return
+            yield chunk
+
+    @property
+    def bytes_read(self):
+        return sum(stage.bytes_read for stage in self.stages.values())
+
+    @property
+    def bytes_written(self):
+        return sum(stage.bytes_written for stage in self.stages.values())
+
+    def finish(self, error=None):
+        self.seconds = time.perf_counter() - self.start
+        self.cpu_seconds = time.process_time() - self.cpu_start
+        peaks = [stage.peak_rss_mb for stage in self.stages.values() if stage.peak_rss_mb is not None]
+        self.peak_rss_mb = max(peaks, default=None)
+        self.ok = error is None
+        self.error = "" if error is None else f"{type(error).__name__}: {error}"
+        # A broken collector must not fail a conversion whose output is already written
+        for hook in [self.on_metrics, *_METRICS_HOOKS]:
+            if hook is None:
+                continue
+            try:
+                hook(self)
+            except Exception as e:
+                warnings.warn(f"Metrics hook {hook!r} failed: {e}")
+
+    def as_dict(self):
+        return {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "operation": self.operation,
+            "input_file": self.input_file,
+            "output_file": self.output_file,
+            "input_ext": self.input_ext,
+            "output_ext": self.output_ext,
+            "ok": self.ok,
+            "error": self.error,
+            "seconds": None if self.seconds is None else round(self.seconds, 6),
+            "cpu_seconds": None if self.cpu_seconds is None else round(self.cpu_seconds, 6),
+            "rows": self.rows,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "peak_rss_mb": self.peak_rss_mb,
+            "stages": [stage.as_dict() for stage in self.stages.values()],
+        }
+
+
+# ====== Hooks ====== #
+
+# Register a callable that receives the ConversionMetrics of every conversion, e.g. to forward
+# them to a metrics collector. Hooks run on the thread that did the conversion
+def add_metrics_hook(hook):
+    if hook not in _METRICS_HOOKS:
+        _METRICS_HOOKS.append(hook)
+    return hook
+
+
+def remove_metrics_hook(hook):
+    if hook in _METRICS_HOOKS:
+        _METRICS_HOOKS.remove(hook)
+
+
+# Appends one JSON object per conversion to a file
+class JsonLinesLog:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def __call__(self, metrics):
+        line = json.dumps(metrics.as_dict())
+        with self.lock, open(self.path, "a", encoding="utf-8") as log_file:
+            log_file.write(line + "\n")
+
+
+# Log every conversion from now on as a JSON line, returns the hook so it can be removed again
+def log_metrics(path):
+    return add_metrics_hook(JsonLinesLog(path))
+
+
+# ====== Summary ====== #
+
+def format_bytes(size):
+    return f"{size / 1024**2:.1f} MB" if size >= 1024**2 else f"{size / 1024:.1f} KB"
+
+
+# A few lines for the output window or stderr, one per stage
+def format_metrics(metrics):
+    pair = f"{(metrics.input_ext or '').upper()} to {(metrics.output_ext or '').upper()}"
+    lines = [f"{metrics.operation} {pair}: {metrics.rows:,} rows in {metrics.seconds:.2f}s "
+             f"(CPU {metrics.cpu_seconds:.2f}s)"
+             + (f", peak memory {metrics.peak_rss_mb:.0f} MB" if metrics.peak_rss_mb else "")]
+    for stage in metrics.stages.values():
+        line = f"  {stage.name:<8} {stage.seconds:8.3f}s  CPU {stage.cpu_seconds:7.3f}s"
+        if stage.rows:
+            line += f"  {stage.rows:,} rows"
+        if stage.bytes_read:
+            line += f"  {format_bytes(stage.bytes_read)} read"
+        if stage.bytes_written:
+            line += f"  {format_bytes(stage.bytes_written)} written"
+        lines.append(line)
+    if not metrics.ok:
+        lines.append(f"  failed: {metrics.error}")
+    return "\n".join(lines)
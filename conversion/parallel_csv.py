@@ -0,0 +1,261 @@
+import math
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .chunking import CHUNK_ROWS
+from .compression import compression_of
+from .csv_index import BYTE_SCANNABLE_ENCODINGS, open_csv_index
+from .streaming import column_kind, merge_kinds, read_csv_chunks
+
+# Files smaller than this are parsed on one core, starting the workers would take longer
+PARALLEL_MIN_BYTES = 16 * 1024**2
+
+# read_csv options the byte ranges can be parsed with, anything else is read on one core
+PARALLEL_OPTIONS = {"sep", "quotechar", "encoding", "header", "lineterminator", "dtype", "usecols"}
+
+# Numeric columns come back from the workers through shared memory, everything else is pickled.
+# On Windows a shared memory block disappears with the worker's last handle, there they are pickled too
+SHARED_MEMORY = os.name != "nt"
+
+# Chunks parsed ahead of the writer per worker in streaming mode
+CHUNKS_AHEAD_PER_WORKER = 2
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+# ====== Worker side ====== #
+
+# Column values for the parent process: numeric columns are copied into a shared memory block
+# once, only its name travels back
+def export_column(values):
+    if not SHARED_MEMORY or values.dtype.kind not in "biuf" or not values.nbytes:
+        return values
+    block = shared_memory.SharedMemory(create=True, size=values.nbytes)
+    np.ndarray(values.shape, values.dtype, buffer=block.buf)[:] = values
+    block.close()
+    return block.name, values.dtype.str, len(values)
+
+
+# Parse the rows of one byte range, runs in a worker process. Returns the column kinds, the row
+# count and the column values
+def parse_range(file, start, rows, names, dtype, read_options):
+    with open(file, "rb") as csv_file:
+        csv_file.seek(start)
+        frame = pd.read_csv(csv_file, header=None, names=names, nrows=rows, dtype=dtype, **read_options)
+    columns = [frame.iloc[:, position] for position in range(frame.shape[1])]
+    return [column_kind(column) for column in columns], len(frame), [export_column(column.to_numpy()) for column in columns]
+
+
+# ====== Parent side ====== #
+
+def is_shared(column):
+    return isinstance(column, tuple)
+
+
+def column_dtype(column):
+    return np.dtype(column[1]) if is_shared(column) else column.dtype
+
+
+# Copy a column from its worker into target and free its shared memory block
+def import_column(column, target):
+    if not is_shared(column):
+        target[:] = column
+        return
+    name, dtype, length = column
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        target[:] = np.ndarray(length, dtype, buffer=block.buf)
+    finally:
+        block.close()
+        block.unlink()
+
+
+# Free the shared memory of a part that is not put together, e.g. after an error
+def release(part):
+    for column in part[2]:
+        if is_shared(column):
+            try:
+                block = shared_memory.SharedMemory(name=column[0])
+            except FileNotFoundError:
+                continue
+            block.close()
+            block.unlink()
+
+
+# The dtype pandas gives the parts' columns when they are put together
+def combined_dtype(dtypes):
+    if len(set(dtypes)) == 1:
+        return dtypes[0]
+    if all(dtype.kind in "iuf" for dtype in dtypes):
+        return np.dtype("float64")
+    return np.dtype(object)
+
+
+# Put the parts together in file order, every column is copied once, straight into its final array
+def assemble(parts, names, first_row=0):
+    total = sum(rows for _, rows, _ in parts)
+    data = {}
+    for position in range(len(names)):
+        values = np.empty(total, combined_dtype([column_dtype(columns[position]) for _, _, columns in parts]))
+        row = 0
+        for _, rows, columns in parts:
+            import_column(columns[position], values[row:row + rows])
+            row += rows
+        data[position] = values
+    frame = pd.DataFrame(data, index=pd.RangeIndex(first_row, first_row + total), copy=False)
+    frame.columns = names
+    return frame
+
+
+# Columns whose kind differs between parts get the dtype a whole-file read settles on, as in the
+# schema pass of streaming mode. Returns the overrides and the parts that must be parsed again
+def dtype_overrides(parts, names):
+    overrides = {}
+    stale = set()
+    for position, name in enumerate(names):
+        seen = [kinds[position] for kinds, _, _ in parts]
+        kind = None
+        for part_kind in seen:
+            kind = merge_kinds(kind, part_kind)
+        if len(set(seen)) == 1 or kind not in ("f", "O"):
+            continue
+        overrides[name] = "float64" if kind == "f" else object
+        # All-missing parts are float NaN either way
+        stale.update(number for number, part_kind in enumerate(seen) if part_kind not in ("n", kind))
+    return overrides, sorted(stale)
+
+
+def is_categorical(dtype):
+    return str(dtype) == "category"
+
+
+# The row index of a CSV file that can be split into byte ranges, None when it has to be read on
+# one core: compressed, not byte-scannable, too small, or read with options or categorical dtypes
+# the ranges can't take (each range would get its own categories)
+def split_index(path, read_options):
+    if compression_of(path) is not None or not set(read_options) <= PARALLEL_OPTIONS:
+        return None
+    dtype = read_options.get("dtype")
+    if dtype is not None and (not isinstance(dtype, dict) or any(map(is_categorical, dtype.values()))):
+        return None
+    if str(read_options.get("encoding", "utf-8")).lower() not in BYTE_SCANNABLE_ENCODINGS:
+        return None
+    if os.path.getsize(path) < PARALLEL_MIN_BYTES:
+        return None
+    index = open_csv_index(path, read_options.get("quotechar", '"'), read_options.get("header", 0) is not None)
+    return index if index.rows >= 2 * index.step else None
+
+
+# Every column of the file, the ranges are parsed with all names and usecols picks from them
+def column_names(path, read_options):
+    options = {key: value for key, value in read_options.items() if key not in ("dtype", "usecols")}
+    return list(pd.read_csv(path, nrows=0, **options).columns)
+
+
+# Columns the ranges come back with, in file order
+def used_names(names, read_options):
+    usecols = read_options.get("usecols")
+    if usecols is None:
+        return names
+    return [name for name in names if (usecols(name) if callable(usecols) else name in usecols)]
+
+
+def range_options(read_options):
+    return {key: value for key, value in read_options.items() if key not in ("header", "dtype")}
+
+
+def start_pool(workers):
+    # Started before the workers so they share it: a block created in a worker is then
+    # unregistered by the parent's unlink and not reported as leaked
+    if SHARED_MEMORY:
+        from multiprocessing import resource_tracker
+        resource_tracker.ensure_running()
+    return ProcessPoolExecutor(max_workers=workers)
+
+
+# Whole-file read on several cores: the file is split into byte ranges at indexed row starts (see
+# csv_index.py, a line break inside a quoted field is never a split point), every range is parsed
+# in its own process and the columns are put together in order. Gives the same DataFrame as
+# pd.read_csv with the same options. Takes the path or a handle opened on it
+def read_csv_parallel(input_file, workers=None, **read_options):
+    path = input_file.name if hasattr(input_file, "read") else input_file
+    workers = workers or default_workers()
+    index = split_index(path, read_options) if workers > 1 else None
+    if index is None:
+        return pd.read_csv(input_file, **read_options)
+
+    names = column_names(path, read_options)
+    used = used_names(names, read_options)
+    options = range_options(read_options)
+    ranges = index.ranges(workers)
+    parts = []
+    try:
+        with start_pool(min(workers, len(ranges))) as pool:
+            dtype = read_options.get("dtype")
+            futures = [pool.submit(parse_range, path, start, rows, names, dtype, options) for start, _, _, rows in ranges]
+            for future in futures:
+                parts.append(future.result())
+            overrides, stale = dtype_overrides(parts, used)
+            if stale:
+                dtype = {**(dtype or {}), **overrides}
+                futures = {number: pool.submit(parse_range, path, ranges[number][0], ranges[number][3], names, dtype,
+                                               options) for number in stale}
+                for number, future in futures.items():
+                    release(parts[number])
+                    parts[number] = future.result()
+        return assemble(parts, used)
+    finally:
+        for part in parts:
+            release(part)
+
+
+# Chunk reader for streaming mode with the signature of the CHUNK_READERS: chunks of about
+# chunksize rows are parsed on several cores and yielded in file order, a few chunks ahead of the
+# writer. Falls back to read_csv_chunks for files that can't be split
+def read_csv_chunks_parallel(input_file, chunksize=CHUNK_ROWS, dtype=None, columns=None, workers=None, **options):
+    from .converter import read_kwargs
+
+    path = input_file.name if hasattr(input_file, "read") else input_file
+    read_options = {**read_kwargs(path, "csv"), **options}
+    workers = workers or default_workers()
+    index = split_index(path, {**read_options, "dtype": dtype}) if workers > 1 else None
+    if index is None:
+        yield from read_csv_chunks(input_file, chunksize, dtype, columns, **options)
+        return
+
+    names = column_names(path, read_options)
+    used = used_names(names, read_options)
+    options = range_options(read_options)
+    ranges = iter(index.ranges(math.ceil(index.rows / chunksize)))
+    pending = deque()
+    with start_pool(workers) as pool:
+        try:
+            while True:
+                while len(pending) < workers * CHUNKS_AHEAD_PER_WORKER:
+                    item = next(ranges, None)
+                    if item is None:
+                        break
+                    start, end, first_row, rows = item
+                    pending.append((first_row, end, pool.submit(parse_range, path, start, rows, names, dtype, options)))
+                if not pending:
+                    return
+                first_row, end, future = pending.popleft()
+                yield assemble([future.result()], used, first_row)
+                # The handle doesn't move while the workers read, it is put where the chunk ended so
+                # progress follows the file
+                if hasattr(input_file, "seek"):
+                    input_file.seek(index.key["size"] if end is None else end)
+        finally:
+            for _, _, future in pending:
+                if not future.cancel():
+                    try:
+                        release(future.result())
+                    except Exception:
+                        pass
@@ -0,0 +1,275 @@
+import gzip
+import io
+import os
+import zipfile
+from importlib.util import find_spec
+from typing import NamedTuple
+
+import pandas as pd
+
+from .chunking import CHUNK_ROWS
+from .compression import archive_member, compression_of, file_format, open_input
+from .converter import get_conversion_functions, read_kwargs
+from .csv_index import BYTE_SCANNABLE_ENCODINGS
+from .metrics import format_bytes
+from .parallel_csv import PARALLEL_MIN_BYTES, default_workers
+
+# Picks the engines and the mode of a conversion from the size and shape of its input, so small
+# files keep the whole-file path and big ones get the streaming or parallel one without flags
+
+# A whole-file conversion may use up to this share of the memory that is available right now
+MEMORY_SHARE = 0.5
+
+# Assumed when the platform doesn't tell how much memory is available
+DEFAULT_AVAILABLE_MEMORY = 2 * 1024**3
+
+# Peak memory of a whole-file read per byte of uncompressed input, measured with pandas 2.2.
+# CSV input is sampled instead, see sample_csv. An XLSX file is a zip archive, its factor is per
+# byte of the archive
+MEMORY_FACTORS = {"csv": 6, "json": 12, "jsonl": 12, "xml": 7, "xlsx": 20}
+
+# Peak memory of a whole-file read per byte of the DataFrame it gives, for the sampled CSV frame
+FRAME_PEAK_FACTOR = 2
+
+# Typical compression ratio of text tables, for formats whose stored size isn't read from the file
+COMPRESSION_RATIOS = {"gzip": 5, "bz2": 6, "xz": 7, "zstd": 5, "zip": 5}
+
+# Bytes of a CSV input parsed to count its columns and measure a row in memory
+SAMPLE_BYTES = 1024**2
+
+# Cells per chunk in streaming mode: wide inputs get fewer rows per chunk, so a chunk takes
+# about the memory of CHUNK_ROWS rows of a 20 column table
+CHUNK_CELLS = CHUNK_ROWS * 20
+MIN_CHUNK_ROWS = 1_000
+
+
+# What plan_conversion decided for a conversion and why. mode is "convert" (whole file) or
+# "stream", workers and read_options are passed on to it (read_options hold the engine choices,
+# e.g. {"engine": "pyarrow"} for CSV or {"parser": "etree"} for XML). data_bytes is the size of
+# the uncompressed input, rows and memory are estimates, None where the input doesn't tell
+class ConversionPlan(NamedTuple):
+    input_file: str
+    output_file: str
+    input_ext: str
+    output_ext: str
+    mode: str
+    workers: int
+    chunksize: int
+    read_options: dict
+    input_bytes: int
+    data_bytes: int
+    columns: int
+    rows: int
+    memory: int
+    available_memory: int
+    reasons: list
+
+
+def installed(module):
+    return find_spec(module) is not None
+
+
+# Memory this process can still use without swapping: MemAvailable on Linux, free pages elsewhere
+def available_memory():
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return DEFAULT_AVAILABLE_MEMORY
+
+
+# Size of the decompressed input and whether it is only estimated. gzip stores the size (modulo
+# 4 GiB) in its last bytes and zip in its directory, the other formats get a typical ratio
+def data_size(input_file):
+    size = os.path.getsize(input_file)
+    compression = compression_of(input_file)
+    if compression is None:
+        return size, False
+    try:
+        if compression == "gzip":
+            with open(input_file, "rb") as file:
+                file.seek(-4, os.SEEK_END)
+                stored = int.from_bytes(file.read(4), "little")
+            # A size of 4 GiB or more wrapped around, what is left of it is still a lower bound
+            return (stored, False) if stored >= size else (size * COMPRESSION_RATIOS[compression], True)
+        if compression == "zip":
+            with zipfile.ZipFile(input_file) as archive:
+                return archive_member(archive, input_file).file_size, False
+    except (OSError, ValueError, zipfile.BadZipFile, gzip.BadGzipFile):
+        pass
+    return size * COMPRESSION_RATIOS[compression], True
+
+
+# Parse the start of a CSV input: (columns, rows in the sample, bytes of the sample, memory of the
+# sampled frame). None when the sample doesn't parse, e.g. when it ends inside a quoted value
+def sample_csv(input_file, kwargs):
+    with open_input(input_file) as file:
+        data = file.read(SAMPLE_BYTES + 1)
+    if len(data) > SAMPLE_BYTES:
+        data = data[:data.rfind(b"\n", 0, SAMPLE_BYTES) + 1]
+    try:
+        frame = pd.read_csv(io.BytesIO(data), **kwargs)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return frame.shape[1], len(frame), len(data), int(frame.memory_usage(deep=True, index=False).sum())
+
+
+# Fields of the first record or the header cells of the sheet, None for an empty input
+def record_columns(input_file, input_ext, read_options):
+    if input_ext in ("json", "jsonl"):
+        from .json_engine import read_json_chunks, read_jsonl_chunks
+        first = next((read_jsonl_chunks if input_ext == "jsonl" else read_json_chunks)(input_file, 1), None)
+        return None if first is None else first.shape[1] or None
+    if input_ext == "xml":
+        from .xml_engine import iter_xml_records
+        return len(next(iter_xml_records(input_file, read_options.get("record")), {})) or None
+    if input_ext == "xlsx":
+        from .excel_engine import iter_sheet_rows
+        return len(next(iter_sheet_rows(input_file, read_options.get("sheet", 0)), [])) or None
+    return None
+
+
+def streaming_chunksize(columns):
+    if not columns:
+        return CHUNK_ROWS
+    return max(MIN_CHUNK_ROWS, min(CHUNK_ROWS, CHUNK_CELLS // columns))
+
+
+# Plan a conversion: the mode, workers, chunk size and reader engines that suit the input.
+# read_options are the caller's reader options (e.g. {"record": "//item"}), selection the
+# Selection of the conversion, if any. The pandas C parser stays the CSV engine unless
+# prefer_pyarrow is set, pyarrow infers some types differently (ISO dates become datetimes,
+# floats may round differently), which would change the output of existing conversions
+def plan_conversion(input_file, output_file, input_ext=None, output_ext=None, read_options=None, selection=None,
+                    prefer_pyarrow=False):
+    input_ext = input_ext or file_format(input_file)
+    output_ext = output_ext or file_format(output_file)
+    get_conversion_functions(input_ext, output_ext)
+    read_options = dict(read_options or {})
+    reasons = []
+
+    input_bytes = os.path.getsize(input_file)
+    data_bytes, estimated = data_size(input_file)
+    if compression_of(input_file) is not None:
+        reasons.append(f"{compression_of(input_file)} input holds {'about ' if estimated else ''}"
+                       f"{format_bytes(data_bytes)} of data")
+
+    # XML: lxml iterparse measured faster than pandas.read_xml at every size and can stream
+    chunked = input_ext in ("csv", "xml", "xlsx", "jsonl")
+    if input_ext in ("json", "jsonl"):
+        from .json_engine import is_record_array
+        parser = "orjson" if read_options.get("parser") == "orjson" else "pandas' parser"
+        if input_ext == "jsonl":
+            reasons.append(f"JSON Lines are parsed by {parser} and can stream")
+        elif is_record_array(input_file):
+            chunked = True
+            reasons.append(f"JSON array of records: parsed whole by {parser} or a record at a time when streaming")
+        else:
+            reasons.append(f"JSON is parsed by {parser}, only an array of records can stream")
+    if input_ext == "xml" and not installed("lxml"):
+        chunked = False
+        read_options["parser"] = "etree"
+        reasons.append("lxml is not installed: XML is read whole by pandas.read_xml with the standard library parser")
+    elif input_ext == "xml":
+        reasons.append("XML is read with lxml iterparse, faster than pandas.read_xml and able to stream")
+
+    columns = rows = None
+    memory = data_bytes * MEMORY_FACTORS[input_ext]
+    kwargs = read_kwargs(input_file, input_ext)
+    if input_ext == "csv":
+        sample = sample_csv(input_file, kwargs)
+        if sample is not None and sample[1]:
+            columns, sample_rows, sample_bytes, frame_bytes = sample
+            rows = round(sample_rows * data_bytes / sample_bytes)
+            memory = round(frame_bytes * data_bytes / sample_bytes * FRAME_PEAK_FACTOR)
+    elif chunked:
+        columns = record_columns(input_file, input_ext, read_options)
+    available = available_memory()
+    reasons.append(f"reading it whole takes about {format_bytes(memory)}, "
+                   f"{format_bytes(available)} of memory is available")
+
+    # Mode: the whole-file path has the lowest latency, streaming bounds memory by the chunk size
+    mode = "convert"
+    if memory <= available * MEMORY_SHARE:
+        reasons.append("fits in memory: whole-file conversion")
+    elif chunked:
+        mode = "stream"
+        reasons.append(f"more than {MEMORY_SHARE:.0%} of the available memory: streaming in chunks")
+    else:
+        reasons.append(f"more than {MEMORY_SHARE:.0%} of the available memory, but this input can only be read whole")
+    chunksize = streaming_chunksize(columns)
+    if mode == "stream" and chunksize != CHUNK_ROWS:
+        reasons.append(f"{columns} columns: {chunksize:,} rows per chunk")
+
+    # Workers and CSV engine
+    workers = 1
+    if input_ext == "csv":
+        arrow = installed("pyarrow")
+        projected = "usecols" in read_options or bool(selection and selection.read_options(input_ext))
+        if prefer_pyarrow and arrow and mode == "convert" and not projected and "lineterminator" not in kwargs:
+            read_options["engine"] = "pyarrow"
+            reasons.append("CSV is parsed by the pyarrow engine on every core")
+        else:
+            if prefer_pyarrow and arrow:
+                reasons.append("the pyarrow engine reads whole files without a column selection or CR line endings only")
+            elif prefer_pyarrow:
+                reasons.append("pyarrow is not installed")
+            elif arrow:
+                reasons.append("pyarrow is installed but not preferred, it infers some types differently")
+            workers, reason = csv_workers(input_file, data_bytes, rows, kwargs)
+            reasons.append(reason)
+
+    return ConversionPlan(str(input_file), str(output_file), input_ext, output_ext, mode, workers, chunksize,
+                          read_options, input_bytes, data_bytes, columns, rows, memory, available, reasons)
+
+
+# Workers of the pandas C parser and why: several only when the file is large enough to repay
+# starting them and parallel_csv can split it into byte ranges
+def csv_workers(input_file, data_bytes, rows, kwargs):
+    cores = default_workers()
+    if compression_of(input_file) is not None:
+        return 1, "CSV is parsed by the pandas C engine on one core, compressed input can't be split"
+    if str(kwargs.get("encoding", "utf-8")).lower() not in BYTE_SCANNABLE_ENCODINGS:
+        return 1, f"CSV is parsed by the pandas C engine on one core, {kwargs['encoding']} input can't be split"
+    if data_bytes < PARALLEL_MIN_BYTES:
+        return 1, f"CSV is parsed by the pandas C engine on one core, below {format_bytes(PARALLEL_MIN_BYTES)}"
+    if cores == 1:
+        return 1, "CSV is parsed by the pandas C engine on one core, the only one"
+    return 0, f"CSV is parsed by the pandas C engine on all {cores} cores{'' if rows is None else f', ~{rows:,} rows'}"
+
+
+# Text of a plan for a dry run
+def format_plan(plan):
+    mode = "whole file" if plan.mode == "convert" else f"streaming, {plan.chunksize:,} rows per chunk"
+    workers = "all cores" if plan.workers == 0 else f"{plan.workers} worker{'s' if plan.workers > 1 else ''}"
+    shape = ", ".join(part for part in (
+        None if plan.columns is None else f"{plan.columns} columns",
+        None if plan.rows is None else f"~{plan.rows:,} rows") if part)
+    lines = [f"plan {plan.input_ext.upper()} to {plan.output_ext.upper()}: {mode}, {workers}",
+             f"  input    {plan.input_file}  {format_bytes(plan.input_bytes)}" + (f"  ({shape})" if shape else ""),
+             f"  output   {plan.output_file}"]
+    engines = {key: value for key, value in plan.read_options.items() if key in ("engine", "parser")}
+    if engines:
+        lines.append("  engine   " + ", ".join(f"{key}={value}" for key, value in engines.items()))
+    lines.extend(f"  - {reason}" for reason in plan.reasons)
+    return "\n".join(lines)
+
+
+# Run a planned conversion. options are those of convert and convert_streaming (on_progress,
+# compact, write_options, selection, ...), read_options are added to the plan's
+def run_plan(plan, output_file=None, read_options=None, **options):
+    read_options = {**plan.read_options, **(read_options or {})}
+    output_file = plan.output_file if output_file is None else output_file
+    if plan.mode == "stream":
+        from .streaming import convert_streaming
+        return convert_streaming(plan.input_file, output_file, plan.input_ext, plan.output_ext, plan.chunksize,
+                                 read_options, workers=plan.workers, **options)
+    from .converter import convert
+    return convert(plan.input_file, output_file, plan.input_ext, plan.output_ext, read_options,
+                   workers=plan.workers, **options)
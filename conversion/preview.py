@@ -0,0 +1,280 @@
+import abc
+import itertools
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from .compression import open_input, split_suffix
+from .csv_index import BYTE_SCANNABLE_ENCODINGS, ROW_INDEX_STEP, open_csv_index
+from .dialect import detect_dialect
+from .excel_engine import iter_sheet_rows
+from .json_engine import is_record_array, iter_json_array, iter_jsonl_records, read_json
+from .xml_engine import iter_xml_records
+
+# Rows fetched per page, the first page is all a preview reads before it is shown
+PREVIEW_PAGE_ROWS = 200
+
+# Pages kept in memory per CSV preview, older ones are read again when scrolled back to
+MAX_CACHED_PAGES = 50
+
+# How often the row counter reports progress for files that can't be indexed, in rows
+INDEX_PROGRESS_ROWS = 100_000
+
+
+# Cell text as shown in the preview, missing values stay blank
+def display_value(value):
+    if value is None or (isinstance(value, float) and value != value):
+        return ""
+    return str(value)
+
+
+# Rows of a file fetched on demand. row_count() is the number of rows available right now, it
+# grows while the file is indexed or read, complete turns True once it is final
+class PreviewSource(abc.ABC):
+    columns = []
+    complete = True
+
+    @abc.abstractmethod
+    def row_count(self):
+        pass
+
+    # Cells of a row as display text, position < row_count()
+    @abc.abstractmethod
+    def row(self, position):
+        pass
+
+    def rows(self, start, stop):
+        return [self.row(position) for position in range(start, min(stop, self.row_count()))]
+
+    # Background work to make more rows available, on_progress(row_count) is called now and then
+    def build_index(self, on_progress=None):
+        pass
+
+    def can_fetch_more(self):
+        return False
+
+    # Read the next page in the calling thread, returns the number of new rows
+    def fetch_more(self):
+        return 0
+
+    def close(self):
+        pass
+
+
+# CSV preview with random access: a background scan records the byte offset of every
+# ROW_INDEX_STEP-th row, a page is then read by seeking to the nearest offset before it.
+# The index is kept on disk (see csv_index.py), a file previewed before opens fully indexed
+class CsvPreviewSource(PreviewSource):
+    def __init__(self, file):
+        self.file = file
+        self.dialect = detect_dialect(file)
+        self.read_options = {**self.dialect.read_csv_kwargs(), "dtype": str, "keep_default_na": False}
+        first_page = pd.read_csv(file, nrows=PREVIEW_PAGE_ROWS, **self.read_options)
+        self.columns = [str(column) for column in first_page.columns]
+        self.pages = OrderedDict({0: first_page.values.tolist()})
+        self.offsets = []
+        self.indexed_rows = len(first_page)
+        self.complete = len(first_page) < PREVIEW_PAGE_ROWS
+        self.stopped = threading.Event()
+
+    def row_count(self):
+        return self.indexed_rows
+
+    def row(self, position):
+        page, offset = divmod(position, PREVIEW_PAGE_ROWS)
+        if page not in self.pages:
+            self.pages[page] = self.read_page(page)
+            if len(self.pages) > MAX_CACHED_PAGES:
+                self.pages.popitem(last=False)
+        self.pages.move_to_end(page)
+        rows = self.pages[page]
+        return rows[offset] if offset < len(rows) else [""] * len(self.columns)
+
+    def read_page(self, page):
+        start = page * PREVIEW_PAGE_ROWS
+        checkpoint = start // ROW_INDEX_STEP
+        options = {**self.read_options, "header": None, "nrows": PREVIEW_PAGE_ROWS}
+        if checkpoint < len(self.offsets):
+            with open(self.file, "rb") as csv_file:
+                csv_file.seek(int(self.offsets[checkpoint]))
+                frame = pd.read_csv(csv_file, skiprows=start - checkpoint * ROW_INDEX_STEP, **options)
+        else:
+            # Not indexed (yet), skip the rows before the page the slow way
+            frame = pd.read_csv(self.file, skiprows=start + int(self.dialect.has_header), **options)
+        width = len(self.columns)
+        return [(row + [""] * width)[:width] for row in frame.fillna("").values.tolist()]
+
+    def build_index(self, on_progress=None):
+        if self.complete:
+            return
+        if self.dialect.encoding in BYTE_SCANNABLE_ENCODINGS:
+            self.scan_offsets(on_progress)
+        else:
+            self.count_rows(on_progress)
+        if not self.stopped.is_set():
+            self.complete = True
+            if on_progress is not None:
+                on_progress(self.indexed_rows)
+
+    def scan_offsets(self, on_progress):
+        def report(rows):
+            if rows > self.indexed_rows:
+                self.indexed_rows = rows
+                if on_progress is not None:
+                    on_progress(rows)
+
+        index = open_csv_index(self.file, self.dialect.quotechar, self.dialect.has_header, on_progress=report,
+                               stopped=self.stopped)
+        if index is not None:
+            self.offsets = index.offsets
+            self.indexed_rows = index.rows
+
+    # Files whose bytes can not be scanned directly are only counted, pages are read by skipping
+    def count_rows(self, on_progress):
+        rows = 0
+        options = {**self.dialect.read_csv_kwargs(), "usecols": [0], "chunksize": INDEX_PROGRESS_ROWS}
+        for chunk in pd.read_csv(self.file, **options):
+            if self.stopped.is_set():
+                return
+            rows += len(chunk)
+            self.indexed_rows = max(rows, self.indexed_rows)
+            if on_progress is not None:
+                on_progress(self.indexed_rows)
+        self.indexed_rows = rows
+
+    def close(self):
+        self.stopped.set()
+
+
+# Preview for formats read front to back (XML, XLSX, JSON): records are pulled a page at a time
+# as the user scrolls and kept as display text. Columns may grow when later records add fields
+class RecordPreviewSource(PreviewSource):
+    def __init__(self, records, columns=None):
+        self.records = iter(records)
+        self.columns = [str(column) for column in columns or []]
+        self.positions = {name: position for position, name in enumerate(self.columns)}
+        self.cache = []
+        self.complete = False
+        self.fetch_more()
+
+    def row_count(self):
+        return len(self.cache)
+
+    def row(self, position):
+        row = self.cache[position]
+        return row + [""] * (len(self.columns) - len(row))
+
+    def can_fetch_more(self):
+        return not self.complete
+
+    def fetch_more(self):
+        fetched = 0
+        for record in self.records:
+            self.cache.append(self.display_row(record))
+            fetched += 1
+            if fetched == PREVIEW_PAGE_ROWS:
+                return fetched
+        self.complete = True
+        return fetched
+
+    def display_row(self, record):
+        if isinstance(record, dict):
+            row = [""] * len(self.columns)
+            for name, value in record.items():
+                position = self.positions.get(name)
+                if position is None:
+                    position = self.positions[name] = len(self.columns)
+                    self.columns.append(name)
+                    row.append("")
+                row[position] = display_value(value)
+            return row
+        for position in range(len(self.columns), len(record)):
+            self.columns.append(f"Unnamed: {position}")
+        return [display_value(value) for value in record]
+
+    def close(self):
+        close = getattr(self.records, "close", None)
+        if close is not None:
+            close()
+
+
+def xlsx_preview(file):
+    rows = iter_sheet_rows(file)
+    header = next(rows, [])
+    columns = [name if name != "" else f"Unnamed: {position}" for position, name in enumerate(header)]
+    return RecordPreviewSource(rows, columns)
+
+
+# An array of records is parsed a page at a time, any other JSON document is parsed whole and
+# only the display rows are built lazily
+def json_preview(file):
+    if is_record_array(file):
+        source = open_input(file)
+        return RecordPreviewSource(stream_records(source, iter_json_array(source)))
+    df = read_json(file)
+    return RecordPreviewSource(df.itertuples(index=False, name=None), list(df.columns))
+
+
+def jsonl_preview(file):
+    source = open_input(file)
+    return RecordPreviewSource(stream_records(source, iter_jsonl_records(source)))
+
+
+PREVIEW_SOURCES = {
+    "csv": CsvPreviewSource,
+    "xml": lambda file: RecordPreviewSource(iter_xml_records(file)),
+    "xlsx": xlsx_preview,
+    "json": json_preview,
+    "jsonl": jsonl_preview,
+}
+
+
+# Records read from a decompressing stream, which is closed when they run out or the preview is closed
+def stream_records(source, records):
+    try:
+        yield from records
+    finally:
+        source.close()
+
+
+def chunk_rows(chunks):
+    for chunk in chunks:
+        yield from chunk.values.tolist()
+
+
+# A compressed file can't be seeked into, it is decompressed front to back a page at a time
+def compressed_preview(file, extension):
+    source = open_input(file)
+    try:
+        if extension == "csv":
+            options = {**detect_dialect(file).read_csv_kwargs(), "dtype": str, "keep_default_na": False}
+            chunks = pd.read_csv(source, chunksize=PREVIEW_PAGE_ROWS, **options)
+            first = next(chunks, None)
+            if first is None:
+                source.close()
+                return RecordPreviewSource([], [])
+            rows = chunk_rows(itertools.chain([first], chunks))
+            return RecordPreviewSource(stream_records(source, rows), list(first.columns))
+        if extension == "xml":
+            return RecordPreviewSource(stream_records(source, iter_xml_records(source)))
+        if extension == "jsonl" or is_record_array(file):
+            records = iter_jsonl_records(source) if extension == "jsonl" else iter_json_array(source)
+            return RecordPreviewSource(stream_records(source, records))
+        with source:
+            df = read_json(source)
+        return RecordPreviewSource(df.itertuples(index=False, name=None), list(df.columns))
+    except BaseException:
+        source.close()
+        raise
+
+
+# Open a preview, only the first page is read here so it returns quickly for any file size
+def open_preview(file):
+    extension, compression = split_suffix(file)
+    opener = PREVIEW_SOURCES.get(extension)
+    if opener is None:
+        raise ValueError(f"Preview is not supported for {extension.upper()} files!")
+    if compression is not None:
+        return compressed_preview(file, extension)
+    return opener(file)
@@ -0,0 +1,135 @@
+import os
+import time
+from typing import NamedTuple
+
+from .compression import open_input
+
+
+# Raised between chunks when the cancel event of a conversion is set
+class ConversionCancelled(Exception):
+    pass
+
+
+class ConversionProgress(NamedTuple):
+    bytes_done: int
+    bytes_total: int
+    rows: int
+    seconds: float
+
+    @property
+    def fraction(self):
+        return min(self.bytes_done / self.bytes_total, 1.0) if self.bytes_total else 1.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    @property
+    def mb_per_second(self):
+        return self.bytes_done / 1024**2 / self.seconds if self.seconds else 0.0
+
+    # Seconds left at the average rate so far, None until there is a rate to go by
+    @property
+    def eta_seconds(self):
+        if not self.bytes_done or not self.seconds:
+            return None
+        return max(self.bytes_total - self.bytes_done, 0) / (self.bytes_done / self.seconds)
+
+
+# Tracks how far a conversion got through its input. Every read pass opens the input through
+# open_pass(), progress is the position of that file handle, so it counts the bytes the parser
+# actually consumed. Once a pass knows the row count (expect_rows), the last pass is measured by
+# rows written instead, since its reader runs ahead of the writer. update() is called between
+# chunks and is where cancellation happens. Compressed inputs are decompressed on the way to the
+# reader, their progress is the share of the compressed file consumed
+class ProgressTracker:
+    def __init__(self, input_file, passes=1, on_progress=None, cancel_event=None):
+        self.input_file = input_file
+        self.size = os.path.getsize(input_file)
+        self.passes = passes
+        self.on_progress = on_progress
+        self.cancel_event = cancel_event
+        self.completed_passes = 0
+        self.handle = None
+        self.stream = None
+        self.rows = 0
+        self.pass_rows = 0
+        self.total_rows = None
+        self.start = time.perf_counter()
+
+    # Open the input for the next read pass, the previous pass counts as done
+    def open_pass(self):
+        if self.handle is not None:
+            self.close()
+            self.completed_passes += 1
+        self.passes = max(self.passes, self.completed_passes + 1)
+        self.handle = open(self.input_file, "rb")
+        self.stream = open_input(self.input_file, self.handle)
+        self.pass_rows = 0
+        return self.stream
+
+    def add_pass(self):
+        self.passes += 1
+
+    def expect_rows(self, total_rows):
+        self.total_rows = total_rows
+
+    def position(self):
+        if self.total_rows:
+            return min(self.size * self.pass_rows // self.total_rows, self.size)
+        try:
+            return min(self.handle.tell(), self.size)
+        except (AttributeError, ValueError):
+            return self.size
+
+    def snapshot(self):
+        done = self.completed_passes * self.size + self.position()
+        return ConversionProgress(done, self.passes * self.size, self.rows, time.perf_counter() - self.start)
+
+    def check_cancelled(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise ConversionCancelled("Conversion cancelled")
+
+    def update(self, rows=0):
+        self.check_cancelled()
+        self.rows += rows
+        self.pass_rows += rows
+        if self.on_progress is not None:
+            self.on_progress(self.snapshot())
+
+    def finish(self):
+        self.close()
+        self.completed_passes = self.passes
+        if self.on_progress is not None:
+            self.on_progress(ConversionProgress(self.passes * self.size, self.passes * self.size,
+                                                self.rows, time.perf_counter() - self.start))
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+
+
+# Delete what a failed or cancelled conversion left behind
+def remove_partial_output(output_file):
+    try:
+        os.remove(output_file)
+    except (OSError, TypeError):  # TypeError: an open handle, e.g. a zip archive member
+        pass
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return "--:--"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02}:{seconds:02}" if hours else f"{minutes:02}:{seconds:02}"
+
+
+# One status line for GUIs and the CLI: "42% | 120,000 rows/s | 35.2 MB/s | ETA 00:13"
+def format_progress(progress):
+    return (f"{progress.fraction:.0%} | {progress.rows_per_second:,.0f} rows/s | "
+            f"{progress.mb_per_second:.1f} MB/s | ETA {format_duration(progress.eta_seconds)}")
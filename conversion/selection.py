@@ -0,0 +1,79 @@
+import ast
+import operator
+import re
+from functools import partial
+from typing import NamedTuple
+
+# Column names in backticks, how DataFrame.query refers to names with spaces or other characters
+QUOTED_NAME = re.compile(r"`([^`]*)`")
+
+# Stands in for the quoted names while the rest of the expression is parsed
+QUOTED_PLACEHOLDER = "__quoted_column__"
+
+# Inputs whose readers take usecols and leave the other columns unparsed. The JSON parsers read
+# every field of a record, the other JSON columns are dropped before they are typed
+PROJECTING_READERS = {"csv", "xlsx", "xml", "json", "jsonl"}
+
+
+# Column names a filter expression refers to, bare or in backticks
+def filter_columns(where):
+    names = QUOTED_NAME.findall(where)
+    try:
+        tree = ast.parse(QUOTED_NAME.sub(QUOTED_PLACEHOLDER, where).strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid row filter {where!r}: {e.msg}")
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id != QUOTED_PLACEHOLDER and node.id not in names:
+            names.append(node.id)
+    return names
+
+
+# What a conversion keeps of its input: the given columns in the given order (None keeps all of
+# them) and the rows the filter expression matches, in DataFrame.query syntax like
+# 'price > 10 and country == "DE"' (None keeps all of them). The readers only parse the selected
+# columns and the ones the filter needs, see read_options
+class Selection(NamedTuple):
+    columns: tuple = None
+    where: str = None
+
+    # From the text of a form field or command line option: "id, name, price"
+    @classmethod
+    def parse(cls, columns=None, where=None):
+        names = tuple(name.strip() for name in (columns or "").split(",") if name.strip())
+        return cls(names or None, (where or "").strip() or None)
+
+    def __bool__(self):
+        return self.columns is not None or self.where is not None
+
+    # Columns the readers parse: the selected ones and the ones the filter looks at. None when
+    # every column is kept. A filter that isn't an expression fails here, before anything is read
+    def read_columns(self):
+        filtered = filter_columns(self.where) if self.where else []
+        if self.columns is None:
+            return None
+        names = list(self.columns)
+        for name in filtered:
+            if name not in names:
+                names.append(name)
+        return names
+
+    # Reader options for the input format. usecols is a test instead of a list, a name the filter
+    # uses that isn't a column (like "index") is left to query() and a missing selected column to
+    # apply(), both with a clear error. The test is picklable for the parallel CSV reader
+    def read_options(self, input_ext):
+        names = self.read_columns()
+        if names is None or input_ext not in PROJECTING_READERS:
+            return {}
+        return {"usecols": partial(operator.contains, frozenset(names))}
+
+    # Keep the matching rows of a DataFrame or chunk and the selected columns, row labels stay
+    # those of the input
+    def apply(self, df):
+        if self.where is not None:
+            df = df.query(self.where)
+        if self.columns is not None:
+            missing = [name for name in self.columns if name not in df.columns]
+            if missing:
+                raise ValueError(f"Columns not found: {', '.join(missing)}")
+            df = df[list(self.columns)]
+        return df
@@ -0,0 +1,174 @@
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from .compression import file_format, open_input
+from .converter import read_kwargs
+from .chunking import CHUNK_ROWS
+from .excel_engine import read_excel_chunks
+from .json_engine import read_json_column_chunks, read_jsonl_chunks
+from .xml_engine import read_xml_chunks
+
+# Number of smallest hashes kept for the distinct estimate, below this many values the count is exact
+DISTINCT_SKETCH_SIZE = 4096
+
+# Results keyed by (path, size, mtime, column), repeat clicks on Min/Mid/Max/Sum are free
+_STATISTICS_CACHE = {}
+
+
+class ColumnStatistics(NamedTuple):
+    column: Any
+    count: int
+    nulls: int
+    min: Any
+    mean: Any
+    max: Any
+    sum: Any
+    distinct: int
+    # Extremes of the text values of a column, see StatisticsAccumulator.result
+    text_min: Any = None
+    text_max: Any = None
+
+
+# ====== Column readers, only the selected column is ever parsed ====== #
+
+def read_csv_column(file, column, chunksize=CHUNK_ROWS):
+    for chunk in pd.read_csv(file, usecols=[column], chunksize=chunksize, **read_kwargs(file, "csv")):
+        yield chunk[column]
+
+
+def read_xlsx_column(file, column, chunksize=CHUNK_ROWS):
+    for chunk in read_excel_chunks(file, chunksize, usecols=[column]):
+        yield chunk[column]
+
+
+# Records without the column count as empty values
+def read_json_column(file, column, chunksize=CHUNK_ROWS):
+    yield from read_json_column_chunks(file, column, chunksize)
+
+
+# Records without the column count as empty values
+def read_jsonl_column(file, column, chunksize=CHUNK_ROWS):
+    for chunk in read_jsonl_chunks(file, chunksize, columns=[column]):
+        yield chunk[column]
+
+
+# Records without the column count as empty values
+def read_xml_column(file, column, chunksize=CHUNK_ROWS):
+    for chunk in read_xml_chunks(file, chunksize, columns=[column]):
+        yield chunk[column]
+
+
+COLUMN_READERS = {
+    "csv": read_csv_column,
+    "xlsx": read_xlsx_column,
+    "json": read_json_column,
+    "jsonl": read_jsonl_column,
+    "xml": read_xml_column,
+}
+
+
+# ====== Accumulator ====== #
+
+# Min, max, sum, counts and a k-minimum-values distinct sketch, updated one chunk at a time
+class StatisticsAccumulator:
+    def __init__(self, column):
+        self.column = column
+        self.count = 0
+        self.nulls = 0
+        self.numeric_min = self.numeric_max = None
+        self.text_min = self.text_max = None
+        self.total = 0
+        self.numeric_count = 0
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.sketch_full = False
+
+    def update(self, series):
+        values = series.dropna()
+        self.nulls += len(series) - len(values)
+        self.count += len(values)
+        if values.empty:
+            return
+
+        if values.dtype.kind in "biuf":
+            hashed = self.update_numbers(values)
+        else:
+            # Numbers among text stay numbers where the reader keeps them (JSON, XLSX), CSV and XML
+            # chunks with text hold their numbers as text
+            is_number = values.map(lambda value: isinstance(value, (int, float, np.number))).astype(bool)
+            text = values[~is_number].astype(str)
+            if not text.empty:
+                low, high = text.min(), text.max()
+                self.text_min = low if self.text_min is None else min(self.text_min, low)
+                self.text_max = high if self.text_max is None else max(self.text_max, high)
+            parts = [self.update_numbers(pd.to_numeric(values[is_number])), text]
+            hashed = pd.concat([part for part in parts if not part.empty])
+
+        hashes = pd.util.hash_pandas_object(hashed, index=False).to_numpy()
+        merged = np.unique(np.concatenate([self.hashes, hashes]))
+        self.sketch_full = self.sketch_full or len(merged) > DISTINCT_SKETCH_SIZE
+        self.hashes = merged[:DISTINCT_SKETCH_SIZE]
+
+    # Min, max and sum of numeric values, returned as the floats they are hashed as so 1 and 1.0
+    # (or 0.0 and -0.0) count as one value across chunks
+    def update_numbers(self, values):
+        numbers = values.astype("float64") if values.dtype.kind == "b" else values
+        if not numbers.empty:
+            low, high = numbers.min(), numbers.max()
+            self.numeric_min = low if self.numeric_min is None else min(self.numeric_min, low)
+            self.numeric_max = high if self.numeric_max is None else max(self.numeric_max, high)
+            self.total += numbers.sum()
+            self.numeric_count += len(numbers)
+        return values.astype("float64") + 0.0
+
+    # Exact while the sketch holds every hash, otherwise estimated from the k-th smallest hash
+    def distinct(self):
+        if not self.sketch_full:
+            return len(self.hashes)
+        kth = float(self.hashes[-1]) / float(np.iinfo(np.uint64).max)
+        return int(round((DISTINCT_SKETCH_SIZE - 1) / kth))
+
+    # Numbers and text are never compared with each other. min and max are the extremes of the
+    # numbers, or of the text in a column without numbers, text_min and text_max those of the text.
+    # Which values of a column with both are numbers depends on the chunk they were read in (a
+    # chunk with text keeps its numbers as text), so such a column has no mean and no sum
+    def result(self):
+        if self.numeric_min is not None:
+            low, high = self.numeric_min, self.numeric_max
+        else:
+            low, high = self.text_min, self.text_max
+        if self.text_min is not None:
+            total = mean = None
+        else:
+            total = self.total if self.numeric_count else 0
+            mean = self.total / self.numeric_count if self.numeric_count else None
+        return ColumnStatistics(self.column, self.count, self.nulls, low, mean, high, total, self.distinct(),
+                                self.text_min, self.text_max)
+
+
+# ====== Entry point ====== #
+
+# Single streaming pass over one column, cached per file version and column. Compressed files are
+# decompressed while they are read
+def column_statistics(file, column):
+    path = Path(file)
+    reader = COLUMN_READERS.get(file_format(path))
+    if reader is None:
+        raise ValueError(f"Statistics are not supported for {file_format(path).upper()} files!")
+
+    stat = path.stat()
+    key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns, column)
+    statistics = _STATISTICS_CACHE.get(key)
+    if statistics is None:
+        accumulator = StatisticsAccumulator(column)
+        with open_input(file) as source:
+            for series in reader(source, column):
+                accumulator.update(series)
+        statistics = _STATISTICS_CACHE[key] = accumulator.result()
+    return statistics
+
+
+def clear_statistics_cache():
+    _STATISTICS_CACHE.clear()
@@ -0,0 +1,326 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+from pandas.api.types import infer_dtype
+
+from .chunking import CHUNK_ROWS, ChunkWriter, prefetch
+from .compact import CompactSchema, apply_dtypes, compact_frame
+from .compression import open_output
+from .converter import get_conversion_functions, read_kwargs
+from .excel_engine import ExcelStreamWriter, merge_sheet_kinds, read_excel_chunks
+from .html_engine import HtmlStreamWriter
+from .json_engine import JsonLinesWriter, is_record_array, merge_json_kinds, read_json_chunks, read_jsonl_chunks
+from .markdown_engine import MarkdownStreamWriter
+from .metrics import ConversionMetrics, file_size
+from .progress import ProgressTracker, remove_partial_output
+from .transforms import prepare_for_output
+from .xml_engine import XmlStreamWriter, read_xml_chunks
+
+
+# ====== Chunked readers ====== #
+
+# Chunk readers take (input_file, chunksize, dtype, columns, **options). dtype holds the overrides
+# from the schema pass, columns the full column list for formats whose rows may lack fields
+def read_csv_chunks(input_file, chunksize=CHUNK_ROWS, dtype=None, columns=None, **options):
+    return pd.read_csv(input_file, chunksize=chunksize, dtype=dtype, **read_kwargs(input_file, "csv"), **options)
+
+
+# Inputs listed here are read in chunks, every other input is read whole and written as one chunk.
+# JSON is only read in chunks when it is an array of records, see chunk_reader
+CHUNK_READERS = {
+    "csv": read_csv_chunks,
+    "xml": read_xml_chunks,
+    "xlsx": read_excel_chunks,
+    "json": read_json_chunks,
+    "jsonl": read_jsonl_chunks,
+}
+
+
+# Inputs whose reader types values differently from read_csv, so the kinds of their chunks combine
+# differently too
+KIND_MERGES = {
+    "xlsx": merge_sheet_kinds,
+    "json": merge_json_kinds,
+    "jsonl": merge_json_kinds,
+}
+
+
+# Chunk reader of an input, None when it is read whole
+def chunk_reader(input_file, input_ext):
+    if input_ext == "json" and not is_record_array(input_file):
+        return None
+    return CHUNK_READERS.get(input_ext)
+
+
+# ====== Schema pass ====== #
+
+# Reduce a chunk column to the kind pandas would settle on for it:
+# "n" all missing, "?" booleans with missing values, otherwise the dtype kind
+def column_kind(series):
+    kind = series.dtype.kind
+    if kind == "f" and series.isna().all():
+        return "n"
+    if kind == "O" and infer_dtype(series, skipna=True) == "boolean":
+        return "?"
+    return kind
+
+
+# Combine two chunk kinds the same way a whole-file read combines the values behind them
+def merge_kinds(first, second):
+    if first is None or first == second:
+        return second
+    kinds = {first, second}
+    if "n" in kinds:
+        other = (kinds - {"n"}).pop()
+        if other in "iuf":
+            return "f"
+        if other in "b?":
+            return "?"
+        return other
+    if kinds <= set("iuf"):
+        return "f"
+    if kinds == {"b", "?"}:
+        return "?"
+    return "O"
+
+
+# First pass over a chunked input: settles the column list and the dtype of every column across
+# all chunks and feeds every chunk to the layout collector of the writer, new_layout creates one
+# (see ChunkWriter.layout_collector). Returns the dtype overrides, columns and boolean columns for
+# the second pass (see read_chunks) and the collected layout (None when values are formatted one by one).
+# With a progress tracker every pass reads through it and may be cancelled between chunks, a
+# CompactSchema given as schema sees every chunk of the first pass. Dtypes are settled on all
+# rows like in a whole-file read, the layout and schema only see what a Selection keeps of them.
+# merge combines the kinds of two chunks, see KIND_MERGES
+def scan_chunks(input_file, reader, chunksize=CHUNK_ROWS, new_layout=None, read_options=None, progress=None,
+                schema=None, selection=None, merge=merge_kinds):
+    read_options = read_options or {}
+    kinds = {}
+    seen = {}
+    present = {}
+    chunk_count = 0
+    row_count = 0
+    layout = new_layout() if new_layout else None
+    # Records of XML and JSON may bring their fields in any order, a chunk's columns then differ
+    # from the first chunk's and the layout is only collected in the second pass
+    first_columns = None
+    reordered = False
+
+    source = input_file if progress is None else progress.open_pass()
+    for chunk in reader(source, chunksize, **read_options):
+        if progress is not None:
+            progress.update()
+        chunk_count += 1
+        row_count += len(chunk)
+        if first_columns is None:
+            first_columns = list(chunk.columns)
+        reordered = reordered or list(chunk.columns) != first_columns
+        for position, name in enumerate(chunk.columns):
+            kind = column_kind(chunk.iloc[:, position])
+            kinds[name] = merge(kinds.get(name), kind)
+            seen.setdefault(name, set()).add(kind)
+            present[name] = present.get(name, 0) + 1
+        if selection and (layout is not None or schema is not None):
+            chunk = selection.apply(chunk)
+        if layout is not None and not reordered:
+            layout.update(chunk)
+        if schema is not None:
+            schema.update(chunk)
+
+    # A column missing from some chunks is all missing there
+    for name, count in present.items():
+        if count < chunk_count:
+            kinds[name] = merge(kinds[name], "n")
+            seen[name].add("n")
+    columns = list(kinds)
+
+    overrides = {}
+    for name, kind in kinds.items():
+        if len(seen[name]) > 1 and kind == "f":
+            overrides[name] = "float64"
+        elif len(seen[name]) > 1 and kind == "i":
+            overrides[name] = "int64"
+        elif len(seen[name]) > 1 and kind == "O":
+            overrides[name] = object
+    booleans = [name for name, kind in kinds.items() if len(seen[name]) > 1 and kind == "?"]
+
+    # A layout collected under chunk dtypes is stale once a column gets promoted, collect it again
+    if (overrides or booleans or reordered) and layout is not None:
+        layout = new_layout()
+        if progress is not None:
+            progress.add_pass()
+        source = input_file if progress is None else progress.open_pass()
+        for chunk in read_chunks(reader, source, chunksize, overrides, columns, booleans, read_options):
+            if progress is not None:
+                progress.update()
+            layout.update(selection.apply(chunk) if selection else chunk)
+
+    if progress is not None:
+        progress.expect_rows(row_count)
+    return overrides or None, columns, booleans, None if layout is None else layout.layout()
+
+
+# Second pass over a chunked input with what the schema pass settled. True/False values with gaps
+# are Python bools in an object column when the file is read whole, a chunk without gaps would
+# get a bool column instead, the boolean columns are made object in every chunk
+def read_chunks(reader, source, chunksize, overrides, columns, booleans, read_options):
+    for chunk in reader(source, chunksize, overrides or None, columns, **read_options):
+        if booleans:
+            chunk = chunk.astype({name: object for name in booleans if name in chunk.columns})
+        yield chunk
+
+
+# ====== Chunk writers ====== #
+
+class CsvChunkWriter(ChunkWriter):
+    def __init__(self, output_file, layout_rows=None):
+        super().__init__(output_file, layout_rows)
+        self.file = open_output(output_file, "w", newline="", encoding="utf-8")
+        self.header_written = False
+
+    def write(self, chunk):
+        chunk.to_csv(self.file, header=not self.header_written)
+        self.header_written = True
+        self.rows_written += len(chunk)
+
+    def close(self):
+        self.file.close()
+
+
+# DataFrame.to_json is column oriented, so each column is spooled to its own temporary
+# fragment and the fragments are stitched together once the last chunk is in
+class JsonChunkWriter(ChunkWriter):
+    def __init__(self, output_file, layout_rows=None):
+        super().__init__(output_file, layout_rows)
+        self.spool_dir = Path(tempfile.mkdtemp(prefix="dataconverter_"))
+        self.columns = None
+
+    def write(self, chunk):
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+        for position in range(chunk.shape[1]):
+            fragment = chunk.iloc[:, position].to_json()[1:-1]
+            if not fragment:
+                continue
+            with open(self.spool_dir / f"{position}.json", "a", encoding="utf-8") as spool:
+                if spool.tell():
+                    spool.write(",")
+                spool.write(fragment)
+        self.rows_written += len(chunk)
+
+    def close(self):
+        try:
+            with open_output(self.output_file, "w", encoding="utf-8") as output:
+                output.write("{")
+                for position, name in enumerate(self.columns or []):
+                    # Let pandas encode the key so escaping matches to_json exactly
+                    key = pd.DataFrame(columns=[name]).to_json()[1:-4]
+                    output.write(f"{',' if position else ''}{key}:{{")
+                    spool_file = self.spool_dir / f"{position}.json"
+                    if spool_file.exists():
+                        with open(spool_file, encoding="utf-8") as spool:
+                            shutil.copyfileobj(spool, output)
+                    output.write("}")
+                output.write("}")
+        finally:
+            shutil.rmtree(self.spool_dir, ignore_errors=True)
+
+
+STREAMING_WRITERS = {
+    "csv": CsvChunkWriter,
+    "json": JsonChunkWriter,
+    "jsonl": JsonLinesWriter,
+    "xml": XmlStreamWriter,
+    "html": HtmlStreamWriter,
+    "md": MarkdownStreamWriter,
+    "xlsx": ExcelStreamWriter,
+}
+
+
+# Streaming conversion: reads the input in bounded chunks and appends every chunk to the output.
+# Chunked inputs get a first pass that fixes columns and dtypes (and formatting for html/md)
+# across chunks, so the result matches the whole-file conversion. The second pass reads ahead
+# on a background thread, so parsing overlaps with writing.
+# on_progress receives a ConversionProgress after every chunk, setting cancel_event stops the
+# conversion at the next chunk with ConversionCancelled. A failed or cancelled conversion
+# leaves no partial output file behind. on_metrics receives the ConversionMetrics of the run,
+# where "read" is the time the writer waited for the next chunk. compact gives every chunk the
+# smallest dtypes that hold the values of the whole file, see compact.py. workers > 1 parses
+# CSV chunks on that many processes (0 on every core), they still reach the writer in file order.
+# write_options go to the writer, e.g. page_rows for html/md. selection keeps some columns and the
+# rows matching a filter in every chunk, the reader only parses the columns it needs
+def convert_streaming(input_file, output_file, input_ext, output_ext, chunksize=CHUNK_ROWS, read_options=None,
+                      on_progress=None, cancel_event=None, on_metrics=None, compact=False, workers=1,
+                      write_options=None, selection=None):
+    read_options = {**(read_options or {}), **(selection.read_options(input_ext) if selection else {})}
+    write_options = write_options or {}
+    read_func, _ = get_conversion_functions(input_ext, output_ext)
+    writer_class = STREAMING_WRITERS[output_ext]
+    reader = chunk_reader(input_file, input_ext)
+    if input_ext == "csv" and workers != 1:
+        from functools import partial
+        from .parallel_csv import read_csv_chunks_parallel
+        reader = partial(read_csv_chunks_parallel, workers=workers)
+    progress = ProgressTracker(input_file, 1 if reader is None else 2, on_progress, cancel_event)
+    stages = ("detect", *(("scan",) if reader is not None else ()), "read", *(("select",) if selection else ()),
+              "prepare", "write")
+    metrics = ConversionMetrics("stream", input_file, output_file, input_ext, output_ext, on_metrics, stages)
+
+    chunks = []
+    compact_dtypes = None
+    try:
+        if reader is None:
+            with metrics.stage("detect"):
+                kwargs = read_kwargs(input_file, input_ext)
+            with metrics.stage("read") as stage:
+                chunks = [read_func(progress.open_pass(), **kwargs, **read_options)]
+                stage.bytes_read = progress.size
+            layout = None
+        else:
+            with metrics.stage("detect"):
+                read_kwargs(input_file, input_ext)
+            with metrics.stage("scan") as stage:
+                schema = CompactSchema() if compact else None
+                overrides, columns, booleans, layout = scan_chunks(
+                    input_file, reader, chunksize, lambda: writer_class.layout_collector(**write_options),
+                    read_options, progress, schema, selection, KIND_MERGES.get(input_ext, merge_kinds))
+                compact_dtypes = None if schema is None else schema.dtypes()
+                stage.rows = progress.total_rows or 0
+                stage.bytes_read = progress.size * (progress.passes - 1)
+            chunks = prefetch(read_chunks(reader, progress.open_pass(), chunksize, overrides, columns, booleans,
+                                          read_options))
+
+        rows = 0
+        with metrics.stage("write") as write_stage:
+            with writer_class(output_file, layout, **write_options) as writer:
+                for chunk in metrics.timed(chunks, "read"):
+                    read_rows = len(chunk)
+                    if selection:
+                        with metrics.stage("select"):
+                            chunk = selection.apply(chunk)
+                    with metrics.stage("prepare"):
+                        if compact_dtypes is not None:
+                            chunk = apply_dtypes(chunk, compact_dtypes)
+                        elif compact:
+                            chunk = compact_frame(chunk)
+                        prepared = prepare_for_output(chunk, output_ext)
+                    writer.write(prepared)
+                    rows += len(chunk)
+                    progress.update(read_rows)
+            write_stage.rows = metrics.rows = rows
+            write_stage.bytes_written = file_size(output_file)
+        if reader is not None:
+            metrics.stages["read"].bytes_read = progress.size
+    except BaseException as e:
+        remove_partial_output(output_file)
+        metrics.finish(e)
+        raise
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+        progress.close()
+    progress.finish()
+    metrics.finish()
+    return rows
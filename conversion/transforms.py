@@ -0,0 +1,48 @@
+import re
+
+# Characters an XML element name may not contain (namespace colons included)
+XML_NAME_INVALID = re.compile(r"[^\w.\-]")
+
+
+# Turn a column label into a valid XML element name, spaces and other invalid characters become "_"
+def xml_element_name(label):
+    name = XML_NAME_INVALID.sub("_", str(label))
+    if not name or not (name[0].isalpha() or name[0] == "_"):
+        name = f"_{name}"
+    return name
+
+
+# Element names for all columns, labels that collapse onto the same name get a numeric suffix
+def xml_element_names(columns):
+    names = []
+    taken = set()
+    for label in columns:
+        name = base = xml_element_name(label)
+        counter = 1
+        while name in taken:
+            name = f"{base}_{counter}"
+            counter += 1
+        taken.add(name)
+        names.append(name)
+    return names
+
+
+# Rename DataFrame columns in memory so to_xml accepts them, the source file is never touched.
+# The rename happens on a shallow copy, a frame shared with other writers keeps its labels
+def sanitize_xml_columns(df):
+    names = xml_element_names(df.columns)
+    if names != list(df.columns):
+        df = df.copy(deep=False)
+        df.columns = names
+    return df
+
+
+# Transforms applied to every DataFrame (or chunk) right before it is written in a format
+OUTPUT_TRANSFORMS = {
+    "xml": sanitize_xml_columns,
+}
+
+
+def prepare_for_output(df, output_ext):
+    transform = OUTPUT_TRANSFORMS.get(output_ext)
+    return df if transform is None else transform(df)
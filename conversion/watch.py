@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from .batch import BatchJob, BatchSummary, convert_batch
+from .compression import file_format, output_path
+from .converter import CONVERSION_FUNCTIONS
+
+# Manifest of a watched folder, kept in the output directory unless another file is given
+MANIFEST_NAME = ".data_converter_manifest.json"
+
+# Bumped whenever the manifest layout changes, an older manifest is started over
+MANIFEST_VERSION = 1
+
+# Seconds between two scans of the input directory
+WATCH_INTERVAL = 2.0
+
+# Files modified less than this many seconds ago are left for the next scan, they may still be written
+SETTLE_SECONDS = 2.0
+
+# The manifest is saved after this many converted files too, not only after a whole round, so a
+# stopped run keeps most of its work
+SAVE_EVERY = 50
+
+HASH_BLOCK_BYTES = 1024**2
+
+
+def content_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# What was converted from each input file: its size, mtime and content hash when it was converted,
+# and per target format the output file and the error, if it failed. Inputs and outputs are kept
+# relative to their directory, so the manifest stays valid when both folders move
+class Manifest:
+    def __init__(self, path, files=None):
+        self.path = Path(path)
+        self.files = files or {}
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, encoding="utf-8") as manifest_file:
+                stored = json.load(manifest_file)
+            if stored.get("version") == MANIFEST_VERSION:
+                return cls(path, stored["files"])
+        except (OSError, ValueError, KeyError):
+            pass
+        return cls(path)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Written under a temporary name and moved into place, a crash never leaves half a manifest
+        temporary = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(temporary, "w", encoding="utf-8") as manifest_file:
+            json.dump({"version": MANIFEST_VERSION, "files": self.files}, manifest_file, indent=1)
+        os.replace(temporary, self.path)
+
+    # Entry of an input file for its current content, the targets of an older version are dropped
+    def entry(self, name, size, mtime_ns, sha256):
+        entry = self.files.get(name)
+        if entry is None or entry["sha256"] != sha256:
+            entry = self.files[name] = {"size": size, "mtime_ns": mtime_ns, "sha256": sha256, "targets": {}}
+        entry["size"], entry["mtime_ns"] = size, mtime_ns
+        return entry
+
+    def record(self, name, output_ext, output_file, error=""):
+        self.files[name]["targets"][output_ext] = {"output": output_file, "error": error}
+
+    def forget_missing(self, names):
+        for name in set(self.files) - set(names):
+            del self.files[name]
+
+
+# Converts the files of an input directory (recursively) into every target format in the output
+# directory, the subfolders are kept. Every scan converts only the inputs that are new or changed
+# since their last conversion, the manifest keeps that across restarts. A file whose size and mtime
+# match the manifest is skipped without being read, one that was only touched is hashed and skipped.
+# Failed conversions are retried once the input changes. Outputs of deleted inputs are left alone
+class FolderWatcher:
+    def __init__(self, input_dir, output_dir, output_exts, compression=None, streaming=False, workers=None,
+                 manifest_file=None, settle_seconds=SETTLE_SECONDS):
+        self.input_dir = Path(input_dir)
+        self.output_dir = Path(output_dir)
+        self.output_exts = [output_exts] if isinstance(output_exts, str) else list(output_exts)
+        self.compression = compression
+        self.streaming = streaming
+        self.workers = workers
+        self.settle_seconds = settle_seconds
+        self.manifest = Manifest.load(manifest_file or self.output_dir / MANIFEST_NAME)
+        self.pending = {}
+
+    # Input files in the directory, without hidden files and without the output directory when it
+    # lies inside the input directory
+    def input_files(self):
+        output_dir = self.output_dir.resolve()
+        for file in sorted(self.input_dir.rglob("*")):
+            if file.name.startswith(".") or not file.is_file():
+                continue
+            if output_dir in file.resolve().parents:
+                continue
+            yield file
+
+    def output_file(self, file, output_ext):
+        relative = file.relative_to(self.input_dir).parent
+        return output_path(file, output_ext, self.compression, self.output_dir / relative)
+
+    def relative_output(self, output_file):
+        return Path(output_file).relative_to(self.output_dir).as_posix()
+
+    # Jobs for every input and target format that is new, changed, failed before its last change
+    # or whose output is gone
+    def plan(self):
+        jobs = []
+        self.pending = {}
+        names = []
+        now = time.time()
+        for file in self.input_files():
+            name = file.relative_to(self.input_dir).as_posix()
+            input_ext = file_format(file)
+            targets = [output_ext for output_ext in self.output_exts if (input_ext, output_ext) in CONVERSION_FUNCTIONS]
+            if not targets:
+                continue
+            names.append(name)
+            try:
+                stat = file.stat()
+                if now - stat.st_mtime < self.settle_seconds:
+                    continue
+                entry = self.manifest.files.get(name)
+                if entry is None or (entry["size"], entry["mtime_ns"]) != (stat.st_size, stat.st_mtime_ns):
+                    entry = self.manifest.entry(name, stat.st_size, stat.st_mtime_ns, content_hash(file))
+            except OSError:
+                # Removed or still locked by whatever writes it, seen again on the next scan
+                continue
+            for output_ext in targets:
+                output_file = self.output_file(file, output_ext)
+                if Path(output_file).resolve() == file.resolve():
+                    continue
+                done = entry["targets"].get(output_ext)
+                if done is not None and done["output"] == self.relative_output(output_file) and (
+                        done["error"] or os.path.exists(output_file)):
+                    continue
+                jobs.append(BatchJob(str(file), output_file, input_ext, output_ext))
+                self.pending[(str(file), output_ext)] = name
+        self.manifest.forget_missing(names)
+        return jobs
+
+    # One scan: convert what changed and save the manifest. on_result gets every BatchResult
+    def run_once(self, on_result=None):
+        jobs = self.plan()
+        recorded = 0
+
+        def record(result):
+            nonlocal recorded
+            name = self.pending[(result.job.input_file, result.job.output_ext)]
+            self.manifest.record(name, result.job.output_ext, self.relative_output(result.job.output_file), result.error)
+            recorded += 1
+            if recorded % SAVE_EVERY == 0:
+                self.manifest.save()
+            if on_result is not None:
+                on_result(result)
+
+        summary = convert_batch(jobs, self.workers, self.streaming, record) if jobs else BatchSummary(0, 0, 0.0, 0)
+        self.manifest.save()
+        return summary
+
+    # Scan every interval seconds until stop_event is set. on_round gets the BatchSummary of every
+    # scan that converted something
+    def watch(self, stop_event=None, interval=WATCH_INTERVAL, on_result=None, on_round=None):
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            summary = self.run_once(on_result)
+            if summary.files and on_round is not None:
+                on_round(summary)
+            stop_event.wait(interval)
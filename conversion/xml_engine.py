@@ -0,0 +1,186 @@
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from .chunking import CHUNK_ROWS, ChunkWriter
+from .compression import open_output
+
+# Same default as pd.read_xml: every child of the root element is a record
+DEFAULT_RECORD = "./*"
+
+
+# ====== Record matching ====== #
+
+def local_name(tag):
+    return tag.split("}")[1] if "}" in tag else tag
+
+
+# Split a simple record xpath into (steps, anywhere). Supported forms:
+#   "./*", "*", "./item", "item/row"  relative to the root element
+#   "/catalog/item"                   absolute path from the root element
+#   "//item"                          an element with this name at any depth
+# Namespace prefixes are ignored, elements are matched by local name, "*" matches any name
+def parse_record_path(record):
+    record = (record or DEFAULT_RECORD).strip()
+    anywhere = record.startswith("//")
+    if anywhere:
+        steps = [record[2:]]
+    elif record.startswith("/"):
+        steps = record[1:].split("/")
+    else:
+        steps = ["*"] + record.removeprefix("./").split("/")
+    steps = [step.split(":")[-1] for step in steps]
+    if not all(steps) or any(char in step for step in steps for char in "[]()@|.="):
+        raise ValueError(f"Unsupported record xpath: {record!r}. Use forms like './*', '/root/item' or '//item'.")
+    return steps, anywhere
+
+
+def matches_record(path, steps, anywhere):
+    if anywhere:
+        return steps[0] in ("*", path[-1])
+    return len(path) == len(steps) and all(step in ("*", name) for step, name in zip(steps, path))
+
+
+# Same fields pd.read_xml takes from a record: attributes, its own text and the text of its
+# direct children, with namespace URIs stripped from the names. usecols keeps the fields whose
+# name it accepts, like read_csv's usecols test
+def record_fields(elem, usecols=None):
+    fields = dict(elem.attrib)
+    if elem.text and not elem.text.isspace():
+        fields[elem.tag] = elem.text
+    for child in elem.findall("*"):
+        fields[child.tag] = child.text if child.text else None
+    if usecols is None:
+        return {local_name(key): value for key, value in fields.items()}
+    return {name: value for name, value in ((local_name(key), value) for key, value in fields.items()) if usecols(name)}
+
+
+# ====== Reader ====== #
+
+# Yield one dict per record without ever holding more than the current record in memory.
+# Finished elements are cleared and detached from their parent, so the tree stays a thin spine.
+# A record nested inside another matching record is part of the outer one, not a row of its own
+def iter_xml_records(input_file, record=None, usecols=None):
+    from lxml import etree
+
+    steps, anywhere = parse_record_path(record)
+    path = []
+    record_depth = None
+
+    for event, elem in etree.iterparse(input_file, events=("start", "end"), huge_tree=True):
+        if event == "start":
+            path.append(local_name(elem.tag))
+            if record_depth is None and matches_record(path, steps, anywhere):
+                record_depth = len(path)
+            continue
+
+        depth = len(path)
+        path.pop()
+        if record_depth is not None and depth > record_depth:
+            # Children of a record are read when the record itself ends
+            continue
+        if depth == record_depth:
+            record_depth = None
+            yield record_fields(elem, usecols)
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+
+# Turn record dicts into a DataFrame the way pd.read_xml does, so dtypes are inferred identically
+def records_to_frame(records, columns=None, dtype=None):
+    names = list(columns or [])
+    known = set(names)
+    for fields in records:
+        for key in fields:
+            if key not in known:
+                known.add(key)
+                names.append(key)
+    rows = [[fields.get(name) for name in names] for fields in records]
+    with TextParser(rows, names=names, dtype=dtype) as parser:
+        return parser.read()
+
+
+def no_records_error(record):
+    return ValueError(f"No XML records found for xpath {record or DEFAULT_RECORD!r}.")
+
+
+# Whole-file read, same result as pd.read_xml without building the element tree. usecols leaves
+# the other fields out of the records. parser="etree" reads with pd.read_xml and the standard
+# library parser instead, for when lxml isn't installed (slower, and the tree is built in memory)
+def read_xml(input_file, record=None, dtype=None, usecols=None, parser="iterparse"):
+    if parser == "etree":
+        df = pd.read_xml(input_file, xpath=record or DEFAULT_RECORD, parser="etree", dtype=dtype)
+        return df if usecols is None else df[[name for name in df.columns if usecols(name)]]
+    records = list(iter_xml_records(input_file, record, usecols))
+    if not records:
+        raise no_records_error(record)
+    return records_to_frame(records, dtype=dtype)
+
+
+# Chunked read for streaming mode. columns fixes the column list across chunks, records that
+# lack a field get an empty value like they do in a whole-file read
+def read_xml_chunks(input_file, chunksize=CHUNK_ROWS, dtype=None, columns=None, record=None, usecols=None):
+    start = 0
+    batch = []
+    for fields in iter_xml_records(input_file, record, usecols):
+        batch.append(fields)
+        if len(batch) == chunksize:
+            chunk = records_to_frame(batch, columns, dtype)
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            start += len(chunk)
+            batch = []
+            yield chunk
+    if batch:
+        chunk = records_to_frame(batch, columns, dtype)
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield chunk
+    if not start:
+        raise no_records_error(record)
+
+
+# ====== Writer ====== #
+
+# Streams <row> elements through etree.xmlfile, one row element in memory at a time.
+# The output is byte-identical to DataFrame.to_xml with its defaults
+class XmlStreamWriter(ChunkWriter):
+    def __init__(self, output_file, layout_rows=None):
+        from lxml import etree
+
+        super().__init__(output_file, layout_rows)
+        self.etree = etree
+        self.file = open_output(output_file, "wb")
+        self.document = etree.xmlfile(self.file, encoding="utf-8")
+        self.xf = self.document.__enter__()
+        self.xf.write_declaration()
+        self.root = self.xf.element("data")
+        self.root.__enter__()
+
+    def write(self, chunk):
+        frame = chunk.reset_index()
+        names = [str(name) for name in frame.columns]
+        for values in frame.itertuples(index=False, name=None):
+            row = self.etree.Element("row")
+            for name, value in zip(names, values):
+                self.etree.SubElement(row, name).text = None if pd.isna(value) or value == "" else str(value)
+            self.etree.indent(row, space="  ", level=1)
+            self.xf.write("\n  ", row)
+        self.rows_written += len(frame)
+
+    def close(self):
+        if self.file.closed:
+            return
+        try:
+            self.xf.write("\n")
+            self.root.__exit__(None, None, None)
+            self.document.__exit__(None, None, None)
+            # to_xml ends the file with a newline after the root
+            self.file.write(b"\n")
+        finally:
+            self.file.close()
+
+
+# Whole-file write used by the conversion table, the DataFrame is never turned into a tree
+def write_xml(df, output_file):
+    with XmlStreamWriter(output_file) as writer:
+        writer.write(df)
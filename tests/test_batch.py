@@ -0,0 +1,79 @@
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from conversion.batch import convert_batch, convert_to_archive, plan_batch
+
+FRAME = pd.DataFrame({"id": range(5), "name": [f"item {index}" for index in range(5)]})
+
+
+@pytest.fixture
+def folders(tmp_path):
+    for folder in ("a", "b"):
+        (tmp_path / folder).mkdir()
+        FRAME.to_csv(tmp_path / folder / "data.csv", index=False)
+    FRAME.to_json(tmp_path / "b" / "data.json", orient="records")
+    (tmp_path / "b" / "broken.json").write_text('[{"id": 1}, {"id": ', encoding="utf-8")
+    return tmp_path
+
+
+def names(jobs, root):
+    return sorted(Path(job.output_file).relative_to(root).as_posix() for job in jobs)
+
+
+def test_plan_batch_outputs_next_to_inputs(folders):
+    jobs = plan_batch([folders / "a", folders / "b"], "xml")
+    assert names(jobs, folders) == ["a/data.xml", "b/broken.xml", "b/data.csv.xml", "b/data.json.xml"]
+
+
+# A same-format conversion is skipped, it would overwrite its input
+def test_plan_batch_skips_own_input(folders):
+    jobs = plan_batch([folders / "a"], "csv")
+    assert jobs == []
+
+
+# A file in a selected folder and selected on its own is converted once
+def test_plan_batch_converts_a_file_once(folders):
+    jobs = plan_batch([folders / "a", folders / "a" / "data.csv"], "json")
+    assert names(jobs, folders) == ["a/data.json"]
+
+
+# One output directory for files of the same name in two folders can't hold both
+def test_plan_batch_rejects_shared_outputs(folders):
+    with pytest.raises(ValueError, match="would both be written to"):
+        plan_batch([folders / "a", folders / "b"], "json", output_dir=folders / "out")
+
+
+# A renamed output must not overwrite another input of the batch
+def test_plan_batch_rejects_overwriting_an_input(folders):
+    (folders / "b" / "data.json.csv").write_text("id\n1\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="would overwrite"):
+        plan_batch([folders / "b"], "csv")
+
+
+# A broken file fails on its own, the rest of the batch is converted
+def test_convert_batch_isolates_failures(folders):
+    jobs = plan_batch([folders / "b"], "xml")
+    results = []
+    summary = convert_batch(jobs, workers=2, on_result=results.append)
+    assert (summary.files, summary.failed) == (3, 1)
+    failed = [result for result in results if not result.ok]
+    assert [Path(result.job.input_file).name for result in failed] == ["broken.json"]
+    assert failed[0].error.startswith("ValueError")
+    assert pd.read_xml(folders / "b" / "data.json.xml").drop(columns="index").equals(FRAME)
+
+
+# Members are named by their path below the outputs' common folder, so files of the same name in
+# two folders keep apart, and a failed file leaves no member behind
+def test_convert_to_archive(folders):
+    jobs = plan_batch([folders / "a", folders / "b"], "xml")
+    archive_file = folders / "out" / "converted.zip"
+    summary = convert_to_archive(jobs, archive_file)
+    assert (summary.files, summary.failed) == (4, 1)
+    FRAME.to_xml(folders / "pandas.xml")
+    with zipfile.ZipFile(archive_file) as archive:
+        assert archive.namelist() == ["a/data.xml", "b/data.csv.xml", "b/data.json.xml"]
+        assert archive.read("a/data.xml") == (folders / "pandas.xml").read_bytes()
+    assert [path.name for path in (folders / "out").iterdir()] == ["converted.zip"]
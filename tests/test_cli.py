@@ -0,0 +1,110 @@
+import pandas as pd
+import pytest
+
+from conversion import cli
+from conversion.cli import build_parser, main
+
+FRAME = pd.DataFrame({"id": range(10), "price": [index / 4 for index in range(10)]})
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    FRAME.to_csv(tmp_path / "input.csv", index=False)
+    return tmp_path / "input.csv"
+
+
+def run(*argv):
+    return main([str(arg) for arg in argv])
+
+
+def test_convert(tmp_path, input_file, capsys):
+    assert run("convert", input_file, tmp_path / "output.json") == 0
+    assert capsys.readouterr().out == "Successfully converted input CSV to output JSON\n"
+    assert pd.read_json(tmp_path / "output.json").equals(FRAME)
+
+
+# --columns and --where select before the output is written, streamed as well
+def test_convert_streamed_selection(tmp_path, input_file, capsys):
+    assert run("convert", input_file, tmp_path / "output.csv.gz", "--to", "jsonl", "--stream", "--chunksize", 3,
+               "--columns", "price", "--where", "id >= 5", "-q") == 0
+    assert capsys.readouterr().out == ""
+    result = pd.read_json(tmp_path / "output.csv.gz", lines=True, compression="gzip")
+    assert result.equals(FRAME.loc[FRAME["id"] >= 5, ["price"]].reset_index(drop=True))
+
+
+@pytest.mark.parametrize("argv, error", [
+    (["output.docx"], "ERROR: Unsupported conversion: CSV to DOCX"),
+    (["output.csv", "--all-sheets"], "ERROR: --all-sheets only works with XLSX input files"),
+    (["output.csv", "output.json", "--stream"], "ERROR: --stream, --to, --all-sheets, --auto and --dry-run only work "
+                                                "with a single output file"),
+    (["output.json", "--where", "missing > 1"], "ERROR: "),
+])
+def test_convert_errors(tmp_path, input_file, capsys, argv, error):
+    assert run("convert", input_file, *[tmp_path / arg if arg.startswith("output") else arg for arg in argv]) == 1
+    assert capsys.readouterr().err.startswith(error)
+    assert not list(tmp_path.glob("output*"))
+
+
+def test_missing_input(tmp_path, capsys):
+    assert run("convert", tmp_path / "missing.csv", tmp_path / "output.json") == 1
+    assert capsys.readouterr().err == f"ERROR: File not found: {tmp_path / 'missing.csv'}\n"
+
+
+# --dry-run prints the plan and writes nothing
+def test_dry_run(tmp_path, input_file, capsys):
+    assert run("convert", input_file, tmp_path / "output.json", "--dry-run", "--workers", 2) == 0
+    out = capsys.readouterr().out
+    assert out.startswith("plan CSV to JSON: whole file, 2 workers\n")
+    assert "--workers 2 given" in out
+    assert not (tmp_path / "output.json").exists()
+
+
+# A failed output of several fails the command, the others are still written
+def test_fanout_exit_code(tmp_path, input_file, capsys):
+    assert run("convert", input_file, tmp_path / "output.json", tmp_path / "missing" / "output.xml") == 1
+    out = capsys.readouterr().out
+    assert "OK" in out and "FAILED (FileNotFoundError" in out
+    assert pd.read_json(tmp_path / "output.json").equals(FRAME)
+
+
+# Reader and writer options only reach the formats they belong to
+@pytest.mark.parametrize("argv, input_ext, options", [
+    (["--orjson"], "json", {"parser": "orjson"}),
+    (["--orjson"], "jsonl", {"parser": "orjson"}),
+    (["--orjson"], "csv", {}),
+    (["--xml-record", "//item"], "xml", {"record": "//item"}),
+    (["--sheet", "2"], "xlsx", {"sheet": 2}),
+    (["--sheet", "Data"], "xlsx", {"sheet": "Data"}),
+    (["--sheet", "Data"], "xml", {}),
+])
+def test_read_options(argv, input_ext, options):
+    args = build_parser().parse_args(["convert", "input", "output", *argv])
+    assert cli.read_options(args, input_ext) == options
+
+
+@pytest.mark.parametrize("argv, output_ext, options", [
+    (["--page-rows", "5", "--no-padding"], "md", {"page_rows": 5, "padded": False}),
+    (["--page-rows", "5", "--no-padding"], "html", {"page_rows": 5}),
+    (["--page-rows", "5"], "csv", {}),
+])
+def test_write_options(argv, output_ext, options):
+    args = build_parser().parse_args(["convert", "input", "output", *argv])
+    assert cli.write_options(args, output_ext) == options
+
+
+def test_list(capsys):
+    assert run("list") == 0
+    assert "csv -> json\n" in capsys.readouterr().out
+
+
+def test_watch_errors(tmp_path, capsys):
+    assert run("watch", tmp_path / "missing", tmp_path / "out", "--to", "json") == 1
+    assert capsys.readouterr().err == f"ERROR: Not a directory: {tmp_path / 'missing'}\n"
+    assert run("watch", tmp_path, tmp_path / "out", "--to", "docx") == 1
+    assert capsys.readouterr().err == "ERROR: Unsupported output format: docx\n"
+
+
+def test_usage_error(capsys):
+    with pytest.raises(SystemExit) as raised:
+        main(["convert"])
+    assert raised.value.code == 2
@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+
+from conversion import convert, convert_streaming, excel_engine, html_engine, json_engine
+from conversion.compat import pandas_release
+
+FRAME = pd.DataFrame({
+    "id": range(30),
+    "price": [index / 7 for index in range(30)],
+    "name": [f"<item {index}>" for index in range(30)],
+    "created_at": pd.date_range("2024-01-01", periods=30, freq="7h"),
+})
+
+
+def test_pandas_release():
+    assert pandas_release("2.2.0") == (2, 2)
+    assert pandas_release("3.0.0rc1") == (3, 0)
+
+
+@pytest.fixture
+def public_api(monkeypatch):
+    monkeypatch.setattr(json_engine, "JSON_INTERNALS", False)
+    monkeypatch.setattr(html_engine, "HTML_INTERNALS", False)
+    monkeypatch.setattr(excel_engine, "PANDAS_INTERNALS", False)
+
+
+# The public API paths give the same tables as pandas, streamed or not
+@pytest.mark.parametrize("input_ext, write, read", [
+    ("json", lambda df, path: df.to_json(path), pd.read_json),
+    ("jsonl", lambda df, path: df.to_json(path, orient="records", lines=True),
+     lambda path: pd.read_json(path, lines=True)),
+    ("csv", lambda df, path: df.to_csv(path, index=False), pd.read_csv),
+])
+def test_public_api_readers(tmp_path, public_api, input_ext, write, read):
+    input_file = tmp_path / f"input.{input_ext}"
+    write(FRAME, input_file)
+    expected = read(input_file)
+    for mode in ("whole", "streamed"):
+        output_file = tmp_path / f"{mode}.html"
+        if mode == "whole":
+            convert(str(input_file), str(output_file), input_ext, "html")
+        else:
+            convert_streaming(str(input_file), str(output_file), input_ext, "html", chunksize=4)
+        assert output_file.read_text(encoding="utf-8") == expected.to_html()
+
+
+def test_public_api_excel_header_style(tmp_path, public_api):
+    from openpyxl import load_workbook
+
+    excel_engine.write_excel(FRAME, str(tmp_path / "frame.xlsx"))
+    FRAME.to_excel(tmp_path / "pandas.xlsx")
+    ours, theirs = load_workbook(tmp_path / "frame.xlsx").active, load_workbook(tmp_path / "pandas.xlsx").active
+    for cell in ("A2", "B1"):
+        assert ours[cell].value == theirs[cell].value
+        assert ours[cell].font.b == theirs[cell].font.b
+        assert ours[cell].border.left.style == theirs[cell].border.left.style
+        assert ours[cell].alignment.horizontal == theirs[cell].alignment.horizontal
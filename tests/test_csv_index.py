@@ -0,0 +1,82 @@
+import io
+import os
+
+import pandas as pd
+import pytest
+
+from conversion import csv_index
+from conversion.csv_index import CsvRowIndex, index_path, open_csv_index, scan_csv
+
+ROWS = 95
+STEP = 10
+
+# Quoted fields with line breaks and quotes, blank lines in between, the last row without a line break
+FRAME = pd.DataFrame({
+    "id": range(ROWS),
+    "note": [f'line\n{index} "quoted"' if index % 3 == 0 else f"note {index}" for index in range(ROWS)],
+})
+
+
+def write_csv(path, lineterminator="\n"):
+    text = FRAME.to_csv(index=False, lineterminator=lineterminator)
+    text = text.replace(f"{lineterminator}5,", f"{lineterminator}{lineterminator}5,", 1).removesuffix(lineterminator)
+    path.write_bytes(text.encode())
+    return path
+
+
+# Every indexed offset is where its row starts for read_csv
+def assert_offsets(path, index):
+    assert index.rows == ROWS
+    assert len(index.offsets) == -(-ROWS // STEP)
+    data = path.read_bytes()
+    for checkpoint, offset in enumerate(index.offsets):
+        row = pd.read_csv(io.BytesIO(data[offset:]), header=None, names=["id", "note"], nrows=1)
+        assert row.iloc[0].tolist() == FRAME.iloc[checkpoint * STEP].tolist()
+
+
+@pytest.mark.parametrize("lineterminator", ["\n", "\r\n", "\r"])
+@pytest.mark.parametrize("block_bytes", [64, 10**6])
+def test_scan_csv(tmp_path, monkeypatch, lineterminator, block_bytes):
+    # Small blocks end inside quoted fields, the quote parity carries over to the next block
+    monkeypatch.setattr(csv_index, "SCAN_BLOCK_BYTES", block_bytes)
+    path = write_csv(tmp_path / "data.csv", lineterminator)
+    index = scan_csv(path, step=STEP)
+    assert index.lineterminator == lineterminator
+    assert_offsets(path, index)
+
+
+def test_seek_and_ranges(tmp_path):
+    index = scan_csv(write_csv(tmp_path / "data.csv"), step=STEP)
+    assert index.seek(0) == (int(index.offsets[0]), 0)
+    assert index.seek(57) == (int(index.offsets[5]), 7)
+    assert index.seek(500) == (int(index.offsets[-1]), 410)
+
+    ranges = index.ranges(3)
+    assert [(first_row, rows) for _, _, first_row, rows in ranges] == [(0, 30), (30, 40), (70, 25)]
+    assert [end for _, end, _, _ in ranges] == [ranges[1][0], ranges[2][0], None]
+    assert CsvRowIndex(index.offsets[:0], 0, "\n", {}).ranges(3) == []
+
+
+def test_empty_and_header_only(tmp_path):
+    (tmp_path / "empty.csv").write_bytes(b"")
+    (tmp_path / "header.csv").write_bytes(b"id,note")
+    assert scan_csv(tmp_path / "empty.csv").rows == 0
+    assert scan_csv(tmp_path / "header.csv").rows == 0
+    assert scan_csv(tmp_path / "header.csv", has_header=False).rows == 1
+
+
+# The index is saved and loaded while the file stays the same, rebuilt once it changes
+def test_open_csv_index(tmp_path, monkeypatch):
+    path = write_csv(tmp_path / "data.csv")
+    first = open_csv_index(path)
+    assert index_path(path).exists()
+    scan = csv_index.scan_csv
+    monkeypatch.setattr(csv_index, "scan_csv", lambda *args, **kwargs: pytest.fail("scanned again"))
+    assert list(open_csv_index(path).offsets) == list(first.offsets)
+
+    monkeypatch.setattr(csv_index, "scan_csv", scan)
+    path.write_bytes(path.read_bytes() + b"\n95,last")
+    os.utime(path, ns=(0, 10**18))
+    assert open_csv_index(path).rows == ROWS + 1
+    assert open_csv_index(path, next_to_file=True).rows == ROWS + 1
+    assert (tmp_path / ".data.csv.rowindex.npz").exists()
@@ -0,0 +1,77 @@
+import gzip
+import os
+
+import pandas as pd
+import pytest
+
+from conversion import dialect
+from conversion.dialect import CsvDialect, clear_dialect_cache, detect_dialect
+
+ROWS = "id;name;price\n1;a;1.5\n2;b;2.5\n"
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    clear_dialect_cache()
+    yield
+    clear_dialect_cache()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("id,name\n1,a\n2,b\n", CsvDialect()),
+    (ROWS, CsvDialect(delimiter=";")),
+    ("id\tname\r\n1\ta\r\n2\tb\r\n", CsvDialect(delimiter="\t", lineterminator="\r\n")),
+    ("id|name\r1|a\r2|b\r", CsvDialect(delimiter="|", lineterminator="\r")),
+    ("1,2,3\n4,5,6\n7,8,9\n", CsvDialect(has_header=False)),
+])
+def test_detect_dialect(tmp_path, text, expected):
+    (tmp_path / "data.csv").write_bytes(text.encode())
+    assert detect_dialect(tmp_path / "data.csv") == expected
+
+
+def test_detect_encoding(tmp_path):
+    (tmp_path / "bom.csv").write_bytes(b"\xef\xbb\xbfid,name\n1,a\n")
+    (tmp_path / "latin.csv").write_bytes("id,name\n1,caf\xe9\n".encode("latin-1"))
+    assert detect_dialect(tmp_path / "bom.csv").encoding == "utf-8-sig"
+    assert detect_dialect(tmp_path / "latin.csv").encoding == "latin-1"
+
+
+# The first sample cuts the file inside rows of a different shape, the sniff reads on until it's sure
+def test_ambiguous_sample_reads_further(tmp_path, monkeypatch):
+    monkeypatch.setattr(dialect, "SNIFF_SAMPLE_SIZES", (20, 10**6))
+    (tmp_path / "data.csv").write_text("id;note\n" + "".join(f"{index};a,b\n" for index in range(50)))
+    assert detect_dialect(tmp_path / "data.csv").delimiter == ";"
+
+
+# Compressed files are sniffed on their content and the file itself is never written
+def test_compressed_file(tmp_path):
+    with gzip.open(tmp_path / "data.csv.gz", "wt") as handle:
+        handle.write(ROWS)
+    before = (tmp_path / "data.csv.gz").read_bytes()
+    found = detect_dialect(tmp_path / "data.csv.gz")
+    assert found.delimiter == ";"
+    assert (tmp_path / "data.csv.gz").read_bytes() == before
+    assert pd.read_csv(tmp_path / "data.csv.gz", **found.read_csv_kwargs()).shape == (2, 3)
+
+
+def test_empty_file(tmp_path):
+    (tmp_path / "data.csv").write_bytes(b"")
+    with pytest.raises(ValueError, match="empty"):
+        detect_dialect(tmp_path / "data.csv")
+
+
+# A file is sniffed once, until it changes
+def test_dialect_cache(tmp_path, monkeypatch):
+    sniffed = []
+    sniff_dialect = dialect.sniff_dialect
+    monkeypatch.setattr(dialect, "sniff_dialect", lambda file: sniffed.append(file) or sniff_dialect(file))
+    path = tmp_path / "data.csv"
+    path.write_text(ROWS)
+    assert detect_dialect(path).delimiter == ";"
+    assert detect_dialect(str(path)).delimiter == ";"
+    assert len(sniffed) == 1
+
+    path.write_text(ROWS.replace(";", ","))
+    os.utime(path, ns=(0, 10**18))
+    assert detect_dialect(path).delimiter == ","
+    assert len(sniffed) == 2
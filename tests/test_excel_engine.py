@@ -0,0 +1,50 @@
+import filecmp
+
+import pandas as pd
+import pytest
+
+from conversion import convert, convert_streaming
+from conversion.excel_engine import merge_sheet_kinds, rows_to_frame, sheet_output_file
+from conversion.streaming import column_kind
+
+# Cell values of one chunk per kind, as iter_sheet_rows gives them
+SHEET_CELLS = {"b": [True, False], "n": ["", ""], "i": [1, 2], "f": [1.5, 2.5], "O": ["x", "y"]}
+
+
+def sheet_kind(cells):
+    return column_kind(rows_to_frame(["a"], [[cell] for cell in cells], 1)["a"])
+
+
+# Two chunks merged must get the kind TextParser gives their cells parsed together
+@pytest.mark.parametrize("first", SHEET_CELLS)
+@pytest.mark.parametrize("second", SHEET_CELLS)
+def test_merge_sheet_kinds_matches_text_parser(first, second):
+    merged = merge_sheet_kinds(sheet_kind(SHEET_CELLS[first]), sheet_kind(SHEET_CELLS[second]))
+    assert merged == sheet_kind(SHEET_CELLS[first] + SHEET_CELLS[second])
+
+
+# A boolean column whose first blank cell, number or float comes after the first chunk
+@pytest.mark.parametrize("output_ext", ["csv", "json", "jsonl", "xml", "html", "md"])
+def test_streamed_booleans_match_whole_file(tmp_path, output_ext):
+    blank = [True, False] * 500
+    blank[800] = None
+    with_int = [True] * 1000
+    with_int[900] = 5
+    with_float = [False] * 1000
+    with_float[950] = 2.5
+    input_file = tmp_path / "booleans.xlsx"
+    pd.DataFrame({"blank": blank, "with_int": with_int, "with_float": with_float}).to_excel(input_file, index=False)
+
+    whole, streamed = tmp_path / f"whole.{output_ext}", tmp_path / f"streamed.{output_ext}"
+    convert(str(input_file), str(whole), "xlsx", output_ext)
+    convert_streaming(str(input_file), str(streamed), "xlsx", output_ext, chunksize=700)
+    assert filecmp.cmp(whole, streamed, shallow=False)
+
+
+@pytest.mark.parametrize("output_file, expected", [
+    ("out/book.csv", "out/book_Sheet2.csv"),
+    ("out/book.csv.gz", "out/book_Sheet2.csv.gz"),
+    ("out/book.v1.json.xz", "out/book.v1_Sheet2.json.xz"),
+])
+def test_sheet_output_file_keeps_format_and_compression_suffixes(output_file, expected):
+    assert sheet_output_file(output_file, "Sheet2") == expected
@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+
+from conversion import convert, fanout
+from conversion.compression import open_input
+from conversion.fanout import convert_fanout
+
+FRAME = pd.DataFrame({"id": range(30), "price": [index / 4 for index in range(30)],
+                      "name": [f"item {index % 4}" for index in range(30)]})
+
+OUTPUTS = ["out.csv", "out.json", "out.jsonl.gz", "out.xml", "out.md"]
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    FRAME.to_csv(tmp_path / "input.csv", index=False)
+    return tmp_path / "input.csv"
+
+
+# Every output of one read is the file a conversion of its own writes, on threads and processes
+def test_fanout_matches_single_conversions(tmp_path, input_file):
+    result = convert_fanout(input_file, [tmp_path / name for name in OUTPUTS])
+    assert [writer.ok for writer in result.writers] == [True] * len(OUTPUTS)
+    assert {writer.mode for writer in result.writers} == {"thread", "process"}
+    for writer, name in zip(result.writers, OUTPUTS):
+        assert writer.output_file == str(tmp_path / name)
+        convert(str(input_file), str(tmp_path / f"single.{name}"), "csv", writer.output_ext)
+        with open_input(tmp_path / name) as fanned, open_input(tmp_path / f"single.{name}") as single:
+            assert fanned.read() == single.read()
+
+
+# A failing writer is reported, leaves no partial file behind and doesn't stop the others
+def test_failing_writer(tmp_path, input_file, monkeypatch):
+    write_output = fanout.write_output
+
+    def failing_json(write_func, df, output_file, output_ext, write_options=None):
+        if output_ext == "json":
+            with open(output_file, "w", encoding="utf-8") as handle:
+                handle.write('{"id": ')
+            raise OSError("disk full")
+        return write_output(write_func, df, output_file, output_ext, write_options)
+
+    monkeypatch.setattr(fanout, "write_output", failing_json)
+    result = convert_fanout(input_file, [tmp_path / name for name in ("out.csv", "out.json", "out.xml")])
+    assert [(writer.output_ext, writer.ok) for writer in result.writers] == [("csv", True), ("json", False), ("xml", True)]
+    assert result.writers[1].error == "OSError: disk full"
+    assert not (tmp_path / "out.json").exists()
+    assert pd.read_csv(tmp_path / "out.csv", index_col=0).equals(FRAME)
+
+
+def test_duplicate_outputs_are_rejected(tmp_path, input_file):
+    with pytest.raises(ValueError, match="more than once"):
+        convert_fanout(input_file, [tmp_path / "out.csv", tmp_path / "sub" / ".." / "out.csv"])
+    assert not (tmp_path / "out.csv").exists()
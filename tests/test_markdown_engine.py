@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conversion import markdown_engine
+from conversion.markdown_engine import MarkdownLayout, MarkdownStreamWriter, write_markdown
+
+# Frames that take the different paths of the writer: numbers aligned on the decimal point,
+# booleans, text, mixed objects, missing values, wide characters and line breaks
+FRAMES = {
+    "numbers": pd.DataFrame({"int": [1, -20, 300], "float": [1.5, -0.25, 1e20], "big": [2**40, 0, -1]}),
+    # tabulate fails on pd.NA in the first two cells of a row, to_markdown as well
+    "nullable": pd.DataFrame({"float": [np.nan, 2.0, 3.125], "name": ["a", None, "c"],
+                              "int": pd.array([1, None, 3], dtype="Int64"),
+                              "boolean": pd.array([True, None, False], dtype="boolean")}),
+    "booleans": pd.DataFrame({"flag": [True, False, True], "blank": [True, None, False]}),
+    "text": pd.DataFrame({"name": ["a", "longer name", ""], "date": pd.date_range("2024-01-01", periods=3)}),
+    "mixed": pd.DataFrame({"object": [1, "two", 3.5], "number_text": ["1", "2.50", "3"]}),
+    "wide": pd.DataFrame({"name": ["日本語", "abc", "ｗｉｄｅ"], "value": [1, 2, 3]}),
+    "multiline": pd.DataFrame({"note": ["first\nsecond", "one", "a\nb\nc"], "value": [1.5, 2, 3]}),
+    "named_index": pd.DataFrame({"value": [3, 1, 2]}, index=pd.Index(["x", "y", "z"], name="key")),
+    "no_rows": pd.DataFrame({"value": pd.Series([], dtype="int64")}),
+}
+
+
+def streamed(frame, output_file, chunksize):
+    layout = MarkdownLayout()
+    chunks = [frame.iloc[start:start + chunksize] for start in range(0, len(frame), chunksize)] or [frame]
+    for chunk in chunks:
+        layout.update(chunk)
+    with MarkdownStreamWriter(str(output_file), layout.layout()) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    return output_file.read_text(encoding="utf-8")
+
+
+# Catches changes in tabulate: the writer must stay byte-identical to DataFrame.to_markdown
+@pytest.mark.skipif(markdown_engine.tabulate is None, reason="needs the pinned tabulate release")
+@pytest.mark.parametrize("name", FRAMES)
+@pytest.mark.parametrize("chunksize", [1, 2, 1000])
+def test_markdown_matches_to_markdown(tmp_path, name, chunksize):
+    frame = FRAMES[name]
+    write_markdown(frame, str(tmp_path / "whole.md"))
+    assert (tmp_path / "whole.md").read_text(encoding="utf-8") == frame.to_markdown()
+    assert streamed(frame, tmp_path / "streamed.md", chunksize) == frame.to_markdown()
+
+
+# Without the pinned tabulate every chunk is written by to_markdown under one header
+@pytest.mark.parametrize("name", FRAMES)
+def test_markdown_fallback_without_pinned_tabulate(tmp_path, monkeypatch, name):
+    monkeypatch.setattr(markdown_engine, "tabulate", None)
+    frame = FRAMES[name]
+    write_markdown(frame, str(tmp_path / "whole.md"))
+    assert (tmp_path / "whole.md").read_text(encoding="utf-8") == frame.to_markdown()
+
+    assert MarkdownStreamWriter.layout_collector() is None
+    with MarkdownStreamWriter(str(tmp_path / "streamed.md"), page_rows=2) as writer:
+        for start in range(0, max(len(frame), 1), 2):
+            writer.write(frame.iloc[start:start + 2])
+    pages = [path.read_text(encoding="utf-8") for path in map(tmp_path.joinpath, ["streamed.md", "streamed_2.md"])
+             if path.exists()]
+    header = frame.iloc[:2].to_markdown().split("\n")[:2] if len(frame.columns) else []
+    for page in pages:
+        assert page.split("\n")[:len(header)] == header
+
+
+# padded=False sizes every column by its header alone: rows don't depend on the other cells, so
+# streamed chunks and the whole file are the same and longer cells stick out
+UNPADDED_FRAME = pd.DataFrame({"int": [1, -20, 300], "float": [1.5, -0.25, 1e20], "name": ["a", "longer name", ""]})
+UNPADDED = """\
+|    |   int |   float | name   |
+|---:|------:|--------:|:-------|
+|  0 |     1 |     1.5 | a      |
+|  1 |   -20 |   -0.25 | longer name |
+|  2 |   300 |   1e+20 |        |"""
+
+
+@pytest.mark.skipif(markdown_engine.tabulate is None, reason="needs the pinned tabulate release")
+def test_markdown_unpadded(tmp_path):
+    write_markdown(UNPADDED_FRAME, str(tmp_path / "whole.md"), padded=False)
+    assert (tmp_path / "whole.md").read_text(encoding="utf-8") == UNPADDED
+    with MarkdownStreamWriter(str(tmp_path / "streamed.md"), padded=False) as writer:
+        writer.write(UNPADDED_FRAME.iloc[:1])
+        writer.write(UNPADDED_FRAME.iloc[1:])
+    assert (tmp_path / "streamed.md").read_text(encoding="utf-8") == UNPADDED
+
+
+# The fallback pads every chunk to its own cells under the first chunk's header, padded or not:
+# a streamed table only matches to_markdown when its chunks happen to share the widths
+@pytest.mark.parametrize("padded", [True, False])
+def test_markdown_fallback_pads_each_chunk(tmp_path, monkeypatch, padded):
+    monkeypatch.setattr(markdown_engine, "tabulate", None)
+    frame = UNPADDED_FRAME
+    write_markdown(frame, str(tmp_path / "whole.md"), padded=padded)
+    assert (tmp_path / "whole.md").read_text(encoding="utf-8") == frame.to_markdown()
+
+    with MarkdownStreamWriter(str(tmp_path / "streamed.md"), padded=padded) as writer:
+        for start in range(len(frame)):
+            writer.write(frame.iloc[start:start + 1])
+    chunks = [frame.iloc[start:start + 1].to_markdown().split("\n") for start in range(len(frame))]
+    expected = "\n".join(chunks[0][:2] + [chunk[2] for chunk in chunks])
+    assert (tmp_path / "streamed.md").read_text(encoding="utf-8") == expected
+    assert expected != frame.to_markdown()
@@ -0,0 +1,86 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conversion import convert, convert_streaming, log_metrics, remove_metrics_hook
+from conversion.metrics import ConversionMetrics, rss_mb
+
+FRAME = pd.DataFrame({"id": range(100), "name": [f"item {index}" for index in range(100)]})
+
+
+@pytest.fixture
+def metrics_log(tmp_path):
+    log_file = tmp_path / "metrics.jsonl"
+    hook = log_metrics(log_file)
+    yield log_file
+    remove_metrics_hook(hook)
+
+
+def logged(log_file):
+    return [json.loads(line) for line in log_file.read_text(encoding="utf-8").splitlines()]
+
+
+# One JSON line per conversion with its stages, whole-file and streamed
+def test_conversions_are_logged(tmp_path, metrics_log):
+    FRAME.to_csv(tmp_path / "input.csv", index=False)
+    convert(str(tmp_path / "input.csv"), str(tmp_path / "whole.json"), "csv", "json")
+    convert_streaming(str(tmp_path / "input.csv"), str(tmp_path / "streamed.json"), "csv", "json", chunksize=30)
+    whole, streamed = logged(metrics_log)
+
+    assert (whole["operation"], whole["ok"], whole["rows"]) == ("convert", True, 100)
+    assert [stage["stage"] for stage in whole["stages"]] == ["detect", "read", "prepare", "write"]
+    assert whole["bytes_read"] == (tmp_path / "input.csv").stat().st_size
+    assert whole["bytes_written"] == (tmp_path / "whole.json").stat().st_size
+
+    assert (streamed["operation"], streamed["ok"], streamed["rows"]) == ("stream", True, 100)
+    assert [stage["stage"] for stage in streamed["stages"]] == ["detect", "scan", "read", "prepare", "write"]
+    stages = {stage["stage"]: stage for stage in streamed["stages"]}
+    assert stages["read"]["rows"] == stages["write"]["rows"] == 100
+    # Stage times are exclusive, so they add up to at most the total
+    assert sum(stage["seconds"] for stage in streamed["stages"]) <= streamed["seconds"]
+
+
+def test_failed_conversion_is_logged(tmp_path, metrics_log):
+    (tmp_path / "broken.json").write_text('[{"id": 1}, {"id": ', encoding="utf-8")
+    with pytest.raises(ValueError):
+        convert(str(tmp_path / "broken.json"), str(tmp_path / "output.csv"), "json", "csv")
+    [record] = logged(metrics_log)
+    assert record["ok"] is False
+    assert record["error"].startswith("ValueError")
+
+
+# A stage entered inside another one pauses it
+def test_nested_stage_pauses_outer_stage():
+    metrics = ConversionMetrics("test", "input.csv")
+    with metrics.stage("outer"):
+        with metrics.stage("inner"):
+            sum(range(200000))
+    metrics.finish()
+    assert metrics.stages["inner"].seconds > 0
+    assert metrics.stages["outer"].seconds + metrics.stages["inner"].seconds <= metrics.seconds
+
+
+# The peak of a stage is the memory used while it ran, not the high-water mark of the process
+@pytest.mark.skipif(rss_mb() is None, reason="resident memory is only known on Linux")
+def test_peak_memory_is_per_stage():
+    metrics = ConversionMetrics("test", "input.csv")
+    with metrics.stage("large"):
+        block = np.ones(200 * 1024**2 // 8)
+        del block
+    with metrics.stage("small"):
+        pass
+    metrics.finish()
+    assert metrics.stages["large"].peak_rss_mb - metrics.stages["small"].peak_rss_mb > 150
+    assert metrics.peak_rss_mb == metrics.stages["large"].peak_rss_mb
+
+
+def test_failing_hook_only_warns(tmp_path):
+    def failing(metrics):
+        raise RuntimeError("collector down")
+
+    metrics = ConversionMetrics("test", "input.csv", on_metrics=failing)
+    with pytest.warns(UserWarning, match="collector down"):
+        metrics.finish()
+    assert metrics.ok
@@ -0,0 +1,77 @@
+import gzip
+
+import pandas as pd
+import pytest
+
+from conversion import convert, convert_streaming, parallel_csv
+from conversion.parallel_csv import read_csv_chunks_parallel, read_csv_parallel, split_index
+
+ROWS = 5000
+
+# Each range is parsed on its own: a gap or text that only appears in a later range must still
+# give the column the type pd.read_csv gives it, and quoted line breaks are never split points
+FRAME = pd.DataFrame({
+    "id": range(ROWS),
+    "price": [index / 4 for index in range(ROWS)],
+    "stock": [None if index == 4200 else index for index in range(ROWS)],
+    "code": [f"x{index}" if index == 3100 else str(index) for index in range(ROWS)],
+    "flag": [None if index == 2600 else index % 2 == 0 for index in range(ROWS)],
+    "note": [f"line\n{index}" if index % 7 == 0 else f"note {index}" for index in range(ROWS)],
+})
+
+
+@pytest.fixture
+def input_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(parallel_csv, "PARALLEL_MIN_BYTES", 0)
+    FRAME.to_csv(tmp_path / "input.csv", index=False)
+    return tmp_path / "input.csv"
+
+
+def test_read_csv_parallel_matches_read_csv(input_file):
+    assert split_index(input_file, {}) is not None
+    expected = pd.read_csv(input_file)
+    result = read_csv_parallel(str(input_file), workers=2)
+    pd.testing.assert_frame_equal(result, expected)
+    assert list(result.dtypes) == list(expected.dtypes)
+
+
+def test_read_csv_parallel_options(input_file):
+    options = {"usecols": ["note", "stock"], "dtype": {"code": str}}
+    pd.testing.assert_frame_equal(read_csv_parallel(str(input_file), workers=2, **options),
+                                  pd.read_csv(input_file, **options))
+
+
+@pytest.mark.parametrize("chunksize", [1000, 1700])
+def test_read_csv_chunks_parallel(input_file, chunksize):
+    with open(input_file, "rb") as handle:
+        chunks = list(read_csv_chunks_parallel(handle, chunksize, workers=2))
+        assert handle.tell() == input_file.stat().st_size
+    result = pd.concat(chunks)
+    assert result.index.equals(pd.RangeIndex(ROWS))
+    assert result["note"].equals(FRAME["note"])
+
+
+# Files that can't be split are read on one core
+def test_unsplittable_files(tmp_path, input_file, monkeypatch):
+    with gzip.open(tmp_path / "input.csv.gz", "wt") as handle:
+        FRAME.to_csv(handle, index=False)
+    assert split_index(tmp_path / "input.csv.gz", {}) is None
+    assert split_index(input_file, {"skiprows": 1}) is None
+    assert split_index(input_file, {"dtype": {"code": "category"}}) is None
+    assert split_index(input_file, {"encoding": "utf-16"}) is None
+    monkeypatch.setattr(parallel_csv, "PARALLEL_MIN_BYTES", 10**9)
+    assert split_index(input_file, {}) is None
+
+
+# A conversion on two processes writes the file one process writes
+@pytest.mark.parametrize("streamed", [False, True])
+def test_parallel_conversion(tmp_path, input_file, streamed):
+    outputs = []
+    for workers in (1, 2):
+        output_file = tmp_path / f"output_{workers}.json"
+        if streamed:
+            convert_streaming(str(input_file), str(output_file), "csv", "json", chunksize=1500, workers=workers)
+        else:
+            convert(str(input_file), str(output_file), "csv", "json", workers=workers)
+        outputs.append(output_file.read_bytes())
+    assert outputs[0] == outputs[1]
@@ -0,0 +1,170 @@
+import gzip
+
+import pandas as pd
+import pytest
+
+from conversion import CONVERSION_FUNCTIONS, Selection, convert, convert_streaming
+
+# Small chunks so every streamed conversion spans several of them. The first gaps of the columns
+# below come after the first chunk, where they change a column's type in a whole-file read
+CHUNK_ROWS = 7
+ROWS = 40
+
+# Values that survive every format unchanged: floats exact in binary, text without padding
+FRAME = pd.DataFrame({
+    "id": range(ROWS),
+    "price": [index * 0.25 for index in range(ROWS)],
+    "name": [f"item {index % 6}" for index in range(ROWS)],
+    # An integer column with gaps: floats in every reader
+    "stock": [None if index in (9, 30) else index * 3 for index in range(ROWS)],
+    # Booleans and booleans with a blank after the first chunk
+    "active": [index % 3 == 0 for index in range(ROWS)],
+    "checked": [None if index == 11 else index % 2 == 0 for index in range(ROWS)],
+    "note": [None if index % 5 == 0 else f"note {index}" for index in range(ROWS)],
+})
+
+# How each input is written and how pandas reads it
+INPUTS = {
+    "csv": (lambda df, path: df.to_csv(path, index=False), pd.read_csv),
+    "json": (lambda df, path: df.to_json(path, orient="records"), pd.read_json),
+    "jsonl": (lambda df, path: df.to_json(path, orient="records", lines=True),
+              lambda path: pd.read_json(path, lines=True)),
+    "xml": (lambda df, path: df.to_xml(path, index=False), pd.read_xml),
+    "xlsx": (lambda df, path: df.to_excel(path, index=False), pd.read_excel),
+}
+
+# What pandas writes for each output, the baseline every conversion is compared with
+OUTPUTS = {
+    "csv": lambda df, path: df.to_csv(path),
+    "json": lambda df, path: df.to_json(path),
+    "jsonl": lambda df, path: df.to_json(path, orient="records", lines=True),
+    "xml": lambda df, path: df.to_xml(path),
+    "html": lambda df, path: df.to_html(path),
+    "md": lambda df, path: path.write_text(df.to_markdown(), encoding="utf-8"),
+    "xlsx": lambda df, path: df.to_excel(path),
+}
+
+PAIRS = sorted(CONVERSION_FUNCTIONS)
+
+
+@pytest.fixture(scope="module")
+def inputs(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("inputs")
+    files = {}
+    for input_ext, (write, _) in INPUTS.items():
+        files[input_ext] = directory / f"input.{input_ext}"
+        write(FRAME, files[input_ext])
+    # A JSON document in pandas' default layout, read whole in streaming mode too
+    files["json columns"] = directory / "columns.json"
+    FRAME.to_json(files["json columns"])
+    return files
+
+
+def pandas_frame(inputs, input_ext):
+    return INPUTS[input_ext][1](inputs[input_ext])
+
+
+def output_text(output_file, output_ext):
+    if output_ext == "xlsx":
+        return pd.read_excel(output_file, index_col=0).to_csv()
+    opener = gzip.open if str(output_file).endswith(".gz") else open
+    with opener(output_file, "rt", encoding="utf-8", newline="") as handle:
+        return handle.read()
+
+
+def baseline(df, output_ext, directory):
+    baseline_file = directory / f"pandas.{output_ext}"
+    OUTPUTS[output_ext](df, baseline_file)
+    return output_text(baseline_file, output_ext)
+
+
+def run(mode, input_file, output_file, input_ext, output_ext, **options):
+    if mode == "whole":
+        convert(str(input_file), str(output_file), input_ext, output_ext, **options)
+    elif mode == "streamed":
+        convert_streaming(str(input_file), str(output_file), input_ext, output_ext, chunksize=CHUNK_ROWS, **options)
+    elif mode == "whole compact":
+        convert(str(input_file), str(output_file), input_ext, output_ext, compact=True, **options)
+    else:
+        convert_streaming(str(input_file), str(output_file), input_ext, output_ext, chunksize=CHUNK_ROWS,
+                          compact=True, **options)
+
+
+# Every reader x writer pair gives what pandas gives, read whole, in chunks and in compact dtypes
+@pytest.mark.parametrize("mode", ["whole", "streamed", "whole compact", "streamed compact"])
+@pytest.mark.parametrize("input_ext, output_ext", PAIRS)
+def test_conversion_matches_pandas(tmp_path, inputs, mode, input_ext, output_ext):
+    output_file = tmp_path / f"output.{output_ext}"
+    run(mode, inputs[input_ext], output_file, input_ext, output_ext)
+    assert output_text(output_file, output_ext) == baseline(pandas_frame(inputs, input_ext), output_ext, tmp_path)
+
+
+@pytest.mark.parametrize("mode", ["whole", "streamed"])
+@pytest.mark.parametrize("output_ext", ["csv", "html", "md"])
+def test_column_oriented_json_matches_pandas(tmp_path, inputs, mode, output_ext):
+    output_file = tmp_path / f"output.{output_ext}"
+    run(mode, inputs["json columns"], output_file, "json", output_ext)
+    expected = pd.read_json(inputs["json columns"])
+    assert output_text(output_file, output_ext) == baseline(expected, output_ext, tmp_path)
+
+
+# Compressed outputs hold the same text
+@pytest.mark.parametrize("mode", ["whole", "streamed"])
+@pytest.mark.parametrize("output_ext", ["csv", "json", "jsonl", "xml", "html", "md"])
+def test_compressed_output_matches_pandas(tmp_path, inputs, mode, output_ext):
+    output_file = tmp_path / f"output.{output_ext}.gz"
+    run(mode, inputs["csv"], output_file, "csv", output_ext)
+    assert output_text(output_file, output_ext) == baseline(pandas_frame(inputs, "csv"), output_ext, tmp_path)
+
+
+# Selected columns and filtered rows match the same selection on pandas' frame
+@pytest.mark.parametrize("mode", ["whole", "streamed"])
+@pytest.mark.parametrize("input_ext", list(INPUTS))
+@pytest.mark.parametrize("output_ext", ["csv", "html", "md"])
+def test_selection_matches_pandas(tmp_path, inputs, mode, input_ext, output_ext):
+    selection = Selection.parse("name, price, checked", "stock > 20 or price < 2")
+    output_file = tmp_path / f"output.{output_ext}"
+    run(mode, inputs[input_ext], output_file, input_ext, output_ext, selection=selection)
+    expected = pandas_frame(inputs, input_ext).query(selection.where)[list(selection.columns)]
+    assert output_text(output_file, output_ext) == baseline(expected, output_ext, tmp_path)
+
+
+# Nullable integers and booleans of a frame are written like pandas writes them
+@pytest.mark.parametrize("output_ext", ["csv", "json", "jsonl", "html", "md", "xml"])
+def test_nullable_dtypes_match_pandas(tmp_path, output_ext):
+    from conversion.converter import get_conversion_functions, write_output
+
+    df = FRAME.astype({"stock": "Int64", "checked": "boolean"})
+    output_file = tmp_path / f"output.{output_ext}"
+    write_output(get_conversion_functions("csv", output_ext)[1], df, str(output_file), output_ext)
+    assert output_text(output_file, output_ext) == baseline(df, output_ext, tmp_path)
+
+
+# Floats that are not exact in binary. pandas' parser rounds some of them when reading ("0.3" is
+# read as 0.30000000000000004), the default parser gives the same values
+INEXACT = pd.DataFrame({"value": [0.1, 0.2, 0.3, 1 / 3, 2.675, 3e-07, 123456.789]})
+
+
+@pytest.mark.parametrize("mode", ["whole", "streamed"])
+@pytest.mark.parametrize("input_ext", ["json", "jsonl"])
+@pytest.mark.parametrize("output_ext", ["csv", "xml"])
+def test_inexact_floats_match_pandas(tmp_path, mode, input_ext, output_ext):
+    input_file = tmp_path / f"input.{input_ext}"
+    INPUTS[input_ext][0](INEXACT, input_file)
+    output_file = tmp_path / f"output.{output_ext}"
+    run(mode, input_file, output_file, input_ext, output_ext)
+    expected = INPUTS[input_ext][1](input_file)
+    assert output_text(output_file, output_ext) == baseline(expected, output_ext, tmp_path)
+
+
+# orjson reads floats exactly, like pandas' parser with precise_float
+@pytest.mark.parametrize("mode", ["whole", "streamed"])
+@pytest.mark.parametrize("input_ext", ["json", "jsonl"])
+def test_orjson_reads_floats_exactly(tmp_path, mode, input_ext):
+    pytest.importorskip("orjson")
+    input_file = tmp_path / f"input.{input_ext}"
+    INPUTS[input_ext][0](INEXACT, input_file)
+    output_file = tmp_path / "output.csv"
+    run(mode, input_file, output_file, input_ext, "csv", read_options={"parser": "orjson"})
+    expected = pd.read_json(input_file, lines=input_ext == "jsonl", precise_float=True)
+    assert output_text(output_file, "csv") == baseline(expected, "csv", tmp_path)
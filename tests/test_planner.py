@@ -0,0 +1,103 @@
+import gzip
+
+import pandas as pd
+import pytest
+
+from conversion import planner
+from conversion.chunking import CHUNK_ROWS
+from conversion.planner import format_plan, plan_conversion, run_plan
+
+ROWS = 2000
+FRAME = pd.DataFrame({"id": range(ROWS), "price": [index / 4 for index in range(ROWS)],
+                      "name": [f"item {index}" for index in range(ROWS)]})
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    FRAME.to_csv(tmp_path / "input.csv", index=False)
+    return tmp_path / "input.csv"
+
+
+def with_memory(monkeypatch, available):
+    monkeypatch.setattr(planner, "available_memory", lambda: available)
+
+
+def test_small_file_is_converted_whole(csv_file, monkeypatch):
+    with_memory(monkeypatch, 8 * 1024**3)
+    plan = plan_conversion(csv_file, "output.json")
+    assert (plan.input_ext, plan.output_ext, plan.mode, plan.workers) == ("csv", "json", "convert", 1)
+    assert plan.columns == 3
+    # The whole file is the sample, its row count is exact
+    assert plan.rows == ROWS
+    assert "fits in memory: whole-file conversion" in plan.reasons
+
+
+# Too large for the memory at hand: streamed when the format can, read whole anyway otherwise
+def test_large_inputs(tmp_path, csv_file, monkeypatch):
+    with_memory(monkeypatch, 1024)
+    plan = plan_conversion(csv_file, "output.json")
+    assert (plan.mode, plan.chunksize) == ("stream", CHUNK_ROWS)
+
+    FRAME.to_json(tmp_path / "input.json", orient="split")
+    plan = plan_conversion(tmp_path / "input.json", "output.csv")
+    assert plan.mode == "convert"
+    assert "JSON is parsed by pandas' parser, only an array of records can stream" in plan.reasons
+    assert plan.reasons[-1].endswith("but this input can only be read whole")
+
+    FRAME.to_json(tmp_path / "records.json", orient="records")
+    plan = plan_conversion(tmp_path / "records.json", "output.csv", read_options={"parser": "orjson"})
+    assert (plan.mode, plan.columns) == ("stream", 3)
+    assert plan.reasons[0].startswith("JSON array of records: parsed whole by orjson")
+
+
+# Wide inputs stream in fewer rows per chunk
+def test_wide_input_chunksize(tmp_path, monkeypatch):
+    with_memory(monkeypatch, 1024)
+    pd.DataFrame([range(400)] * 10).to_csv(tmp_path / "wide.csv", index=False)
+    plan = plan_conversion(tmp_path / "wide.csv", "output.json")
+    assert (plan.mode, plan.columns, plan.chunksize) == ("stream", 400, CHUNK_ROWS * 20 // 400)
+    assert f"400 columns: {plan.chunksize:,} rows per chunk" in plan.reasons
+
+
+@pytest.mark.parametrize("cores, min_bytes, workers", [(4, 0, 0), (1, 0, 1), (4, 10**9, 1)])
+def test_csv_workers(csv_file, monkeypatch, cores, min_bytes, workers):
+    monkeypatch.setattr(planner, "default_workers", lambda: cores)
+    monkeypatch.setattr(planner, "PARALLEL_MIN_BYTES", min_bytes)
+    assert plan_conversion(csv_file, "output.json").workers == workers
+
+
+# A compressed input is planned by the size of its data and never split
+def test_compressed_input(tmp_path, monkeypatch):
+    monkeypatch.setattr(planner, "default_workers", lambda: 4)
+    monkeypatch.setattr(planner, "PARALLEL_MIN_BYTES", 0)
+    with gzip.open(tmp_path / "input.csv.gz", "wt") as handle:
+        FRAME.to_csv(handle, index=False)
+    plan = plan_conversion(tmp_path / "input.csv.gz", "output.json")
+    assert plan.data_bytes == len(FRAME.to_csv(index=False).encode())
+    assert plan.workers == 1
+    assert plan.reasons[0] == f"gzip input holds {planner.format_bytes(plan.data_bytes)} of data"
+
+
+def test_format_plan(csv_file, monkeypatch):
+    with_memory(monkeypatch, 1024)
+    plan = plan_conversion(csv_file, "output.json")
+    lines = format_plan(plan._replace(workers=0)).split("\n")
+    assert lines[0] == f"plan CSV to JSON: streaming, {CHUNK_ROWS:,} rows per chunk, all cores"
+    assert lines[1].endswith(f"(3 columns, ~{ROWS:,} rows)")
+    assert lines[2] == "  output   output.json"
+    assert lines[3:] == [f"  - {reason}" for reason in plan.reasons]
+    assert "  engine   parser=orjson" in format_plan(plan._replace(read_options={"parser": "orjson"}))
+
+
+# A plan runs the conversion it describes, streamed or whole
+@pytest.mark.parametrize("available", [1024, 8 * 1024**3])
+def test_run_plan(tmp_path, csv_file, monkeypatch, available):
+    with_memory(monkeypatch, available)
+    plan = plan_conversion(csv_file, tmp_path / "output.jsonl")
+    run_plan(plan)
+    assert pd.read_json(tmp_path / "output.jsonl", lines=True).equals(FRAME)
+
+
+def test_unsupported_conversion(csv_file):
+    with pytest.raises(ValueError):
+        plan_conversion(csv_file, "output.docx")
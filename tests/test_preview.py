@@ -0,0 +1,88 @@
+import pandas as pd
+import pytest
+
+from conversion import open_preview
+from conversion.preview import PREVIEW_PAGE_ROWS, PreviewSource
+
+ROWS = 2500
+
+FRAME = pd.DataFrame({
+    "id": range(ROWS),
+    "name": [f"item {index}" for index in range(ROWS)],
+    "note": [None if index % 4 else f"line\n{index}" for index in range(ROWS)],
+})
+
+
+def expected_row(position):
+    note = FRAME["note"][position]
+    return [str(position), f"item {position}", "" if note is None else note]
+
+
+@pytest.fixture(scope="module")
+def files(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("preview")
+    FRAME.to_csv(directory / "data.csv", index=False)
+    FRAME.to_csv(directory / "data.csv.gz", index=False)
+    FRAME.to_json(directory / "data.jsonl", orient="records", lines=True)
+    FRAME.to_json(directory / "data.json", orient="records")
+    return directory
+
+
+def test_preview_source_is_abstract():
+    with pytest.raises(TypeError):
+        PreviewSource()
+
+
+# Only the first page is read when the preview opens, indexing makes every row available and
+# pages far into the file are read by seeking, quoted newlines included
+def test_csv_preview_pages(files):
+    source = open_preview(files / "data.csv")
+    try:
+        assert source.columns == ["id", "name", "note"]
+        assert source.row_count() == PREVIEW_PAGE_ROWS and not source.complete
+        progress = []
+        source.build_index(progress.append)
+        assert source.complete and source.row_count() == ROWS and progress[-1] == ROWS
+        for position in (0, 1199, 1200, 2001, ROWS - 1):
+            assert source.row(position) == expected_row(position)
+        assert source.rows(ROWS - 3, ROWS + 10) == [expected_row(position) for position in range(ROWS - 3, ROWS)]
+    finally:
+        source.close()
+
+
+# A file indexed before opens with its index from disk
+def test_csv_preview_reuses_index(files, monkeypatch):
+    from conversion import csv_index
+
+    first = open_preview(files / "data.csv")
+    first.build_index()
+    monkeypatch.setattr(csv_index, "scan_csv", lambda *args, **kwargs: pytest.fail("scanned again"))
+    second = open_preview(files / "data.csv")
+    second.build_index()
+    assert list(second.offsets) == list(first.offsets)
+    assert second.row(1750) == expected_row(1750)
+
+
+# Formats read front to back fetch one page at a time as the view scrolls
+@pytest.mark.parametrize("file_name", ["data.csv.gz", "data.jsonl", "data.json"])
+def test_record_preview_pages(files, file_name):
+    source = open_preview(files / file_name)
+    try:
+        assert source.row_count() == PREVIEW_PAGE_ROWS
+        fetched = []
+        while source.can_fetch_more():
+            fetched.append(source.fetch_more())
+        pages, rest = divmod(ROWS - PREVIEW_PAGE_ROWS, PREVIEW_PAGE_ROWS)
+        assert fetched == [PREVIEW_PAGE_ROWS] * pages + [rest]
+        assert source.row_count() == ROWS and source.complete
+        assert source.row(ROWS - 1) == expected_row(ROWS - 1)
+    finally:
+        source.close()
+
+
+# Fields that first appear in a later record add a column, earlier rows show it blank
+def test_record_preview_adds_columns(tmp_path):
+    (tmp_path / "data.jsonl").write_text('{"a": 1}\n{"a": 2, "b": "x"}\n', encoding="utf-8")
+    source = open_preview(tmp_path / "data.jsonl")
+    assert source.columns == ["a", "b"]
+    assert source.rows(0, 5) == [["1", ""], ["2", "x"]]
@@ -0,0 +1,75 @@
+import gzip
+import threading
+
+import pandas as pd
+import pytest
+
+from conversion import ConversionCancelled, convert, convert_streaming
+from conversion.progress import ConversionProgress, format_duration, format_progress
+
+ROWS = 1000
+FRAME = pd.DataFrame({"id": range(ROWS), "name": [f"item {index}" for index in range(ROWS)]})
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    FRAME.to_csv(tmp_path / "input.csv", index=False)
+    return tmp_path / "input.csv"
+
+
+# Progress grows with every chunk over both passes and ends at the whole input
+@pytest.mark.parametrize("output_name", ["output.json", "output.xml.gz"])
+def test_streamed_progress(tmp_path, input_file, output_name):
+    updates = []
+    output_file = tmp_path / output_name
+    convert_streaming(str(input_file), str(output_file), "csv", output_name.split(".")[1], chunksize=100,
+                      on_progress=updates.append)
+    size = input_file.stat().st_size
+    assert all(update.bytes_total == 2 * size for update in updates)
+    done = [update.bytes_done for update in updates]
+    assert done == sorted(done) and len(done) > 10
+    assert updates[-1] == updates[-1]._replace(bytes_done=2 * size, rows=ROWS)
+    assert updates[-1].fraction == 1.0
+
+
+# A compressed input's progress is the share of the compressed file consumed
+def test_compressed_input_progress(tmp_path):
+    with gzip.open(tmp_path / "input.csv.gz", "wt") as handle:
+        FRAME.to_csv(handle, index=False)
+    updates = []
+    convert(str(tmp_path / "input.csv.gz"), str(tmp_path / "output.json"), "csv", "json", on_progress=updates.append)
+    size = (tmp_path / "input.csv.gz").stat().st_size
+    assert [(update.bytes_done, update.bytes_total, update.rows) for update in updates] == [(size, size, ROWS)] * 2
+
+
+# Setting the cancel event stops the conversion between chunks and removes what it wrote
+def test_cancel_streamed_conversion(tmp_path, input_file):
+    cancel_event = threading.Event()
+    updates = []
+
+    def on_progress(progress):
+        updates.append(progress)
+        if progress.rows >= 300:
+            cancel_event.set()
+
+    with pytest.raises(ConversionCancelled):
+        convert_streaming(str(input_file), str(tmp_path / "output.csv"), "csv", "csv", chunksize=100,
+                          on_progress=on_progress, cancel_event=cancel_event)
+    assert updates[-1].rows == 300
+    assert not (tmp_path / "output.csv").exists()
+
+
+# A whole-file conversion is cancelled once the input is read, before anything is written
+def test_cancel_whole_file_conversion(tmp_path, input_file):
+    cancel_event = threading.Event()
+    cancel_event.set()
+    with pytest.raises(ConversionCancelled):
+        convert(str(input_file), str(tmp_path / "output.json"), "csv", "json", cancel_event=cancel_event)
+    assert not (tmp_path / "output.json").exists()
+
+
+def test_format_progress():
+    progress = ConversionProgress(bytes_done=25 * 1024**2, bytes_total=100 * 1024**2, rows=50000, seconds=5.0)
+    assert format_progress(progress) == "25% | 10,000 rows/s | 5.0 MB/s | ETA 00:15"
+    assert format_progress(ConversionProgress(0, 100, 0, 0.0)) == "0% | 0 rows/s | 0.0 MB/s | ETA --:--"
+    assert format_duration(3725) == "1:02:05"
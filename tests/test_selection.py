@@ -0,0 +1,17 @@
+import pytest
+
+from conversion import Selection
+
+
+def test_read_columns():
+    assert Selection.parse("name, price", "stock > 20").read_columns() == ["name", "price", "stock"]
+    assert Selection.parse("name", "`unit price` > 2 and name != 'x'").read_columns() == ["name", "unit price"]
+    assert Selection.parse(None, "stock > 20").read_columns() is None
+
+
+# The GUIs call read_columns before a conversion starts, a broken filter fails there
+@pytest.mark.parametrize("where", ["price >", "price > 2)", "name = 'x' and"])
+def test_invalid_filter_fails_before_reading(where):
+    for columns in ("name", None):
+        with pytest.raises(ValueError, match="Invalid row filter"):
+            Selection.parse(columns, where).read_columns()
@@ -0,0 +1,90 @@
+import pandas as pd
+import pytest
+
+from conversion import json_engine
+from conversion.statistics import StatisticsAccumulator, clear_statistics_cache, column_statistics
+
+FRAME = pd.DataFrame({
+    "id": range(40),
+    "price": [index * 2.5 if index % 7 else None for index in range(40)],
+    "name": [f"item {index % 9}" for index in range(40)],
+})
+
+
+@pytest.fixture(autouse=True)
+def small_reads(monkeypatch):
+    # Blocks smaller than a column so the JSON documents are parsed across many reads
+    monkeypatch.setattr(json_engine, "READ_BYTES", 64)
+    clear_statistics_cache()
+
+
+# The statistics of a column are the same whichever layout the file stores it in
+@pytest.mark.parametrize("file_name, write", [
+    ("columns.json", lambda df, path: df.to_json(path)),
+    ("records.json", lambda df, path: df.to_json(path, orient="records")),
+    ("records.jsonl", lambda df, path: df.to_json(path, orient="records", lines=True)),
+    ("records.jsonl.gz", lambda df, path: df.to_json(path, orient="records", lines=True)),
+])
+@pytest.mark.parametrize("column", ["id", "price", "name"])
+def test_json_statistics_match_csv(tmp_path, file_name, write, column):
+    FRAME.to_csv(tmp_path / "frame.csv", index=False)
+    write(FRAME, tmp_path / file_name)
+    assert column_statistics(tmp_path / file_name, column) == column_statistics(tmp_path / "frame.csv", column)
+
+
+def test_json_statistics_missing_column(tmp_path):
+    FRAME.to_json(tmp_path / "columns.json")
+    with pytest.raises(KeyError):
+        column_statistics(tmp_path / "columns.json", "missing")
+
+
+# Numbers are compared as numbers and text as text: 9 is the smallest number although "10" < "9"
+# as text. A column with text has no mean or sum
+@pytest.mark.parametrize("chunks, text", [
+    # As CSV chunks are read: a chunk with text holds its numbers as text
+    ([[9, 10, 25], [None, 12, 30], ["beta", "40", "alpha"]], ("40", "beta")),
+    # As JSON and XLSX chunks are read: numbers stay numbers among text
+    ([[9, 10, 25], [None, 12, 30], ["beta", 40, "alpha"]], ("alpha", "beta")),
+])
+def test_mixed_column_statistics(chunks, text):
+    accumulator = StatisticsAccumulator("value")
+    for chunk in chunks:
+        accumulator.update(pd.Series(chunk))
+    result = accumulator.result()
+    assert (result.min, result.max) == ((9, 30) if text[0] == "40" else (9, 40))
+    assert (result.text_min, result.text_max) == text
+    assert (result.count, result.nulls, result.mean, result.sum, result.distinct) == (8, 1, None, None, 8)
+
+
+@pytest.mark.parametrize("file_name, write", [
+    ("mixed.csv", lambda df, path: df.to_csv(path, index=False)),
+    ("mixed.json", lambda df, path: df.to_json(path, orient="records")),
+    ("mixed.xlsx", lambda df, path: df.to_excel(path, index=False)),
+])
+def test_mixed_column_file_statistics(tmp_path, file_name, write):
+    write(pd.DataFrame({"value": [9, 10, None, "beta", 40, "alpha"]}), tmp_path / file_name)
+    result = column_statistics(tmp_path / file_name, "value")
+    if file_name.endswith(".csv"):
+        # A whole CSV column with text is text, like in pd.read_csv
+        assert (result.min, result.max, result.text_min) == ("10", "beta", "10")
+    else:
+        assert (result.min, result.max, result.text_min, result.text_max) == (9, 40, "alpha", "beta")
+
+
+# Only the selected column of a sheet is parsed
+def test_xlsx_statistics_read_one_column(tmp_path, monkeypatch):
+    from conversion import statistics
+
+    FRAME.to_excel(tmp_path / "frame.xlsx", index=False)
+    FRAME.to_csv(tmp_path / "frame.csv", index=False)
+    read_excel_chunks = statistics.read_excel_chunks
+    widths = []
+
+    def recording_reader(*args, **kwargs):
+        for chunk in read_excel_chunks(*args, **kwargs):
+            widths.append(chunk.shape[1])
+            yield chunk
+
+    monkeypatch.setattr(statistics, "read_excel_chunks", recording_reader)
+    assert column_statistics(tmp_path / "frame.xlsx", "price") == column_statistics(tmp_path / "frame.csv", "price")
+    assert set(widths) == {1}
@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from conversion import convert, convert_streaming
+from conversion.transforms import sanitize_xml_columns, xml_element_name, xml_element_names
+
+FRAME = pd.DataFrame({"first name": ["a b", "c_d"], "unit_price": [1.5, 2.0], "2024": [1, 2]})
+
+
+@pytest.mark.parametrize("label, name", [
+    ("first name", "first_name"),
+    ("unit_price", "unit_price"),
+    ("2024", "_2024"),
+    ("a:b", "a_b"),
+    ("", "_"),
+    (7, "_7"),
+    ("prix €", "prix__"),
+])
+def test_xml_element_name(label, name):
+    assert xml_element_name(label) == name
+
+
+# Labels that collapse onto the same name keep apart with a suffix
+def test_xml_element_names_collisions():
+    assert xml_element_names(["a b", "a_b", "a-b", "a b"]) == ["a_b", "a_b_1", "a-b", "a_b_2"]
+
+
+# The frame passed in keeps its labels, only the copy to write is renamed
+def test_sanitize_xml_columns_leaves_the_frame():
+    sanitized = sanitize_xml_columns(FRAME)
+    assert list(sanitized.columns) == ["first_name", "unit_price", "_2024"]
+    assert list(FRAME.columns) == ["first name", "unit_price", "2024"]
+    assert sanitize_xml_columns(sanitized) is sanitized
+
+
+# The input is never rewritten and underscores or spaces in the values come through unchanged
+@pytest.mark.parametrize("streamed", [False, True])
+def test_xml_conversion_keeps_input_and_values(tmp_path, streamed):
+    FRAME.to_csv(tmp_path / "input.csv", index=False)
+    before = (tmp_path / "input.csv").read_bytes()
+    if streamed:
+        convert_streaming(str(tmp_path / "input.csv"), str(tmp_path / "output.xml"), "csv", "xml", chunksize=1)
+    else:
+        convert(str(tmp_path / "input.csv"), str(tmp_path / "output.xml"), "csv", "xml")
+    assert (tmp_path / "input.csv").read_bytes() == before
+    result = pd.read_xml(tmp_path / "output.xml", dtype=str)
+    assert list(result.columns) == ["index", "first_name", "unit_price", "_2024"]
+    assert list(result["first_name"]) == ["a b", "c_d"]
@@ -0,0 +1,113 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from conversion import watch
+from conversion.cli import main
+from conversion.watch import MANIFEST_NAME, FolderWatcher
+
+FRAME = pd.DataFrame({"id": range(5), "name": [f"item {index}" for index in range(5)]})
+
+
+@pytest.fixture
+def folders(tmp_path):
+    input_dir = tmp_path / "in"
+    (input_dir / "sub").mkdir(parents=True)
+    FRAME.to_csv(input_dir / "data.csv", index=False)
+    FRAME.to_json(input_dir / "sub" / "data.json", orient="records")
+    (input_dir / "notes.txt").write_text("not data", encoding="utf-8")
+    return input_dir, tmp_path / "out"
+
+
+def watcher(folders, output_exts=("xml",), **options):
+    return FolderWatcher(*folders, output_exts, settle_seconds=0, workers=1, **options)
+
+
+def converted(results):
+    return sorted(os.path.basename(result.job.output_file) for result in results)
+
+
+def run(folder_watcher):
+    results = []
+    summary = folder_watcher.run_once(results.append)
+    return summary, converted(results)
+
+
+def test_converts_new_files_once(folders, monkeypatch):
+    input_dir, output_dir = folders
+    summary, outputs = run(watcher(folders, ["xml", "csv"]))
+    assert (summary.files, summary.failed) == (4, 0)
+    assert outputs == ["data.csv", "data.csv", "data.xml", "data.xml"]
+    assert (output_dir / "sub" / "data.xml").exists()
+    assert (output_dir / MANIFEST_NAME).exists()
+
+    # A restarted watcher knows the files from the manifest and doesn't even read them
+    monkeypatch.setattr(watch, "content_hash", lambda path: pytest.fail(f"{path} hashed"))
+    assert run(watcher(folders, ["xml", "csv"]))[1] == []
+
+
+# A touched file is hashed and skipped, a changed one or one whose output is gone is converted again
+def test_reconverts_changed_files(folders):
+    input_dir, output_dir = folders
+    folder_watcher = watcher(folders)
+    run(folder_watcher)
+
+    os.utime(input_dir / "data.csv", ns=(0, 10**18))
+    assert run(folder_watcher)[1] == []
+
+    FRAME.iloc[:2].to_csv(input_dir / "data.csv", index=False)
+    assert run(folder_watcher)[1] == ["data.xml"]
+    assert len(pd.read_xml(output_dir / "data.xml")) == 2
+
+    (output_dir / "sub" / "data.xml").unlink()
+    assert run(folder_watcher)[1] == ["data.xml"]
+    assert (output_dir / "sub" / "data.xml").exists()
+
+
+# A failed file is recorded and only tried again once it changes
+def test_failed_files_wait_for_a_change(folders):
+    input_dir, output_dir = folders
+    (input_dir / "broken.json").write_text('[{"id": 1}, {"id": ', encoding="utf-8")
+    folder_watcher = watcher(folders)
+    summary, outputs = run(folder_watcher)
+    assert summary.failed == 1
+    manifest = json.loads((output_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+    assert manifest["files"]["broken.json"]["targets"]["xml"]["error"].startswith("ValueError")
+
+    assert run(folder_watcher)[0].files == 0
+    FRAME.to_json(input_dir / "broken.json", orient="records")
+    summary, outputs = run(folder_watcher)
+    assert (summary.files, summary.failed, outputs) == (1, 0, ["broken.xml"])
+
+
+# Files still being written are left for a later scan, deleted inputs leave the manifest
+def test_settle_and_deleted_files(folders):
+    input_dir, output_dir = folders
+    assert run(FolderWatcher(*folders, "xml", settle_seconds=3600))[1] == []
+
+    folder_watcher = watcher(folders)
+    run(folder_watcher)
+    (input_dir / "data.csv").unlink()
+    run(folder_watcher)
+    assert list(folder_watcher.manifest.files) == ["sub/data.json"]
+    assert (output_dir / "data.xml").exists()
+
+
+# An output directory inside the watched one is never taken for input
+def test_output_dir_inside_input_dir(folders):
+    input_dir, _ = folders
+    folder_watcher = watcher((input_dir, input_dir / "converted"), ["json"])
+    assert run(folder_watcher)[1] == ["data.json"]
+    assert run(folder_watcher)[1] == []
+
+
+def test_watch_once_command(folders, capsys):
+    input_dir, output_dir = folders
+    argv = ["watch", str(input_dir), str(output_dir), "--to", "xml", "--once", "--settle", "0", "--jobs", "1"]
+    assert main(argv) == 0
+    assert capsys.readouterr().out.count("OK") == 2
+    (input_dir / "broken.csv").write_bytes(b"\xff\xfe\x00")
+    assert main([*argv, "-q"]) == 1
+    assert "FAILED" in capsys.readouterr().out